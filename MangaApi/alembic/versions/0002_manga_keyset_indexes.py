@@ -0,0 +1,34 @@
+"""manga_keyset_indexes
+
+Revision ID: 0002_manga_keyset_indexes
+Revises: 0001_auditlog
+Create Date: 2026-10-18
+
+Índices compuestos (columna de orden, MNG_ID) en apicore_manga para la
+paginación por cursor (keyset) de GET /api/mangas: cada página es un
+range scan sobre el índice en vez de un OFFSET que recorre lo anterior.
+"""
+
+from alembic import op
+
+revision = "0002_manga_keyset_indexes"
+down_revision = "0001_auditlog"
+branch_labels = None
+depends_on = None
+
+_INDEXES = {
+    "manga_creacion_id_idx": ["MNG_CREACION", "MNG_ID"],
+    "manga_actualizacion_id_idx": ["MNG_ACTUALIZACION", "MNG_ID"],
+    "manga_vista_id_idx": ["MNG_VISTA", "MNG_ID"],
+    "manga_titulo_id_idx": ["MNG_TITULO", "MNG_ID"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in _INDEXES.items():
+        op.create_index(name, "apicore_manga", columns)
+
+
+def downgrade() -> None:
+    for name in _INDEXES:
+        op.drop_index(name, table_name="apicore_manga")
@@ -0,0 +1,40 @@
+"""manga_fulltext_search
+
+Revision ID: 0003_manga_fulltext_search
+Revises: 0002_manga_keyset_indexes
+Create Date: 2026-10-18
+
+Índices FULLTEXT para ?search= en GET /api/mangas: título, sinopsis y títulos
+alternativos, cada uno por separado para poder ponderar la relevancia por campo
+(ver infrastructure/search_index.py). Reemplaza el ILIKE '%x%' que escaneaba
+apicore_manga completa, incluida la sinopsis (TEXT).
+
+Solo MySQL: en otros motores la búsqueda usa el índice invertido en memoria.
+"""
+
+from alembic import op
+
+revision = "0003_manga_fulltext_search"
+down_revision = "0002_manga_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    ("manga_titulo_ft", "apicore_manga", ["MNG_TITULO"]),
+    ("manga_sinopsis_ft", "apicore_manga", ["MNG_SINOPSIS"]),
+    ("manga_alt_titulo_ft", "apicore_manga_alt_titulo", ["MAT_TITULO_ALTERNATIVO"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns, mysql_prefix="FULLTEXT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    for name, table, _ in _INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,66 @@
+"""manga_main_cover_url
+
+Revision ID: 0004_manga_main_cover_url
+Revises: 0003_manga_fulltext_search
+Create Date: 2026-10-18
+
+MNG_MAIN_COVER_URL en apicore_manga: la URL del cover principal desnormalizada,
+así las cards (listado, home, random) no consultan apicore_manga_cover.
+
+La migración copia la URL del cover principal (primer 'main' vigente, si no el
+primer vigente) y la normaliza al CDN con normalize_cover_url, igual que
+scripts/backfill_main_cover_url.py: las cards la leen tal cual, sin normalizar.
+Si después cambian CDN_COVER_BASE / CDN_CHAPTER_BASE hay que correr ese script.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from domains.mangas.services import normalize_cover_url
+
+_BATCH_SIZE = 500
+
+revision = "0004_manga_main_cover_url"
+down_revision = "0003_manga_fulltext_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("apicore_manga", sa.Column("MNG_MAIN_COVER_URL", sa.String(500), nullable=True))
+    op.execute(
+        "UPDATE apicore_manga SET MNG_MAIN_COVER_URL = ("
+        " SELECT c.MCV_URL_IMAGEN FROM apicore_manga_cover c"
+        " WHERE c.MCV_MANGA_ID = apicore_manga.MNG_ID AND c.MCV_VIGENTE = 1"
+        " ORDER BY CASE WHEN c.MCV_COVER_TIPO = 'main' THEN 0 ELSE 1 END, c.MCV_ID"
+        " LIMIT 1),"
+        " MNG_ACTUALIZACION = MNG_ACTUALIZACION"
+    )
+    _normalize_urls(op.get_bind())
+
+
+def _normalize_urls(bind) -> None:
+    """URL cruda de Backblaze → CDN, por lotes de MNG_ID; sin tocar MNG_ACTUALIZACION."""
+    select_batch = sa.text(
+        "SELECT MNG_ID, MNG_MAIN_COVER_URL FROM apicore_manga"
+        " WHERE MNG_ID > :after_id AND MNG_MAIN_COVER_URL IS NOT NULL"
+        " ORDER BY MNG_ID LIMIT :limit"
+    )
+    update_url = sa.text(
+        "UPDATE apicore_manga SET MNG_MAIN_COVER_URL = :url, MNG_ACTUALIZACION = MNG_ACTUALIZACION"
+        " WHERE MNG_ID = :id"
+    )
+    after_id = 0
+    while True:
+        rows = bind.execute(select_batch, {"after_id": after_id, "limit": _BATCH_SIZE}).all()
+        if not rows:
+            break
+        changed = [{"id": manga_id, "url": normalize_cover_url(url)}
+                   for manga_id, url in rows if normalize_cover_url(url) != url]
+        if changed:
+            bind.execute(update_url, changed)
+        after_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_column("apicore_manga", "MNG_MAIN_COVER_URL")
@@ -0,0 +1,355 @@
+"""
+core/cache.py
+=============
+Caché de aplicación compartible entre workers de uvicorn.
+
+  - Cache(namespace, ttl): lo que usan los services. get_or_set(key, factory),
+    invalidate() y delete(key); las keys pueden ser cualquier estructura JSON-serializable.
+  - Backends:
+      · MemoryBackend (default): LRU con TTL en el proceso, sin serializar.
+      · RedisBackend (REDIS_ENABLED): valores serializados con pickle, compartidos
+        por todos los workers. Un GET = un round trip (script Lua versión + valor).
+
+Invalidación versionada: cada namespace tiene un contador de versión que forma parte
+de la key real ({CACHE_PREFIX}:{namespace}:{versión}:{hash}). invalidate() lo
+incrementa y todos los workers dejan de ver lo anterior (que expira por TTL). Un
+valor calculado con la versión vieja se guarda bajo esa versión, así un cálculo
+que terminó después del invalidate no "resucita" datos viejos.
+
+Cada valor se guarda como (fresco_hasta, valor) para el stale-while-revalidate
+(ver Cache). Si Redis falla, la operación cuenta como miss y se loguea: el
+request no se cae.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import pickle
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from cachetools import LRUCache
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(key: Any) -> str:
+    """Key estable entre procesos (hash() de str cambia por proceso)."""
+    raw = json.dumps(key, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class MemoryBackend:
+    """Por proceso: cada worker tiene su copia y su propio contador de versión."""
+    name = "memory"
+
+    def __init__(self, maxsize: int = 4096):
+        self._data: LRUCache = LRUCache(maxsize=maxsize)
+        self._versions: dict[str, int] = {}
+
+    async def fetch(self, namespace: str, key: str) -> tuple[int, Any]:
+        version = self._versions.get(namespace, 0)
+        entry = self._data.get((namespace, version, key))
+        if entry is None or entry[0] < time.monotonic():
+            return version, None
+        return version, entry[1]
+
+    async def store(self, namespace: str, version: int, key: str, value: Any, ttl: int) -> None:
+        self._data[(namespace, version, key)] = (time.monotonic() + ttl, value)
+
+    async def bump(self, namespace: str) -> None:
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    async def discard(self, namespace: str, key: str) -> None:
+        self._data.pop((namespace, self._versions.get(namespace, 0), key), None)
+
+    async def lock(self, namespace: str, version: int, key: str, ttl: int) -> str | None:
+        return "local"  # un solo proceso: alcanza con el single-flight de Cache
+
+    async def unlock(self, namespace: str, version: int, key: str, token: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        self._data.clear()
+
+
+class RedisBackend:
+    """Compartido por todos los workers (y réplicas) que apunten al mismo Redis."""
+    name = "redis"
+
+    # KEYS[1] = key de versión; ARGV[1] = prefijo de la key de datos; ARGV[2] = hash
+    _FETCH_LUA = """
+    local v = redis.call('GET', KEYS[1]) or '0'
+    return {v, redis.call('GET', ARGV[1] .. v .. ':' .. ARGV[2])}
+    """
+
+    # Borra el lock solo si sigue siendo nuestro (pudo expirar y tomarlo otro worker)
+    _UNLOCK_LUA = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str):
+        import redis.asyncio as aioredis
+        self.client = aioredis.from_url(url, decode_responses=False)
+        self.prefix = prefix
+        self._fetch = self.client.register_script(self._FETCH_LUA)
+        self._unlock = self.client.register_script(self._UNLOCK_LUA)
+
+    def _ns(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    async def fetch(self, namespace: str, key: str) -> tuple[int, Any]:
+        ns = self._ns(namespace)
+        reply = await self._fetch(keys=[f"{ns}:version"], args=[f"{ns}:", key])
+        raw = reply[1] if len(reply) > 1 else None
+        return int(reply[0]), pickle.loads(raw) if raw is not None else None
+
+    async def store(self, namespace: str, version: int, key: str, value: Any, ttl: int) -> None:
+        await self.client.set(f"{self._ns(namespace)}:{version}:{key}", pickle.dumps(value), ex=ttl)
+
+    async def bump(self, namespace: str) -> None:
+        await self.client.incr(f"{self._ns(namespace)}:version")
+
+    async def discard(self, namespace: str, key: str) -> None:
+        ns = self._ns(namespace)
+        version = int(await self.client.get(f"{ns}:version") or 0)
+        await self.client.delete(f"{ns}:{version}:{key}")
+
+    async def lock(self, namespace: str, version: int, key: str, ttl: int) -> str | None:
+        """Token si este worker se quedó con el recálculo de la key; None si ya lo tiene otro."""
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(f"{self._ns(namespace)}:lock:{version}:{key}", token, nx=True, ex=ttl)
+        return token if acquired else None
+
+    async def unlock(self, namespace: str, version: int, key: str, token: str) -> None:
+        await self._unlock(keys=[f"{self._ns(namespace)}:lock:{version}:{key}"], args=[token])
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_backend: MemoryBackend | RedisBackend | None = None
+
+
+def get_backend() -> MemoryBackend | RedisBackend:
+    global _backend
+    if _backend is None:
+        if settings.REDIS_ENABLED:
+            try:
+                _backend = RedisBackend(settings.REDIS_URL, settings.CACHE_PREFIX)
+            except ImportError:
+                logger.warning("REDIS_ENABLED pero falta el paquete redis: caché en memoria.")
+        if _backend is None:
+            _backend = MemoryBackend()
+    return _backend
+
+
+async def close_cache() -> None:
+    """Llamar en el shutdown del lifespan."""
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+    _backend = None
+
+
+# ── Cache por namespace ───────────────────────────────────────────────────────
+
+_registry: dict[str, "Cache"] = {}
+
+# Tiempo máximo que un worker retiene el lock de recálculo de una key
+LOCK_TTL = 10
+_WAIT_POLL = 0.05
+
+
+class _FlightAborted(Exception):
+    """El coroutine que calculaba la key se canceló (p. ej. el cliente cortó)."""
+
+
+class Cache:
+    """
+    Caché de un namespace (p. ej. "mangas:list"). Se declara a nivel de clase del
+    service; None no se cachea. Métricas de hit/miss por proceso en `stats()`.
+
+    Protección contra estampidas al vencer una key:
+      - Single-flight: en cada proceso, un solo coroutine calcula la key y el resto
+        espera el mismo future. Entre workers, un lock (SET NX en Redis) decide quién
+        calcula; los demás esperan a que el valor aparezca en el backend.
+      - Stale-while-revalidate: pasado `ttl` el valor sigue guardado `stale_ttl`
+        segundos más. En ese lapso un solo request lo recalcula (inline, con la sesión
+        de BD del propio request) y el resto recibe el valor viejo sin esperar. Si el
+        recálculo falla, ese request también recibe el valor viejo (y se cuenta en errors).
+    """
+
+    def __init__(self, namespace: str, ttl: int, stale_ttl: int = 0):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight: dict[tuple[int, str], asyncio.Future] = {}
+        _registry[namespace] = self
+
+    async def get_or_set(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        hashed = make_key(key)
+        backend = get_backend()
+        try:
+            version, entry = await backend.fetch(self.namespace, hashed)
+        except Exception as exc:
+            self._error("leer", exc)
+            return await factory()
+
+        if entry is not None:
+            fresh_until, value = entry
+            if time.time() < fresh_until:
+                self.hits += 1
+                return value
+            self.stale_hits += 1
+            if (version, hashed) in self._inflight:
+                return value  # ya se está recalculando en este worker
+            return await self._lead(backend, version, hashed, factory, stale=value)
+
+        self.misses += 1
+        flight = self._inflight.get((version, hashed))
+        if flight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except _FlightAborted:
+                return await self.get_or_set(key, factory)
+        return await self._lead(backend, version, hashed, factory)
+
+    async def _lead(self, backend, version: int, hashed: str, factory, stale: Any = None) -> Any:
+        """Registra el cálculo de la key en este proceso y publica el resultado a los que esperan."""
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[(version, hashed)] = flight
+        try:
+            value = await self._refresh(backend, version, hashed, factory, stale)
+        except asyncio.CancelledError:
+            flight.set_exception(_FlightAborted())
+            flight.exception()  # marcado como leído aunque nadie esté esperando
+            raise
+        except Exception as exc:
+            flight.set_exception(exc)
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            del self._inflight[(version, hashed)]
+
+    async def _refresh(self, backend, version: int, hashed: str, factory, stale: Any) -> Any:
+        try:
+            token = await backend.lock(self.namespace, version, hashed, LOCK_TTL)
+        except Exception as exc:
+            self._error("tomar el lock", exc)
+            token = ""
+        if token is None:
+            # Otro worker lo está recalculando
+            if stale is not None:
+                return stale
+            value = await self._wait_for_other_worker(backend, hashed, version)
+            if value is not None:
+                self.coalesced += 1
+                return value
+
+        try:
+            try:
+                value = await factory()
+            except Exception as exc:
+                if stale is None:
+                    raise
+                self._error("recalcular (se sirve el valor vencido)", exc)
+                return stale
+            if value is not None:
+                try:
+                    await backend.store(self.namespace, version, hashed,
+                                        (time.time() + self.ttl, value), self.ttl + self.stale_ttl)
+                except Exception as exc:
+                    self._error("escribir", exc)
+            return value
+        finally:
+            if token:
+                try:
+                    await backend.unlock(self.namespace, version, hashed, token)
+                except Exception as exc:
+                    self._error("liberar el lock", exc)
+
+    async def _wait_for_other_worker(self, backend, hashed: str, version: int) -> Any:
+        """Espera (hasta LOCK_TTL) a que el worker con el lock guarde el valor."""
+        deadline = time.monotonic() + LOCK_TTL
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_WAIT_POLL)
+            try:
+                current, entry = await backend.fetch(self.namespace, hashed)
+            except Exception as exc:
+                self._error("leer", exc)
+                return None
+            if current != version:
+                return None
+            if entry is not None:
+                return entry[1]
+        return None
+
+    async def set(self, key: Any, value: Any) -> None:
+        """Escribe un valor precalculado (p. ej. por una tarea periódica) en la versión actual."""
+        hashed = make_key(key)
+        backend = get_backend()
+        try:
+            version, _ = await backend.fetch(self.namespace, hashed)
+            await backend.store(self.namespace, version, hashed,
+                                (time.time() + self.ttl, value), self.ttl + self.stale_ttl)
+        except Exception as exc:
+            self._error("escribir", exc)
+
+    async def invalidate(self) -> None:
+        """Invalida todo el namespace en todos los workers (con Redis). No sirve stale."""
+        try:
+            await get_backend().bump(self.namespace)
+        except Exception as exc:
+            self._error("invalidar", exc)
+
+    async def delete(self, key: Any) -> None:
+        """
+        Borra una sola key de la versión actual (el resto del namespace sigue cacheado).
+        A diferencia de invalidate(), un cálculo que empezó antes puede volver a guardarla.
+        """
+        try:
+            await get_backend().discard(self.namespace, make_key(key))
+        except Exception as exc:
+            self._error("borrar", exc)
+
+    def _error(self, action: str, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Cache %s: fallo al %s (%s)", self.namespace, action, exc)
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 3) if total else None,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+
+def cache_stats() -> dict:
+    """Métricas de todos los namespaces (del worker que atiende el request)."""
+    return {
+        "backend": get_backend().name,
+        "namespaces": {name: cache.stats() for name, cache in sorted(_registry.items())},
+    }
@@ -62,6 +62,8 @@ class Settings(BaseSettings):
     B2_KEY_ID: str
     B2_APPLICATION_KEY: str
     B2_BUCKET_NAME: str = "MangaApi"
+    B2_MAX_POOL_CONNECTIONS: int = 50     # Conexiones TLS del cliente S3 compartido (por worker)
+    B2_KEEPALIVE_TIMEOUT: float = 60.0    # Segundos que una conexión ociosa sigue abierta
 
     # ── CDN / Workers ─────────────────────────────────────────────────────────
     CDN_COVER_BASE: str = "https://img.miswebtoons.uk"
@@ -78,9 +80,22 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
 
+    # ── Caché / Redis ─────────────────────────────────────────────────────────
+    REDIS_ENABLED: bool = False           # Caché compartido entre workers (core/cache.py) + stats
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_PREFIX: str = "mangaapi"        # Prefijo de las keys de caché en Redis
+    HTTP_CACHE_MAX_AGE: int = 60          # Cache-Control de lecturas públicas anónimas (CDN/navegador), 0 = no-cache
+
     # ── Paginación ────────────────────────────────────────────────────────────
     DEFAULT_PAGE_SIZE: int = 24
     MAX_PAGE_SIZE: int = 100
+    MANGA_COUNT_CACHE_TTL: int = 300      # Segundos que se reusa el COUNT de un set de filtros
+    MANGA_COUNT_ESTIMATE: bool = False    # Listado sin filtros: count estimado (stats de la tabla)
+    SEARCH_INDEX_TTL: int = 300           # Reconstrucción del índice de búsqueda en memoria (sin MySQL)
+    RANDOM_ID_INDEX_TTL: int = 600        # Reconstrucción del índice de IDs de /mangas/random
+    SUGGEST_INDEX_REFRESH: int = 600      # Reconstrucción periódica del índice de /suggest, 0 = nunca
+    HOME_FEED_REFRESH: int = 60           # Re-materialización periódica del feed de /home, 0 = nunca
+    VIEW_COUNT_FLUSH_INTERVAL: int = 5    # Vistas: volcado por lote cada N segundos, 0 = UPDATE por vista
 
     # ── Sentry ────────────────────────────────────────────────────────────────
     SENTRY_DSN: str = ""
@@ -0,0 +1,58 @@
+"""
+core/http_cache.py
+==================
+Respuestas JSON pre-serializadas con ETag para los endpoints públicos de lectura
+(home, listado y detalle de mangas, listas del catálogo).
+
+Los services cachean un JsonBody (bytes finales + ETag fuerte) en vez de objetos:
+un hit no re-arma modelos Pydantic ni vuelve a serializar. json_response() lo
+devuelve tal cual, o 304 sin cuerpo si el cliente ya lo tiene (If-None-Match).
+
+Cache-Control:
+  - Sin header Authorization: `public` con max-age/s-maxage = HTTP_CACHE_MAX_AGE,
+    así Cloudflare (con una regla "Cache Everything") y el navegador lo reusan.
+    Es la versión sin NSFW: no hay nada sensible que filtrar.
+  - Con Authorization: `private, no-cache`. La respuesta depende del perfil, el
+    CDN no la guarda y el navegador revalida siempre (304 si no cambió).
+"""
+
+import hashlib
+from typing import NamedTuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from core.config import settings
+
+
+class JsonBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def render_json(payload: BaseModel | bytes) -> JsonBody:
+    """Serializa una sola vez; el ETag es un hash del contenido (igual en todos los workers)."""
+    body = payload if isinstance(payload, bytes) else payload.model_dump_json().encode()
+    return JsonBody(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparación débil (RFC 9110): Cloudflare pasa el ETag a W/"..." al comprimir."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def json_response(request: Request, cached: JsonBody, max_age: int | None = None) -> Response:
+    max_age = settings.HTTP_CACHE_MAX_AGE if max_age is None else max_age
+    if "authorization" in request.headers or max_age <= 0:
+        cache_control = "private, no-cache"
+    else:
+        cache_control = f"public, max-age={max_age}, s-maxage={max_age}"
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
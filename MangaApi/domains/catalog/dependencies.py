@@ -5,3 +5,8 @@ from .services import CatalogService
 
 async def get_catalog_service(db: AsyncSession = Depends(get_db)) -> CatalogService:
     return CatalogService(db)
+
+
+async def refresh_after_catalog_write() -> None:
+    """BackgroundTask de los create/update/delete cacheados del router: corre después del commit de get_db."""
+    await CatalogService.refresh_after_write()
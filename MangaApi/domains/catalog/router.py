@@ -9,14 +9,15 @@ Prefijos: /api/catalog/autores, /api/catalog/estados,
 """
 
 from math import ceil
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.database import get_db
+from core.http_cache import json_response
 from core.security import get_current_user
 from core.pagination import paginate
 from domains.dac.dependencies import require_dac_write
-from .dependencies import get_catalog_service
+from .dependencies import get_catalog_service, refresh_after_catalog_write
 from .services import CatalogService
 from .schemas import (
     AutorCreate, AutorRead, AutorUpdate,
@@ -78,11 +79,11 @@ async def delete_autor(autor_id: int, service: CatalogService = Depends(get_cata
 
 @router.get("/estados", response_model=list[EstadoRead])
 async def list_estados(
+    request: Request,
     search: str | None = Query(default=None),
     service: CatalogService = Depends(get_catalog_service),
 ):
-    items, _ = await service.get_estados(limit=500, search=search)
-    return items
+    return json_response(request, await service.get_estados_json(limit=500, search=search))
 
 
 @router.get("/estados/{estado_id}", response_model=EstadoRead)
@@ -95,13 +96,21 @@ async def get_estado(estado_id: int, service: CatalogService = Depends(get_catal
 
 @router.post("/estados", response_model=EstadoRead, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(require_dac_write("autor"))])
-async def create_estado(data: EstadoCreate, service: CatalogService = Depends(get_catalog_service)):
+async def create_estado(
+    data: EstadoCreate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     return await service.create_estado(data.model_dump())
 
 
 @router.patch("/estados/{estado_id}", response_model=EstadoRead,
               dependencies=[Depends(require_dac_write("autor"))])
-async def update_estado(estado_id: int, data: EstadoUpdate, service: CatalogService = Depends(get_catalog_service)):
+async def update_estado(
+    estado_id: int, data: EstadoUpdate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     obj = await service.update_estado(estado_id, data.model_dump(exclude_none=True))
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estado no encontrado.")
@@ -110,7 +119,11 @@ async def update_estado(estado_id: int, data: EstadoUpdate, service: CatalogServ
 
 @router.delete("/estados/{estado_id}", status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(require_dac_write("autor"))])
-async def delete_estado(estado_id: int, service: CatalogService = Depends(get_catalog_service)):
+async def delete_estado(
+    estado_id: int, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     if not await service.delete_estado(estado_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estado no encontrado.")
 
@@ -119,11 +132,11 @@ async def delete_estado(estado_id: int, service: CatalogService = Depends(get_ca
 
 @router.get("/demografias", response_model=list[DemografiaRead])
 async def list_demografias(
+    request: Request,
     search: str | None = Query(default=None),
     service: CatalogService = Depends(get_catalog_service),
 ):
-    items, _ = await service.get_demografias(limit=500, search=search)
-    return items
+    return json_response(request, await service.get_demografias_json(limit=500, search=search))
 
 
 @router.get("/demografias/{dem_id}", response_model=DemografiaRead)
@@ -136,13 +149,21 @@ async def get_demografia(dem_id: int, service: CatalogService = Depends(get_cata
 
 @router.post("/demografias", response_model=DemografiaRead, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(require_dac_write("autor"))])
-async def create_demografia(data: DemografiaCreate, service: CatalogService = Depends(get_catalog_service)):
+async def create_demografia(
+    data: DemografiaCreate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     return await service.create_demografia(data.model_dump())
 
 
 @router.patch("/demografias/{dem_id}", response_model=DemografiaRead,
               dependencies=[Depends(require_dac_write("autor"))])
-async def update_demografia(dem_id: int, data: DemografiaUpdate, service: CatalogService = Depends(get_catalog_service)):
+async def update_demografia(
+    dem_id: int, data: DemografiaUpdate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     obj = await service.update_demografia(dem_id, data.model_dump(exclude_none=True))
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Demografía no encontrada.")
@@ -151,7 +172,11 @@ async def update_demografia(dem_id: int, data: DemografiaUpdate, service: Catalo
 
 @router.delete("/demografias/{dem_id}", status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(require_dac_write("autor"))])
-async def delete_demografia(dem_id: int, service: CatalogService = Depends(get_catalog_service)):
+async def delete_demografia(
+    dem_id: int, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     if not await service.delete_demografia(dem_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Demografía no encontrada.")
 
@@ -160,11 +185,11 @@ async def delete_demografia(dem_id: int, service: CatalogService = Depends(get_c
 
 @router.get("/tags", response_model=list[TagRead])
 async def list_tags(
+    request: Request,
     search: str | None = Query(default=None),
     service: CatalogService = Depends(get_catalog_service),
 ):
-    items, _ = await service.get_tags(limit=500, search=search)
-    return items
+    return json_response(request, await service.get_tags_json(limit=500, search=search))
 
 
 @router.get("/tags/{tag_id}", response_model=TagRead)
@@ -177,13 +202,21 @@ async def get_tag(tag_id: int, service: CatalogService = Depends(get_catalog_ser
 
 @router.post("/tags", response_model=TagRead, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(require_dac_write("autor"))])
-async def create_tag(data: TagCreate, service: CatalogService = Depends(get_catalog_service)):
+async def create_tag(
+    data: TagCreate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     return await service.create_tag(data.model_dump())
 
 
 @router.patch("/tags/{tag_id}", response_model=TagRead,
               dependencies=[Depends(require_dac_write("autor"))])
-async def update_tag(tag_id: int, data: TagUpdate, service: CatalogService = Depends(get_catalog_service)):
+async def update_tag(
+    tag_id: int, data: TagUpdate, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     obj = await service.update_tag(tag_id, data.model_dump(exclude_none=True))
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag no encontrado.")
@@ -192,6 +225,10 @@ async def update_tag(tag_id: int, data: TagUpdate, service: CatalogService = Dep
 
 @router.delete("/tags/{tag_id}", status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(require_dac_write("autor"))])
-async def delete_tag(tag_id: int, service: CatalogService = Depends(get_catalog_service)):
+async def delete_tag(
+    tag_id: int, background_tasks: BackgroundTasks,
+    service: CatalogService = Depends(get_catalog_service),
+):
+    background_tasks.add_task(refresh_after_catalog_write)
     if not await service.delete_tag(tag_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag no encontrado.")
@@ -1,15 +1,38 @@
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from cachetools import TTLCache
 
+from core.cache import Cache
+from core.http_cache import JsonBody, render_json
 from . import repository as repo
+from .schemas import DemografiaRead, EstadoRead, TagRead
 
 class CatalogService:
-    # Caché estático de 1 hora para listas maestras.
-    _cache = TTLCache(maxsize=128, ttl=3600)
+    # Caché de 1 hora para listas maestras, compartido entre workers (core/cache.py).
+    # Guarda la respuesta ya serializada (core/http_cache.py).
+    _cache = Cache("catalog", ttl=3600)
 
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def _list_json(self, kind: str, loader, schema, **kwargs) -> JsonBody:
+        async def load() -> JsonBody:
+            items, _ = await loader(self.db, **kwargs)
+            adapter = TypeAdapter(list[schema])
+            return render_json(adapter.dump_json(adapter.validate_python(list(items), from_attributes=True)))
+
+        return await self._cache.get_or_set({"type": kind, **kwargs}, load)
+
+    async def _invalidate(self):
+        await self._cache.invalidate()
+
+    @classmethod
+    async def refresh_after_write(cls) -> None:
+        """
+        Después del commit de un alta/edición/baja (BackgroundTask): vuelve a invalidar,
+        porque otro request pudo cachear (por 1 hora) lo que leyó antes del commit.
+        """
+        await cls._cache.invalidate()
+
     # ── Autores ───────────────────────────────────────────────────────────────
     async def get_autores(self, **kwargs):
         # Autores can have many items, no cache or short cache. For now, no cache.
@@ -28,76 +51,67 @@ class CatalogService:
         return await repo.delete_autor(self.db, autor_id)
 
     # ── Estados ───────────────────────────────────────────────────────────────
-    async def get_estados(self, **kwargs):
-        cache_key = frozenset([("type", "estados")] + list(kwargs.items()))
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-
-        result = await repo.get_estados(self.db, **kwargs)
-        self._cache[cache_key] = result
-        return result
+    async def get_estados_json(self, **kwargs) -> JsonBody:
+        return await self._list_json("estados", repo.get_estados, EstadoRead, **kwargs)
 
     async def get_estado(self, estado_id: int):
         return await repo.get_estado(self.db, estado_id)
 
     async def create_estado(self, data: dict):
-        self._cache.clear()
-        return await repo.create_estado(self.db, data)
+        result = await repo.create_estado(self.db, data)
+        await self._invalidate()
+        return result
 
     async def update_estado(self, estado_id: int, data: dict):
-        self._cache.clear()
-        return await repo.update_estado(self.db, estado_id, data)
+        result = await repo.update_estado(self.db, estado_id, data)
+        await self._invalidate()
+        return result
 
     async def delete_estado(self, estado_id: int):
-        self._cache.clear()
-        return await repo.delete_estado(self.db, estado_id)
+        result = await repo.delete_estado(self.db, estado_id)
+        await self._invalidate()
+        return result
 
     # ── Demografías ───────────────────────────────────────────────────────────
-    async def get_demografias(self, **kwargs):
-        cache_key = frozenset([("type", "demografias")] + list(kwargs.items()))
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-
-        result = await repo.get_demografias(self.db, **kwargs)
-        self._cache[cache_key] = result
-        return result
+    async def get_demografias_json(self, **kwargs) -> JsonBody:
+        return await self._list_json("demografias", repo.get_demografias, DemografiaRead, **kwargs)
 
     async def get_demografia(self, dem_id: int):
         return await repo.get_demografia(self.db, dem_id)
 
     async def create_demografia(self, data: dict):
-        self._cache.clear()
-        return await repo.create_demografia(self.db, data)
+        result = await repo.create_demografia(self.db, data)
+        await self._invalidate()
+        return result
 
     async def update_demografia(self, dem_id: int, data: dict):
-        self._cache.clear()
-        return await repo.update_demografia(self.db, dem_id, data)
+        result = await repo.update_demografia(self.db, dem_id, data)
+        await self._invalidate()
+        return result
 
     async def delete_demografia(self, dem_id: int):
-        self._cache.clear()
-        return await repo.delete_demografia(self.db, dem_id)
+        result = await repo.delete_demografia(self.db, dem_id)
+        await self._invalidate()
+        return result
 
     # ── Tags ──────────────────────────────────────────────────────────────────
-    async def get_tags(self, **kwargs):
-        cache_key = frozenset([("type", "tags")] + list(kwargs.items()))
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-
-        result = await repo.get_tags(self.db, **kwargs)
-        self._cache[cache_key] = result
-        return result
+    async def get_tags_json(self, **kwargs) -> JsonBody:
+        return await self._list_json("tags", repo.get_tags, TagRead, **kwargs)
 
     async def get_tag(self, tag_id: int):
         return await repo.get_tag(self.db, tag_id)
 
     async def create_tag(self, data: dict):
-        self._cache.clear()
-        return await repo.create_tag(self.db, data)
+        result = await repo.create_tag(self.db, data)
+        await self._invalidate()
+        return result
 
     async def update_tag(self, tag_id: int, data: dict):
-        self._cache.clear()
-        return await repo.update_tag(self.db, tag_id, data)
+        result = await repo.update_tag(self.db, tag_id, data)
+        await self._invalidate()
+        return result
 
     async def delete_tag(self, tag_id: int):
-        self._cache.clear()
-        return await repo.delete_tag(self.db, tag_id)
+        result = await repo.delete_tag(self.db, tag_id)
+        await self._invalidate()
+        return result
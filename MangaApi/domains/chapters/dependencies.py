@@ -5,3 +5,8 @@ from .services import ChapterService
 
 async def get_chapter_service(db: AsyncSession = Depends(get_db)) -> ChapterService:
     return ChapterService(db)
+
+
+async def refresh_after_chapter_write(manga_id: int) -> None:
+    """BackgroundTask de create/delete del router: corre después del commit de get_db."""
+    await ChapterService.refresh_after_write(manga_id)
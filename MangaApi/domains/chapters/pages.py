@@ -0,0 +1,126 @@
+"""
+domains/chapters/pages.py
+=========================
+Formato de apicore_chapter.CHR_PAGES.
+
+Los capítulos subidos por el worker / manual_upload siguen siempre el patrón
+{base}/{NNN}.{ext}, así que en vez de repetir la URL completa por página se
+guarda un manifest compacto:
+
+    {"base": "https://cdn/file/MangaApi/chapters/ABC/001", "count": 42,
+     "ext": "webp", "pad": 3, "start": 1, "overrides": {"17": "https://..."}}
+
+  - `start` (primer número, default 1) y `overrides` (página 1-based → URL que no
+    sigue el patrón) se omiten si no hacen falta.
+  - Si el patrón no aplica a la mayoría de las páginas se guarda el formato legacy
+    {"images": [...]}.
+
+La API devuelve lo guardado tal cual (?pages_format=manifest, default) o lo
+expande a {"images": [...]} para clientes que piden el formato legacy
+(?pages_format=urls).
+"""
+
+import re
+
+from core.config import settings
+
+_PAGE_RE = re.compile(r"^(?P<base>.+)/(?P<num>\d+)\.(?P<ext>\w+)$")
+
+# Límites del manifest: se expande en cada create/update y en ?pages_format=urls
+MAX_PAGES = 2000
+_MAX_PAD = 10
+_MAX_START = 100_000
+
+
+def normalize_page_url(url):
+    """URL de Backblaze raw → CDN configurado (idempotente). Equivale a get_pages() de DRF."""
+    if isinstance(url, str) and "backblazeb2.com" in url:
+        return f"{settings.CDN_CHAPTER_BASE}{url.split('backblazeb2.com', 1)[1]}"
+    return url
+
+
+def is_manifest(pages: dict | None) -> bool:
+    return bool(pages) and "count" in pages
+
+
+def _check_int(manifest: dict, field: str, maximum: int, default: int | None = None) -> None:
+    value = manifest.get(field, default)
+    if type(value) is not int or not 0 <= value <= maximum:
+        raise ValueError(f"`{field}` tiene que ser un entero entre 0 y {maximum}.")
+
+
+def validate_manifest(manifest: dict) -> None:
+    """Raises: ValueError si el manifest no tiene la forma documentada arriba (o excede MAX_PAGES)."""
+    _check_int(manifest, "count", MAX_PAGES)
+    _check_int(manifest, "pad", _MAX_PAD)
+    _check_int(manifest, "start", _MAX_START, default=1)
+    for field in ("base", "ext"):
+        if not isinstance(manifest.get(field), str):
+            raise ValueError(f"`{field}` tiene que ser un string.")
+    overrides = manifest.get("overrides") or {}
+    if not isinstance(overrides, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in overrides.items()
+    ):
+        raise ValueError("`overrides` tiene que ser un objeto {página: URL}.")
+
+
+def _page_url(manifest: dict, index: int) -> str:
+    """URL de la página `index` (0-based) según el patrón del manifest."""
+    number = manifest.get("start", 1) + index
+    return f"{manifest['base']}/{number:0{manifest['pad']}d}.{manifest['ext']}"
+
+
+def expand_pages(pages: dict | None) -> dict:
+    """
+    Cualquier formato guardado → {"images": [...]} (el shape legacy de la API).
+    Raises: ValueError si es un manifest inválido (ver validate_manifest).
+    """
+    if is_manifest(pages):
+        validate_manifest(pages)
+        overrides = pages.get("overrides") or {}
+        return {"images": [overrides.get(str(i + 1)) or _page_url(pages, i) for i in range(pages["count"])]}
+    if not pages or "images" not in pages:
+        return {"images": []}
+    return pages
+
+
+def compact_pages(images: list) -> dict:
+    """Lista de URLs → manifest si la mayoría sigue el patrón {base}/{NNN}.{ext}; si no, legacy."""
+    first = _PAGE_RE.match(images[0]) if images and isinstance(images[0], str) else None
+    if first is None:
+        return {"images": images}
+
+    manifest = {
+        "base": first["base"],
+        "count": len(images),
+        "ext": first["ext"],
+        "pad": len(first["num"]),
+        "start": int(first["num"]),
+    }
+    overrides = {str(i + 1): url for i, url in enumerate(images) if url != _page_url(manifest, i)}
+    if len(overrides) * 2 > len(images):
+        return {"images": images}
+    if manifest["start"] == 1:
+        del manifest["start"]
+    if overrides:
+        manifest["overrides"] = overrides
+    return manifest
+
+
+def store_pages(pages: dict | None) -> dict:
+    """
+    Lo que se guarda en CHR_PAGES en create/update: URLs en el CDN y, si se puede,
+    el manifest compacto. Acepta el formato legacy o un manifest.
+    Raises: ValueError si el manifest o la lista recibida están mal formados.
+    """
+    if pages is not None and not isinstance(pages, dict):
+        raise ValueError("`pages` tiene que ser un manifest o {\"images\": [...]}.")
+    try:
+        images = expand_pages(pages)["images"]
+    except ValueError as exc:
+        raise ValueError(f"Manifest de páginas inválido: {exc}") from exc
+    if not isinstance(images, list) or not all(isinstance(url, str) for url in images):
+        raise ValueError("`images` tiene que ser una lista de URLs.")
+    if len(images) > MAX_PAGES:
+        raise ValueError(f"Un capítulo no puede tener más de {MAX_PAGES} páginas.")
+    return compact_pages([normalize_page_url(url) for url in images])
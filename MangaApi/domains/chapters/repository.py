@@ -5,7 +5,7 @@ Queries async para el dominio de Chapters.
 """
 
 from decimal import Decimal
-from sqlalchemy import select, func
+from sqlalchemy import Row, select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -13,43 +13,104 @@ from .models import Chapter
 from domains.mangas.models import Manga
 
 
-async def get_chapters(
-    db: AsyncSession,
-    page: int = 1,
-    page_size: int = 24,
-    manga_param: str | None = None,
-    search: str | None = None,
-    ordering: str = "capitulo_numero",
-) -> tuple[list[Chapter], int]:
-    q = select(Chapter).options(selectinload(Chapter.manga))
+_ORDER_MAP = {
+    "capitulo_numero": Chapter.capitulo_numero,
+    "-capitulo_numero": Chapter.capitulo_numero.desc(),
+    "id": Chapter.id,
+    "-id": Chapter.id.desc(),
+}
 
+
+def _filter_chapters(q, manga_param: str | None = None, search: str | None = None):
     if manga_param:
         if manga_param.isdigit():
             q = q.where(Chapter.manga_id == int(manga_param))
         else:
-            q = q.join(Manga).where(Manga.slug == manga_param)
+            q = q.join(Manga, Chapter.manga_id == Manga.id).where(Manga.slug == manga_param)
     if search:
         q = q.where(Chapter.titulo.ilike(f"%{search}%"))
+    return q
 
-    _ORDER_MAP = {
-        "capitulo_numero": Chapter.capitulo_numero,
-        "-capitulo_numero": Chapter.capitulo_numero.desc(),
-        "id": Chapter.id,
-        "-id": Chapter.id.desc(),
-    }
-    order_col = _ORDER_MAP.get(ordering, Chapter.capitulo_numero)
-    q = q.order_by(order_col)
 
+async def _paginate(db: AsyncSession, q, page: int, page_size: int, ordering: str):
+    q = q.order_by(_ORDER_MAP.get(ordering, Chapter.capitulo_numero))
     total = await db.scalar(select(func.count()).select_from(q.subquery()))
     skip = (page - 1) * page_size
-    result = await db.execute(q.offset(skip).limit(page_size))
-    return result.scalars().all(), total or 0
+    return await db.execute(q.offset(skip).limit(page_size)), total or 0
+
+
+async def get_chapters(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 24,
+    manga_param: str | None = None,
+    search: str | None = None,
+    ordering: str = "capitulo_numero",
+) -> tuple[list[Chapter], int]:
+    q = _filter_chapters(select(Chapter).options(selectinload(Chapter.manga)), manga_param, search)
+    result, total = await _paginate(db, q, page, page_size, ordering)
+    return result.scalars().all(), total
+
+
+async def get_chapter_index(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 24,
+    manga_param: str | None = None,
+    search: str | None = None,
+    ordering: str = "capitulo_numero",
+) -> tuple[list[Row], int]:
+    """Como get_chapters pero solo id, manga, número, título y volumen: sin CHR_PAGES ni el manga."""
+    q = _filter_chapters(
+        select(
+            Chapter.id.label("id"),
+            Chapter.manga_id.label("manga"),
+            Chapter.capitulo_numero.label("capitulo_numero"),
+            Chapter.titulo.label("titulo"),
+            Chapter.volumen_numero.label("volumen_numero"),
+        ),
+        manga_param, search,
+    )
+    result, total = await _paginate(db, q, page, page_size, ordering)
+    return result.all(), total
 
 
 async def get_chapter(db: AsyncSession, chapter_id: int) -> Chapter | None:
     return await db.get(Chapter, chapter_id, options=[selectinload(Chapter.manga)])
 
 
+async def get_chapter_pages(db: AsyncSession, chapter_id: int) -> tuple[bool, dict | None]:
+    """Solo CHR_PAGES. Returns: (existe, pages)."""
+    row = (await db.execute(select(Chapter.pages).where(Chapter.id == chapter_id))).first()
+    return (row is not None, row[0] if row else None)
+
+
+async def get_chapter_position(db: AsyncSession, chapter_id: int) -> Row | None:
+    """(manga_id, capitulo_numero) de un capítulo, por primary key."""
+    result = await db.execute(
+        select(Chapter.manga_id, Chapter.capitulo_numero).where(Chapter.id == chapter_id)
+    )
+    return result.first()
+
+
+async def get_chapter_numbers(db: AsyncSession, manga_id: int) -> list[tuple[Decimal, int]]:
+    """
+    (capitulo_numero, id) de un manga ordenados por número. Se resuelve solo con
+    chapter_manga_num_idx (en InnoDB el índice secundario ya incluye el CHR_ID).
+    """
+    result = await db.execute(
+        select(Chapter.capitulo_numero, Chapter.id)
+        .where(Chapter.manga_id == manga_id)
+        .order_by(Chapter.capitulo_numero, Chapter.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def get_existing_chapter_ids(db: AsyncSession, chapter_ids: list[int]) -> set[int]:
+    result = await db.execute(select(Chapter.id).where(Chapter.id.in_(chapter_ids)))
+    return set(result.scalars().all())
+
+
 async def create_chapter(db: AsyncSession, data: dict) -> Chapter:
     obj = Chapter(**data)
     db.add(obj)
@@ -81,3 +142,16 @@ async def delete_chapter(db: AsyncSession, chapter_id: int) -> bool:
 async def get_manga_for_chapter(db: AsyncSession, manga_id: int) -> Manga | None:
     """Verifica que el manga existe antes de disparar el worker."""
     return await db.get(Manga, manga_id)
+
+
+async def get_chapter_pages_batch(db: AsyncSession, after_id: int = 0, limit: int = 500) -> list[tuple[int, dict | None]]:
+    """(id, pages) por lotes de id, para migraciones de CHR_PAGES."""
+    result = await db.execute(
+        select(Chapter.id, Chapter.pages).where(Chapter.id > after_id).order_by(Chapter.id).limit(limit)
+    )
+    return result.all()
+
+
+async def set_chapter_pages(db: AsyncSession, pages_by_id: dict[int, dict]) -> None:
+    """UPDATE por primary key en bloque (executemany)."""
+    await db.execute(update(Chapter), [{"id": cid, "pages": pages} for cid, pages in pages_by_id.items()])
@@ -11,25 +11,32 @@ Mejora: El proxy al worker usa httpx async (reemplaza requests síncrono).
 
 import logging
 import os
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from core.database import get_db
 from core.pagination import paginate
 from core.security import get_current_user
 from domains.dac.dependencies import require_dac_write
 from . import repository as repo
 from .schemas import (
-    ChapterCreate, ChapterDetail, ChapterUpdate,
+    ChapterCreate, ChapterDetail, ChapterIndexItem, ChapterNeighbors, ChapterPages, ChapterUpdate,
     ChapterFetchRequest, ChapterFetchResponse,
     ChapterCompletedPayload, WorkerStatusResponse,
 )
-from .dependencies import get_chapter_service
+from .dependencies import get_chapter_service, refresh_after_chapter_write
+from .pages import expand_pages
 from .services import ChapterService
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chapters", tags=["Chapters"])
 
 
-def _to_detail(chapter) -> ChapterDetail:
+# ?pages_format=manifest (default): `pages` como está guardado (manifest compacto);
+# ?pages_format=urls: expandido a {"images": [...]} para clientes con el formato legacy
+_PAGES_FORMAT = Query(default="manifest", pattern="^(manifest|urls)$")
+
+
+def _to_detail(chapter, pages_format: str = "manifest") -> ChapterDetail:
+    pages = expand_pages(chapter.pages) if pages_format == "urls" else chapter.pages
     return ChapterDetail(
         id=chapter.id,
         manga=chapter.manga_id,
@@ -37,7 +44,7 @@ def _to_detail(chapter) -> ChapterDetail:
         capitulo_numero=chapter.capitulo_numero,
         titulo=chapter.titulo,
         volumen_numero=chapter.volumen_numero,
-        pages=chapter.pages,
+        pages=pages or {"images": []},
     )
 
 
@@ -50,30 +57,74 @@ async def list_chapters(
     manga: str | None = Query(default=None),
     search: str | None = Query(default=None),
     ordering: str = Query(default="capitulo_numero"),
+    pages_format: str = _PAGES_FORMAT,
+    view: str = Query(default="full", pattern="^(full|index)$"),
     service: ChapterService = Depends(get_chapter_service),
 ):
+    """
+    ?view=full (default): ChapterDetail con `pages` y `manga_titulo`.
+    ?view=index: ChapterIndexItem (id, número, título, volumen) sin leer CHR_PAGES
+    ni el manga; las páginas se piden por capítulo en GET /chapters/{id}/pages.
+    """
+    if view == "index":
+        rows, total = await service.list_chapter_index(
+            page=page, page_size=page_size,
+            manga_param=manga, search=search, ordering=ordering
+        )
+        return paginate([ChapterIndexItem.model_validate(r) for r in rows], total, page, page_size)
+
     items, total = await service.list_chapters(
         page=page, page_size=page_size,
         manga_param=manga, search=search, ordering=ordering
     )
-    return paginate([_to_detail(c) for c in items], total, page, page_size)
+    return paginate([_to_detail(c, pages_format) for c in items], total, page, page_size)
 
 
 # ── GET ───────────────────────────────────────────────────────────────────────
 
 @router.get("/{chapter_id}", response_model=ChapterDetail)
-async def get_chapter(chapter_id: int, service: ChapterService = Depends(get_chapter_service)):
+async def get_chapter(
+    chapter_id: int,
+    pages_format: str = _PAGES_FORMAT,
+    service: ChapterService = Depends(get_chapter_service),
+):
     obj = await service.get_chapter(chapter_id)
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Capítulo no encontrado.")
-    return _to_detail(obj)
+    return _to_detail(obj, pages_format)
+
+
+@router.get("/{chapter_id}/pages", response_model=ChapterPages)
+async def get_chapter_pages(
+    chapter_id: int,
+    pages_format: str = _PAGES_FORMAT,
+    service: ChapterService = Depends(get_chapter_service),
+):
+    exists, pages = await service.get_chapter_pages(chapter_id)
+    if not exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Capítulo no encontrado.")
+    if pages_format == "urls":
+        pages = expand_pages(pages)
+    return ChapterPages(id=chapter_id, pages=pages or {"images": []})
+
+
+@router.get("/{chapter_id}/neighbors", response_model=ChapterNeighbors)
+async def get_chapter_neighbors(chapter_id: int, service: ChapterService = Depends(get_chapter_service)):
+    """Capítulo anterior/siguiente para la navegación del lector, sin listar el manga."""
+    neighbors = await service.get_neighbors(chapter_id)
+    if not neighbors:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Capítulo no encontrado.")
+    return neighbors
 
 
 # ── CREATE ────────────────────────────────────────────────────────────────────
 
 @router.post("", response_model=ChapterDetail, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(require_dac_write("chapter"))])
-async def create_chapter(data: ChapterCreate, service: ChapterService = Depends(get_chapter_service)):
+async def create_chapter(
+    data: ChapterCreate, background_tasks: BackgroundTasks,
+    service: ChapterService = Depends(get_chapter_service),
+):
     obj_data = {
         "manga_id": data.manga,
         "capitulo_numero": data.capitulo_numero,
@@ -82,6 +133,7 @@ async def create_chapter(data: ChapterCreate, service: ChapterService = Depends(
         "pages": data.pages,
     }
     obj = await service.create_chapter(obj_data)
+    background_tasks.add_task(refresh_after_chapter_write, obj.manga_id)
     return _to_detail(obj)
 
 
@@ -102,9 +154,14 @@ async def update_chapter(
 
 @router.delete("/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(require_dac_write("chapter"))])
-async def delete_chapter(chapter_id: int, service: ChapterService = Depends(get_chapter_service)):
-    if not await service.delete_chapter(chapter_id):
+async def delete_chapter(
+    chapter_id: int, background_tasks: BackgroundTasks,
+    service: ChapterService = Depends(get_chapter_service),
+):
+    manga_id = await service.delete_chapter(chapter_id)
+    if manga_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Capítulo no encontrado.")
+    background_tasks.add_task(refresh_after_chapter_write, manga_id)
 
 
 # ── FETCH (trigger worker) ────────────────────────────────────────────────────
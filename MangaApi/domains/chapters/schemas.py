@@ -4,35 +4,14 @@ domains/chapters/schemas.py
 Schemas Pydantic v2 para el dominio de Chapters.
 
 Reemplaza: ChapterSerializer (DRF).
-La lógica de CDN (USE_CDN setting) se replica en el campo `pages`
-usando un validator que normaliza las URLs al dominio CDN configurado.
+La lógica de CDN (USE_CDN setting) y el manifest compacto de `pages` se aplican
+al guardar (ver domains/chapters/pages.py); la lectura devuelve lo guardado o lo
+expande al formato legacy. Los registros previos se migran con
+scripts/normalize_chapter_pages.py.
 """
 
 from decimal import Decimal
-from pydantic import BaseModel, ConfigDict, Field, model_validator
-from core.config import settings
-
-
-def _normalize_page_urls(pages: dict | None) -> dict | None:
-    """
-    Convierte URLs de Backblaze raw al CDN configurado.
-    Equivale a la lógica get_pages() del ChapterSerializer de DRF.
-    """
-    if not pages or "images" not in pages:
-        return {"images": []}
-
-    images = pages.get("images", [])
-    cdn_images = []
-    for url in images:
-        if isinstance(url, str) and "backblazeb2.com" in url:
-            try:
-                path = url.split("backblazeb2.com")[1]
-                cdn_images.append(f"{settings.CDN_CHAPTER_BASE}{path}")
-            except IndexError:
-                cdn_images.append(url)
-        else:
-            cdn_images.append(url)
-    return {"images": cdn_images}
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # ── Schemas ───────────────────────────────────────────────────────────────────
@@ -57,7 +36,7 @@ class ChapterUpdate(BaseModel):
 class ChapterDetail(BaseModel):
     """
     Equivale a ChapterSerializer de DRF.
-    El campo `pages` se normaliza al CDN en el model_validator.
+    `pages`: manifest compacto o {"images": [...]}, ya en el CDN (ver pages.py).
     """
     model_config = ConfigDict(from_attributes=True)
 
@@ -69,10 +48,36 @@ class ChapterDetail(BaseModel):
     volumen_numero: Decimal | None
     pages: dict | None = None
 
-    @model_validator(mode="after")
-    def normalize_pages(self) -> "ChapterDetail":
-        self.pages = _normalize_page_urls(self.pages)
-        return self
+
+class ChapterIndexItem(BaseModel):
+    """Fila de GET /chapters?view=index: sin `pages` ni el título del manga."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    manga: int
+    capitulo_numero: Decimal
+    titulo: str | None
+    volumen_numero: Decimal | None
+
+
+class ChapterPages(BaseModel):
+    """GET /chapters/{id}/pages."""
+    id: int
+    pages: dict
+
+
+class ChapterNeighbor(BaseModel):
+    id: int
+    capitulo_numero: Decimal
+
+
+class ChapterNeighbors(BaseModel):
+    """GET /chapters/{id}/neighbors: capítulo anterior y siguiente del mismo manga (por número)."""
+    id: int
+    manga: int
+    capitulo_numero: Decimal
+    prev: ChapterNeighbor | None = None
+    next: ChapterNeighbor | None = None
 
 
 # ── Worker Payloads ───────────────────────────────────────────────────────────
@@ -1,13 +1,21 @@
 import logging
+from bisect import bisect_left
+
 import httpx
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import Cache
 from core.config import settings
 from . import repository as repo
+from .pages import store_pages
 
 logger = logging.getLogger(__name__)
 
 class ChapterService:
+    # (capitulo_numero, id) ordenados, por manga, para /chapters/{id}/neighbors.
+    # Se borra solo la key del manga en alta/baja de capítulos (core/cache.py).
+    _numbers_cache = Cache("chapters:numbers", ttl=600)
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
@@ -17,17 +25,90 @@ class ChapterService:
             manga_param=manga_param, search=search, ordering=ordering
         )
 
+    async def list_chapter_index(self, page: int, page_size: int, manga_param: str | None, search: str | None, ordering: str):
+        return await repo.get_chapter_index(
+            self.db, page=page, page_size=page_size,
+            manga_param=manga_param, search=search, ordering=ordering
+        )
+
     async def get_chapter(self, chapter_id: int):
         return await repo.get_chapter(self.db, chapter_id)
 
+    async def get_chapter_pages(self, chapter_id: int):
+        return await repo.get_chapter_pages(self.db, chapter_id)
+
+    # -- Navegación anterior/siguiente --
+    @staticmethod
+    def _adjacent(numbers: list[tuple], target: tuple) -> tuple[tuple | None, tuple | None] | None:
+        """(anterior, siguiente) de `target` en la lista ordenada; None si no está."""
+        i = bisect_left(numbers, target)
+        if i == len(numbers) or numbers[i] != target:
+            return None
+        return (numbers[i - 1] if i > 0 else None,
+                numbers[i + 1] if i + 1 < len(numbers) else None)
+
+    async def _is_current(self, adjacent) -> bool:
+        """El capítulo está en la lista cacheada y sus vecinos siguen existiendo."""
+        if adjacent is None:
+            return False
+        ids = [n[1] for n in adjacent if n is not None]
+        return not ids or len(await repo.get_existing_chapter_ids(self.db, ids)) == len(ids)
+
+    async def get_neighbors(self, chapter_id: int) -> dict | None:
+        """Anterior y siguiente del capítulo dentro de su manga, por número (y id si se repite)."""
+        current = await repo.get_chapter_position(self.db, chapter_id)
+        if not current:
+            return None
+        manga_id, numero = current
+        target = (numero, chapter_id)
+
+        numbers = await self._numbers_cache.get_or_set(
+            manga_id, lambda: repo.get_chapter_numbers(self.db, manga_id)
+        )
+        adjacent = self._adjacent(numbers, target)
+        if not await self._is_current(adjacent):
+            # Lista cacheada antes de un alta/baja hecha en otro worker (caché en memoria)
+            numbers = await repo.get_chapter_numbers(self.db, manga_id)
+            await self._numbers_cache.set(manga_id, numbers)
+            adjacent = self._adjacent(numbers, target) or (None, None)
+
+        prev, next_ = [{"id": n[1], "capitulo_numero": n[0]} if n else None for n in adjacent]
+        return {"id": chapter_id, "manga": manga_id, "capitulo_numero": numero, "prev": prev, "next": next_}
+
+    @classmethod
+    async def refresh_after_write(cls, manga_id: int) -> None:
+        """
+        Después del commit de un alta/baja (BackgroundTask): borra la lista de números de
+        ese manga, por si otro request la cacheó con lo que leyó antes del commit.
+        """
+        await cls._numbers_cache.delete(manga_id)
+
+    @staticmethod
+    def _store_pages(pages: dict | None) -> dict:
+        try:
+            return store_pages(pages)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
     async def create_chapter(self, data: dict):
-        return await repo.create_chapter(self.db, data)
+        data["pages"] = self._store_pages(data.get("pages"))
+        obj = await repo.create_chapter(self.db, data)
+        await self._numbers_cache.delete(obj.manga_id)
+        return obj
 
     async def update_chapter(self, chapter_id: int, data: dict):
+        # ChapterUpdate no cambia número ni manga: la lista de /neighbors no se toca
+        if "pages" in data:
+            data["pages"] = self._store_pages(data["pages"])
         return await repo.update_chapter(self.db, chapter_id, data)
 
-    async def delete_chapter(self, chapter_id: int):
-        return await repo.delete_chapter(self.db, chapter_id)
+    async def delete_chapter(self, chapter_id: int) -> int | None:
+        """Returns: manga_id del capítulo borrado, None si no existía."""
+        current = await repo.get_chapter_position(self.db, chapter_id)
+        if not current or not await repo.delete_chapter(self.db, chapter_id):
+            return None
+        await self._numbers_cache.delete(current.manga_id)
+        return current.manga_id
 
     async def fetch_chapter(self, manga_id: int, chapter_num: int, url: str, series_code: str):
         manga_obj = await repo.get_manga_for_chapter(self.db, manga_id)
@@ -1,10 +1,11 @@
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.database import get_db
+from core.database import AsyncSessionLocal, get_db
 from domains.mangas.interfaces import IMangaRepository
 from infrastructure.database.manga_repository import MangaRepository
 from domains.mangas.services import MangaService
+from infrastructure.view_counter import view_counter
 
 
 def get_manga_repository(db: AsyncSession = Depends(get_db)) -> IMangaRepository:
@@ -15,3 +16,32 @@ def get_manga_repository(db: AsyncSession = Depends(get_db)) -> IMangaRepository
 def get_manga_service(repo: IMangaRepository = Depends(get_manga_repository)) -> MangaService:
     """Provee el servicio orquestador con el repositorio inyectado."""
     return MangaService(repo)
+
+
+async def rebuild_suggest_index() -> int:
+    """Reconstruye el índice de /mangas/suggest con una sesión propia (startup y refresco)."""
+    async with AsyncSessionLocal() as db:
+        return await MangaService(MangaRepository(db)).rebuild_suggest_index()
+
+
+async def refresh_home_feed() -> None:
+    """Re-materializa el feed de /home con una sesión propia (startup y refresco periódico)."""
+    async with AsyncSessionLocal() as db:
+        await MangaService(MangaRepository(db)).refresh_home_feed()
+
+
+async def refresh_after_manga_write(manga_id: int) -> None:
+    """BackgroundTask de create/update del router: corre después del commit de get_db."""
+    async with AsyncSessionLocal() as db:
+        await MangaService(MangaRepository(db)).refresh_after_write(manga_id)
+
+
+async def flush_view_counts() -> int:
+    """Vuelca el buffer de vistas en un UPDATE por lote con una sesión propia (periódico y shutdown)."""
+    async def apply(deltas: dict[int, int]) -> dict[int, int]:
+        async with AsyncSessionLocal() as db:
+            totals = await MangaRepository(db).add_view_counts(deltas)
+            await db.commit()
+            return totals
+
+    return await view_counter.flush(apply)
@@ -1,9 +1,11 @@
-from typing import Protocol, Sequence
+from typing import Any, Protocol, Sequence
+
+from sqlalchemy import Row
 
 from .models import Manga, MangaCover, MangaAltTitulo
 
 class IMangaRepository(Protocol):
-    async def get_mangas(
+    async def get_manga_cards(
         self,
         page: int = 1,
         page_size: int = 24,
@@ -17,9 +19,24 @@ class IMangaRepository(Protocol):
         fecha_to: str | None = None,
         vigente: bool | None = None,
         erotico: bool | None = None,
-        ordering: str = "-creado_en",
+        ordering: str | None = "-creado_en",
         search: str | None = None,
-    ) -> tuple[Sequence[Manga], int]: ...
+        with_count: bool = True,
+    ) -> tuple[Sequence[Row], int | None]: ...
+
+    async def get_manga_cards_keyset(
+        self,
+        limit: int = 24,
+        after: tuple[Any, int] | None = None,
+        with_count: bool = False,
+        can_see_nsfw: bool = False,
+        ordering: str = "-creado_en",
+        **filters,
+    ) -> tuple[Sequence[Row], bool, int | None]: ...
+
+    async def count_mangas(self, can_see_nsfw: bool = False, **filters) -> int: ...
+
+    async def estimate_total_count(self) -> int | None: ...
 
     async def get_manga_by_id(self, manga_id: int, can_see_nsfw: bool = False) -> Manga | None: ...
 
@@ -31,22 +48,23 @@ class IMangaRepository(Protocol):
 
     async def increment_view_count(self, manga_id: int) -> int | None: ...
 
-    async def get_total_count(self, can_see_nsfw: bool = False) -> int: ...
+    async def get_view_count(self, manga_id: int) -> int | None: ...
 
-    async def get_max_id(self, can_see_nsfw: bool = False) -> int | None: ...
+    async def add_view_counts(self, deltas: dict[int, int]) -> dict[int, int]: ...
 
-    async def get_all_ids(self, can_see_nsfw: bool = False) -> Sequence[int]: ...
+    async def get_id_snapshot(self) -> Sequence[Row]: ...
 
-    async def get_mangas_by_ids(self, ids: list[int], can_see_nsfw: bool = False) -> Sequence[Manga]: ...
+    async def get_manga_cards_by_ids(self, ids: list[int], can_see_nsfw: bool = False) -> Sequence[Row]: ...
 
-    async def get_manga_id_gte(self, pk: int, can_see_nsfw: bool = False) -> int | None: ...
+    async def get_home_data(self) -> dict[str, Sequence[Row]]: ...
 
-    async def get_manga_gte_id(self, pk: int, can_see_nsfw: bool = False) -> Manga | None: ...
+    async def get_main_cover_sources(self, after_id: int = 0, limit: int = 500,
+                                     only_missing: bool = False) -> Sequence[Row]: ...
 
-    async def get_mangas_excluding_ids(self, exclude_ids: set[int], limit: int, can_see_nsfw: bool = False) -> Sequence[Manga]: ...
-
-    async def get_home_data(self) -> dict[str, Sequence[Manga]]: ...
+    async def set_main_cover_urls(self, urls: dict[int, str | None]) -> None: ...
 
     async def get_manga_covers(self, manga_id: int) -> Sequence[MangaCover]: ...
 
+    async def get_suggest_data(self) -> tuple[Sequence[Manga], dict[int, list[str]]]: ...
+
     async def get_manga_alt_titulos(self, manga_id: int) -> Sequence[MangaAltTitulo]: ...
@@ -70,6 +70,19 @@ class Manga(Base):
     vistas: Mapped[int] = mapped_column("MNG_VISTA", BigInteger, nullable=False, default=0)
     erotico: Mapped[bool] = mapped_column("MNG_EROTICO", Boolean, nullable=False, default=False)
     slug: Mapped[str | None] = mapped_column("MNG_SLUG", String(255), unique=True, nullable=True)
+    # Desnormalizado: URL del cover principal ya pasada al CDN (la mantiene CoverUploadService)
+    main_cover_url: Mapped[str | None] = mapped_column("MNG_MAIN_COVER_URL", String(500), nullable=True)
+
+    # Índices (columna de orden, id) para paginación keyset en GET /mangas
+    __table_args__ = (
+        Index("manga_creacion_id_idx", "MNG_CREACION", "MNG_ID"),
+        Index("manga_actualizacion_id_idx", "MNG_ACTUALIZACION", "MNG_ID"),
+        Index("manga_vista_id_idx", "MNG_VISTA", "MNG_ID"),
+        Index("manga_titulo_id_idx", "MNG_TITULO", "MNG_ID"),
+        # Búsqueda full-text (?search=), ver infrastructure/search_index.py
+        Index("manga_titulo_ft", "MNG_TITULO", mysql_prefix="FULLTEXT"),
+        Index("manga_sinopsis_ft", "MNG_SINOPSIS", mysql_prefix="FULLTEXT"),
+    )
 
     # ── Relaciones ────────────────────────────────────────────────────────────
     estado: Mapped["Estado"] = relationship("Estado", lazy="noload")             # type: ignore[name-defined]
@@ -91,6 +104,10 @@ class MangaAltTitulo(Base):
     codigo_lenguaje: Mapped[str] = mapped_column("MAT_CODIGO_LENGUAJE", String(10), nullable=False)
     vigente: Mapped[bool] = mapped_column("MAT_VIGENTE", Boolean, nullable=False, default=True)
 
+    __table_args__ = (
+        Index("manga_alt_titulo_ft", "MAT_TITULO_ALTERNATIVO", mysql_prefix="FULLTEXT"),
+    )
+
     manga: Mapped["Manga"] = relationship("Manga", back_populates="alt_titulos", lazy="noload")
 
 
@@ -9,26 +9,27 @@ La lógica de negocio reside en MangaService (Clean Architecture).
 """
 
 import logging
-from math import ceil
 from typing import Optional
 
 from fastapi import (
     APIRouter, BackgroundTasks, Depends, File, Form,
-    HTTPException, Query, UploadFile, status,
+    HTTPException, Query, Request, UploadFile, status,
 )
 
+from core.http_cache import json_response
 from core.security import get_current_user, get_optional_user
 from domains.dac.dependencies import require_dac_write, require_nsfw_access
-from domains.mangas.services import MangaService
-from domains.mangas.dependencies import get_manga_service
+from domains.mangas.services import InvalidCursor, MangaService
+from domains.mangas.dependencies import get_manga_repository, get_manga_service, refresh_after_manga_write
 
 from .schemas import (
+    B2SignBatchRequest, B2SignBatchResponse, B2SignedUrl, HomeFeed,
     MangaAltTituloCreate, MangaAltTituloRead,
     MangaAutorCreate, MangaAutorRead,
     MangaCard, MangaCardPage, MangaCoverCreate, MangaCoverRead,
     MangaCreate, MangaDetail,
     MangaTagCreate, MangaTagRead,
-    MangaUpdate, PaginationMeta,
+    MangaUpdate,
 )
 
 logger = logging.getLogger(__name__)
@@ -39,9 +40,10 @@ router = APIRouter(prefix="/mangas", tags=["Mangas"])
 
 @router.get("", response_model=MangaCardPage)
 async def list_mangas(
+    request: Request,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=24, ge=1, le=100),
-    ordering: str = Query(default="-creado_en"),
+    ordering: str | None = Query(default=None),
     search: str | None = Query(default=None),
     titulo: str | None = Query(default=None),
     estado: str | None = Query(default=None),
@@ -49,12 +51,22 @@ async def list_mangas(
     type: str | None = Query(default=None),
     autor: int | None = Query(default=None),
     vigente: bool | None = Query(default=None),
+    paginate: str = Query(default="page", pattern="^(page|cursor)$"),
+    cursor: str | None = Query(default=None),
+    with_count: bool = Query(default=False),
     can_see_nsfw: bool = Depends(require_nsfw_access),
     service: MangaService = Depends(get_manga_service),
 ):
-    items, total = await service.get_mangas_list(
-        page=page,
-        page_size=page_size,
+    """
+    Modo página (default): ?page=N, con count total.
+    Modo cursor (scroll infinito): ?paginate=cursor y luego ?cursor=<pagination.next>.
+    No usa OFFSET y no cuenta salvo ?with_count=true.
+    El count sale de un caché por filtros; `count_exact=false` si es estimado.
+    ?search= usa el índice full-text (título, títulos alternativos y sinopsis, sin
+    acentos); sin ?ordering (o con ordering=relevancia) ordena por relevancia.
+    La respuesta sale serializada del caché, con ETag (If-None-Match → 304).
+    """
+    filters = dict(
         can_see_nsfw=can_see_nsfw,
         titulo=titulo,
         estado_desc=estado,
@@ -62,14 +74,20 @@ async def list_mangas(
         tipo_serie=type,
         autor_id=autor,
         vigente=vigente,
-        ordering=ordering,
         search=search,
     )
-    pages = ceil(total / page_size) if page_size else 1
-    return MangaCardPage(
-        pagination=PaginationMeta(count=total, pages=pages, page=page, page_size=page_size),
-        results=[service.to_card(m) for m in items],
-    )
+
+    if paginate == "cursor" or cursor:
+        try:
+            body = await service.get_mangas_cursor_page(
+                cursor=cursor, page_size=page_size, ordering=ordering, with_count=with_count, **filters,
+            )
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        return json_response(request, body)
+
+    body = await service.get_mangas_list(page=page, page_size=page_size, ordering=ordering, **filters)
+    return json_response(request, body)
 
 
 @router.post("", response_model=MangaDetail, status_code=status.HTTP_201_CREATED,
@@ -98,6 +116,7 @@ async def create_manga(
         "codigo": codigo, "erotico": erotico,
     }
     manga_obj = await service.create_manga(data)
+    background_tasks.add_task(refresh_after_manga_write, manga_obj.id)
 
     # B2: inicializar carpetas y subir cover (BackgroundTask para no bloquear)
     if manga_obj.codigo:
@@ -121,8 +140,23 @@ async def random_mangas(
     """
     Equivale al action 'random' del MangaViewSet.
     """
-    items = await service.get_random_mangas(count=5, can_see_nsfw=can_see_nsfw)
-    return [service.to_card(m) for m in items]
+    return await service.get_random_mangas(count=5, can_see_nsfw=can_see_nsfw)
+
+
+# ── SUGGEST (autocompletado) ──────────────────────────────────────────────────
+
+@router.get("/suggest", response_model=list[MangaCard])
+async def suggest_mangas(
+    q: str = Query(default="", max_length=100),
+    limit: int = Query(default=8, ge=1, le=20),
+    can_see_nsfw: bool = Depends(require_nsfw_access),
+    service: MangaService = Depends(get_manga_service),
+):
+    """
+    Sugerencias mientras se tipea: prefijos y trigramas sobre título, slug y títulos
+    alternativos. Sale del índice en memoria, sin consultar la BD.
+    """
+    return service.suggest(q, limit=limit, can_see_nsfw=can_see_nsfw)
 
 
 # ── GET BY ID OR SLUG ─────────────────────────────────────────────────────────
@@ -131,21 +165,17 @@ async def random_mangas(
 @router.get("/{lookup}", response_model=MangaDetail)
 async def get_manga(
     lookup: str,
+    request: Request,
     can_see_nsfw: bool = Depends(require_nsfw_access),
     service: MangaService = Depends(get_manga_service),
 ):
     """
-    Lookup por ID numérico o por slug.
+    Lookup por ID numérico o por slug. Respuesta cacheada ya serializada, con ETag.
     """
-    manga_obj = None
-    if lookup.isdigit():
-        manga_obj = await service.get_manga_by_id(int(lookup), can_see_nsfw)
-    else:
-        manga_obj = await service.get_manga_by_slug(lookup, can_see_nsfw)
-
-    if not manga_obj:
+    body = await service.get_manga_detail(lookup, can_see_nsfw)
+    if body is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Manga no encontrado.")
-    return service.to_detail(manga_obj)
+    return json_response(request, body)
 
 
 # ── UPDATE ─────────────────────────────────────────────────────────────────────
@@ -176,6 +206,7 @@ async def update_manga(
     manga_obj = await service.update_manga(manga_id, data)
     if not manga_obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Manga no encontrado.")
+    background_tasks.add_task(refresh_after_manga_write, manga_obj.id)
 
     if cover_image and manga_obj.codigo:
         background_tasks.add_task(
@@ -200,15 +231,10 @@ async def increment_view(manga_id: int, service: MangaService = Depends(get_mang
 home_router = APIRouter(prefix="/home", tags=["Home"])
 
 
-@home_router.get("", response_model=dict)
-async def get_home(service: MangaService = Depends(get_manga_service)):
-    data = await service.get_home_data()
-    return {
-        "populars": [service.to_card(m) for m in data["populars"]],
-        "trending": [service.to_card(m) for m in data["trending"]],
-        "latest": [service.to_card(m) for m in data["latest"]],
-        "most_viewed": [service.to_card(m) for m in data["most_viewed"]],
-    }
+@home_router.get("", response_model=HomeFeed)
+async def get_home(request: Request, service: MangaService = Depends(get_manga_service)):
+    """JSON precalculado desde el caché (ver MangaService.build_home_feed), sin re-serializar."""
+    return json_response(request, await service.get_home_feed())
 
 
 # ── B2 PRESIGNED URL ─────────────────────────────────────────────────────────
@@ -232,6 +258,27 @@ async def get_presigned_url(
     return {"url": url}
 
 
+@b2_router.post("/sign-batch", response_model=B2SignBatchResponse,
+                dependencies=[Depends(get_current_user)])
+async def get_presigned_urls_batch(payload: B2SignBatchRequest):
+    """
+    Firma todas las páginas de un capítulo en una sola llamada.
+    Evita un POST /b2/sign (y un cliente S3) por archivo.
+    """
+    from infrastructure.b2_client import get_presigned_urls as _get_urls
+    keys = [f"{payload.prefix}/{name}" for name in payload.filenames]
+    urls = await _get_urls(keys, payload.content_type)
+    if urls is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudieron generar las URLs pre-firmadas.",
+        )
+    return B2SignBatchResponse(urls=[
+        B2SignedUrl(filename=name, key=key, url=urls[key])
+        for name, key in zip(payload.filenames, keys)
+    ])
+
+
 # ── Background tasks (B2 async) ───────────────────────────────────────────────
 
 async def _init_b2_folders_bg(codigo: str) -> None:
@@ -251,5 +298,6 @@ async def _upload_cover_bg(manga_id: int, codigo: str, cover_file: UploadFile) -
             service = CoverUploadService(db)
             await service.attach_cover(manga_id, codigo, cover_file)
             await db.commit()
+            await get_manga_service(get_manga_repository(db)).refresh_after_cover_change(manga_id)
     except Exception as exc:
         logger.error("Cover upload failed for manga %s: %s", codigo, exc)
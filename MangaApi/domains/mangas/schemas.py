@@ -90,6 +90,17 @@ class MangaCard(BaseModel):
     erotico: bool
 
 
+class HomeFeed(BaseModel):
+    """
+    GET /api/home. Se precalcula y se guarda ya serializado (MangaService.build_home_feed):
+    el endpoint devuelve el JSON tal cual sale del caché.
+    """
+    populars: list[MangaCard]
+    trending: list[MangaCard]
+    latest: list[MangaCard]
+    most_viewed: list[MangaCard]
+
+
 # ── MangaDetail (detalle completo) ────────────────────────────────────────────
 
 class MangaDetail(BaseModel):
@@ -193,12 +204,54 @@ class MangaTagCreate(BaseModel):
     vigente: bool = True
 
 
+# ── B2 Presigned URLs (lote) ──────────────────────────────────────────────────
+
+class B2SignBatchRequest(BaseModel):
+    """Payload para POST /b2/sign-batch: un prefijo de capítulo + N nombres de archivo."""
+    prefix: str = Field(..., min_length=1, max_length=255, examples=["chapters/dl-787f97/001"])
+    filenames: list[str] = Field(..., min_length=1, max_length=1000)
+    content_type: str = Field(default="image/webp", max_length=100)
+
+    @field_validator("prefix")
+    @classmethod
+    def validate_prefix(cls, v: str) -> str:
+        v = v.strip().strip("/")
+        if not v or ".." in v.split("/"):
+            raise ValueError("Prefijo inválido.")
+        return v
+
+    @field_validator("filenames")
+    @classmethod
+    def validate_filenames(cls, v: list[str]) -> list[str]:
+        for name in v:
+            if not name or "/" in name or "\\" in name or name in (".", ".."):
+                raise ValueError(f"Nombre de archivo inválido: {name!r}")
+        return v
+
+
+class B2SignedUrl(BaseModel):
+    filename: str
+    key: str
+    url: str
+
+
+class B2SignBatchResponse(BaseModel):
+    urls: list[B2SignedUrl]
+
+
 # ── Paginación ────────────────────────────────────────────────────────────────
 
 class PaginationMeta(BaseModel):
-    count: int
-    pages: int
-    page: int
+    """
+    Modo página: count/pages/page siempre presentes.
+    Modo cursor: `next` es el cursor opaco de la página siguiente (None = última);
+    count/pages solo si se pidió with_count, page siempre None.
+    `count_exact` es False cuando count es una estimación (MANGA_COUNT_ESTIMATE).
+    """
+    count: int | None = None
+    count_exact: bool = True
+    pages: int | None = None
+    page: int | None = None
     page_size: int
     next: str | None = None
     previous: str | None = None
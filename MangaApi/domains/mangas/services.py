@@ -1,17 +1,26 @@
 # Forcing reload
 import re
+import json
+import base64
 import logging
 import uuid
-import random
+from datetime import datetime
+from math import ceil
 from slugify import slugify
-from typing import Sequence
-import time
-from cachetools import TTLCache
+from sqlalchemy import Row
 
 from domains.mangas.interfaces import IMangaRepository
 from domains.mangas.models import Manga
-from domains.mangas.schemas import MangaDetail, MangaCard, MangaTagRead
+from domains.mangas.schemas import (
+    HomeFeed, MangaCard, MangaCardPage, MangaDetail, MangaTagRead, PaginationMeta,
+)
+from core.cache import Cache
 from core.config import settings
+from core.http_cache import JsonBody, render_json
+from infrastructure.database.manga_repository import ORDER_FIELDS, resolve_ordering
+from infrastructure.id_index import manga_id_index
+from infrastructure.suggest_index import SuggestEntry, SuggestIndex, suggest_index
+from infrastructure.view_counter import view_counter
 
 logger = logging.getLogger(__name__)
 
@@ -43,35 +52,152 @@ def normalize_cover_url(url: str | None) -> str | None:
     return url
 
 
-def get_main_cover_url(manga: Manga) -> str | None:
-    covers = manga.covers if manga.covers else []
-    main = next((c for c in covers if c.vigente and c.tipo_cover == "main"), None)
-    if not main:
-        main = next((c for c in covers if c.vigente), None)
-    if main:
-        return normalize_cover_url(main.url_imagen)
-    return None
+# Cómo se deserializa el valor de orden dentro del cursor, por tipo de la columna de
+# ORDER_FIELDS (el whitelist es el del repositorio); el resto usa el tipo mismo
+_CURSOR_DECODERS = {datetime: datetime.fromisoformat}
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginación mal formado o de otro ordenamiento."""
+
+
+def normalize_ordering(ordering: str | None) -> str:
+    """Forma canónica según resolve_ordering del repositorio (desconocidos → orden por defecto)."""
+    field, desc = resolve_ordering(ordering)
+    return f"-{field}" if desc else field
+
+
+def _decode_cursor_value(field: str, raw):
+    python_type = ORDER_FIELDS[field].type.python_type
+    return _CURSOR_DECODERS.get(python_type, python_type)(raw)
+
+
+def encode_cursor(ordering: str, manga: Manga) -> str:
+    """Cursor opaco con la posición (valor de orden, id) del último item de la página."""
+    value = getattr(manga, ordering.lstrip("-"))
+    payload = {"o": ordering, "v": value.isoformat() if isinstance(value, datetime) else value, "id": manga.id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: str) -> tuple:
+    """Returns: (valor, id) para get_mangas_keyset. Lanza InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if payload["o"] != ordering:
+            raise InvalidCursor("El cursor corresponde a otro ordenamiento.")
+        return _decode_cursor_value(ordering.lstrip("-"), payload["v"]), int(payload["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Cursor inválido.") from exc
+
+
+def _count_key(can_see_nsfw: bool, filters: dict) -> tuple:
+    """Filtros normalizados: sin vacíos, strings en minúsculas (los filtros son ILIKE), orden estable."""
+    normalized = {
+        k: v.lower() if isinstance(v, str) else v
+        for k, v in filters.items()
+        if v is not None and v != ""
+    }
+    return (can_see_nsfw, tuple(sorted(normalized.items())))
+
+
+_HOME_FEED_KEY = "feed"
 
 
 class MangaService:
     """Orquestador de casos de uso para el dominio de Mangas."""
-    _home_cache: dict = {}
-    _home_cache_time: float = 0
-    _HOME_TTL = 300  # 5 minutos
-    _list_cache = TTLCache(maxsize=128, ttl=60)  # 1 minuto
+    # Compartidos entre workers si hay Redis (core/cache.py); se invalidan en create/update.
+    # Al vencer, sirven el valor viejo `stale_ttl` segundos más mientras un request lo recalcula.
+    # Home, listado y detalle guardan la respuesta ya serializada (JsonBody, core/http_cache.py).
+    _home_cache = Cache("mangas:home", ttl=300, stale_ttl=300)    # 5 minutos, refrescado por main.py
+    _list_cache = Cache("mangas:list", ttl=60, stale_ttl=60)      # 1 minuto
+    _detail_cache = Cache("mangas:detail", ttl=300, stale_ttl=60)
+    # COUNT por set de filtros normalizado
+    _count_cache = Cache("mangas:count", ttl=settings.MANGA_COUNT_CACHE_TTL,
+                         stale_ttl=settings.MANGA_COUNT_CACHE_TTL)
 
     def __init__(self, repo: IMangaRepository):
         self.repo = repo
 
-    async def get_mangas_list(self, **kwargs):
-        """Obtiene la lista de mangas y la cantidad total con caché."""
-        cache_key = frozenset(kwargs.items())
-        if cache_key in self._list_cache:
-            return self._list_cache[cache_key]
-
-        result = await self.repo.get_mangas(**kwargs)
-        self._list_cache[cache_key] = result
-        return result
+    async def get_total(self, can_see_nsfw: bool = False, **filters) -> tuple[int, bool]:
+        """
+        Total de mangas para un set de filtros, desde _count_cache si está.
+        Sin filtros y con MANGA_COUNT_ESTIMATE, usa las estadísticas de la tabla.
+        Returns: (total, exacto)
+        """
+        key = _count_key(can_see_nsfw, filters)
+
+        async def count() -> tuple[int, bool]:
+            if settings.MANGA_COUNT_ESTIMATE and can_see_nsfw and not key[1]:
+                estimate = await self.repo.estimate_total_count()
+                if estimate is not None:
+                    return estimate, False
+            return await self.repo.count_mangas(can_see_nsfw=can_see_nsfw, **filters), True
+
+        return await self._count_cache.get_or_set(key, count)
+
+    async def get_mangas_list(self, page: int = 1, page_size: int = 24, ordering: str | None = None,
+                              can_see_nsfw: bool = False, **filters) -> JsonBody:
+        """
+        Página de GET /api/mangas (modo página) ya serializada, con caché.
+        Returns: JsonBody de un MangaCardPage
+        """
+        cache_key = {"page": page, "page_size": page_size, "ordering": ordering,
+                     "can_see_nsfw": can_see_nsfw, **filters}
+
+        async def load() -> JsonBody:
+            total, exact = await self.get_total(can_see_nsfw=can_see_nsfw, **filters)
+            items, _ = await self.repo.get_manga_cards(
+                page=page, page_size=page_size, ordering=ordering, can_see_nsfw=can_see_nsfw,
+                with_count=False, **filters,
+            )
+            pages = ceil(total / page_size) if page_size else 1
+            return render_json(MangaCardPage(
+                pagination=PaginationMeta(count=total, count_exact=exact, pages=pages,
+                                          page=page, page_size=page_size),
+                results=[self.row_to_card(r) for r in items],
+            ))
+
+        return await self._list_cache.get_or_set(cache_key, load)
+
+    async def get_mangas_cursor_page(
+        self,
+        cursor: str | None = None,
+        page_size: int = 24,
+        ordering: str | None = None,
+        with_count: bool = False,
+        **filters,
+    ) -> JsonBody:
+        """
+        Página en modo cursor (keyset) ya serializada. `cursor` es el `next` de la
+        página anterior (None = primera página). Lanza InvalidCursor antes de ir al caché.
+        """
+        ordering = normalize_ordering(ordering)
+        after = decode_cursor(cursor, ordering) if cursor else None
+
+        cache_key = {"cursor": cursor, "page_size": page_size, "ordering": ordering,
+                     "with_count": with_count, **filters}
+
+        async def load() -> JsonBody:
+            count, exact = await self.get_total(**filters) if with_count else (None, True)
+            items, has_more, _ = await self.repo.get_manga_cards_keyset(
+                limit=page_size, after=after, ordering=ordering, **filters,
+            )
+            next_cursor = encode_cursor(ordering, items[-1]) if has_more and items else None
+            return render_json(MangaCardPage(
+                pagination=PaginationMeta(
+                    count=count,
+                    count_exact=exact,
+                    pages=ceil(count / page_size) if count is not None else None,
+                    page_size=page_size,
+                    next=next_cursor,
+                ),
+                results=[self.row_to_card(r) for r in items],
+            ))
+
+        return await self._list_cache.get_or_set(cache_key, load)
 
     async def get_manga_by_id(self, manga_id: int, can_see_nsfw: bool = False) -> Manga | None:
         return await self.repo.get_manga_by_id(manga_id, can_see_nsfw)
@@ -79,6 +205,17 @@ class MangaService:
     async def get_manga_by_slug(self, slug: str, can_see_nsfw: bool = False) -> Manga | None:
         return await self.repo.get_manga_by_slug(slug, can_see_nsfw)
 
+    async def get_manga_detail(self, lookup: str, can_see_nsfw: bool = False) -> JsonBody | None:
+        """Detalle por ID numérico o slug, ya serializado. None (no cacheado) si no existe."""
+        async def load() -> JsonBody | None:
+            if lookup.isdigit():
+                manga = await self.get_manga_by_id(int(lookup), can_see_nsfw)
+            else:
+                manga = await self.get_manga_by_slug(lookup, can_see_nsfw)
+            return render_json(self.to_detail(manga)) if manga else None
+
+        return await self._detail_cache.get_or_set((lookup, can_see_nsfw), load)
+
     async def generate_unique_slug(self, titulo: str, exclude_id: int | None = None) -> str:
         base_slug = slugify(titulo)
         slug = base_slug
@@ -103,7 +240,9 @@ class MangaService:
             "erotico": data.get("erotico", False),
         }
         mapped["slug"] = await self.generate_unique_slug(data["titulo"])
-        return await self.repo.create_manga(mapped)
+        manga = await self.repo.create_manga(mapped)
+        await self._invalidate_listings()
+        return manga
 
     async def update_manga(self, manga_id: int, data: dict) -> Manga | None:
         mapped: dict = {}
@@ -116,67 +255,101 @@ class MangaService:
         if "titulo" in mapped:
             mapped["slug"] = await self.generate_unique_slug(mapped["titulo"], exclude_id=manga_id)
 
-        return await self.repo.update_manga(manga_id, mapped)
+        manga = await self.repo.update_manga(manga_id, mapped)
+        if manga:
+            await self._invalidate_listings()
+        return manga
+
+    async def _invalidate_listings(self) -> None:
+        """
+        Tras un alta/edición: listados, detalles y counts dejan de servir lo cacheado (todos
+        los workers). El feed de home no se invalida: el router lo re-materializa después del commit.
+        """
+        await self._count_cache.invalidate()
+        await self._list_cache.invalidate()
+        await self._detail_cache.invalidate()
+
+    async def refresh_after_write(self, manga_id: int) -> None:
+        """
+        Después del commit de un alta/edición (BackgroundTask): vuelve a invalidar, porque un
+        request concurrente pudo cachear la versión previa al commit, re-indexa el manga para
+        /suggest (recién ahora: si el commit fallaba quedaba una entrada fantasma) y
+        re-materializa home. Lo mismo con el índice de IDs de /random.
+        """
+        await self._invalidate_listings()
+        manga = await self.repo.get_manga_by_id(manga_id, can_see_nsfw=True)
+        if manga:
+            await self._index_for_suggest(manga)
+            manga_id_index.upsert(manga.id, manga.erotico)
+        await self.refresh_home_feed()
+
+    # -- Autocompletado (índice en memoria, ver infrastructure/suggest_index.py) --
+    def _suggest_entry(self, manga: Manga, alt_titulos: list[str]) -> SuggestEntry:
+        return SuggestIndex.make_entry(
+            manga.id, self.to_card(manga), manga.erotico, manga.vistas,
+            [manga.titulo, manga.slug, *alt_titulos],
+        )
 
-    async def increment_view_count(self, manga_id: int) -> int | None:
-        return await self.repo.increment_view_count(manga_id)
+    async def _index_for_suggest(self, manga: Manga) -> None:
+        alt_titulos = [a.titulo_alternativo for a in await self.repo.get_manga_alt_titulos(manga.id) if a.vigente]
+        suggest_index.upsert(self._suggest_entry(manga, alt_titulos))
+
+    async def refresh_after_cover_change(self, manga_id: int) -> None:
+        """
+        Tras subir un cover en background (ya commiteado): re-indexa, descarta las respuestas
+        cacheadas y re-materializa home (refresh_after_write corrió antes, sin el cover).
+        """
+        await self._invalidate_listings()
+        manga = await self.repo.get_manga_by_id(manga_id, can_see_nsfw=True)
+        if manga:
+            await self._index_for_suggest(manga)
+        await self.refresh_home_feed()
+
+    async def rebuild_suggest_index(self) -> int:
+        mangas, alt_titulos = await self.repo.get_suggest_data()
+        suggest_index.build(self._suggest_entry(m, alt_titulos.get(m.id, [])) for m in mangas)
+        return len(suggest_index)
+
+    def suggest(self, q: str, limit: int = 10, can_see_nsfw: bool = False) -> list[MangaCard]:
+        return suggest_index.suggest(q, limit=limit, can_see_nsfw=can_see_nsfw)
 
-    async def get_random_mangas(self, count: int = 5, can_see_nsfw: bool = False) -> list[Manga]:
-        """Lógica de selección aleatoria (sampling vs probing)."""
-        total = await self.repo.get_total_count(can_see_nsfw)
-        if total == 0:
+    async def increment_view_count(self, manga_id: int) -> int | None:
+        """
+        Suma la vista al buffer (infrastructure/view_counter.py) y devuelve el total
+        aproximado. Solo la primera vista de un manga en el worker consulta la BD.
+        Con VIEW_COUNT_FLUSH_INTERVAL = 0 escribe cada vista directo (UPDATE + SELECT).
+        """
+        if settings.VIEW_COUNT_FLUSH_INTERVAL <= 0:
+            return await self.repo.increment_view_count(manga_id)
+        if not view_counter.known(manga_id):
+            vistas = await self.repo.get_view_count(manga_id)
+            if vistas is None:
+                return None
+            view_counter.remember(manga_id, vistas)
+        return view_counter.add(manga_id)
+
+    async def get_random_mangas(self, count: int = 5, can_see_nsfw: bool = False) -> list[MangaCard]:
+        """Muestreo uniforme sobre el índice de IDs en memoria + una sola query de cards."""
+        if manga_id_index.is_stale(settings.RANDOM_ID_INDEX_TTL):
+            manga_id_index.build(await self.repo.get_id_snapshot())
+        ids = manga_id_index.sample(count, can_see_nsfw)
+        if not ids:
             return []
+        rows = {r.id: r for r in await self.repo.get_manga_cards_by_ids(ids, can_see_nsfw)}
+        return [self.row_to_card(rows[i]) for i in ids if i in rows]
 
-        if total < 100000:
-            all_ids = await self.repo.get_all_ids(can_see_nsfw)
-            sample_ids = random.sample(list(all_ids), min(count, len(all_ids)))
-            return list(await self.repo.get_mangas_by_ids(sample_ids, can_see_nsfw))
-
-        max_id = await self.repo.get_max_id(can_see_nsfw)
-        if not max_id:
-            return []
+    # -- Home (feed precalculado) --
+    async def build_home_feed(self) -> JsonBody:
+        """Arma el feed de /home y lo serializa una sola vez (JSON de HomeFeed)."""
+        data = await self.repo.get_home_data()
+        return render_json(HomeFeed(**{section: [self.row_to_card(r) for r in rows] for section, rows in data.items()}))
 
-        selected_ids: set[int] = set()
-        visited_ids: set[int] = set()
-        attempts = 0
-        max_attempts = 20
+    async def get_home_feed(self) -> JsonBody:
+        """Normalmente un hit: el feed lo mantiene refresh_home_feed (startup, periódico)."""
+        return await self._home_cache.get_or_set(_HOME_FEED_KEY, self.build_home_feed)
 
-        while len(selected_ids) < count and attempts < max_attempts:
-            pk = random.randint(1, max_id)
-            if pk in visited_ids:
-                attempts += 1
-                continue
-            visited_ids.add(pk)
-
-            # Usar la query rápida que solo trae el ID
-            manga_id = await self.repo.get_manga_id_gte(pk, can_see_nsfw)
-            if manga_id and manga_id not in selected_ids:
-                selected_ids.add(manga_id)
-            attempts += 1
-
-        selected: list[Manga] = []
-        if selected_ids:
-            # Traer todas las instancias y relaciones en una sola query optimizada
-            mangas_result = await self.repo.get_mangas_by_ids(list(selected_ids), can_see_nsfw)
-            selected.extend(list(mangas_result))
-
-        if len(selected) < count:
-            exclude_ids = {m.id for m in selected}
-            needed = count - len(selected)
-            extras = await self.repo.get_mangas_excluding_ids(exclude_ids, needed, can_see_nsfw)
-            selected.extend(list(extras))
-
-        return selected
-
-    async def get_home_data(self) -> dict[str, Sequence[Manga]]:
-        now = time.time()
-        if self._home_cache and (now - MangaService._home_cache_time < MangaService._HOME_TTL):
-            return self._home_cache
-            
-        data = await self.repo.get_home_data()
-        MangaService._home_cache = data
-        MangaService._home_cache_time = now
-        return data
+    async def refresh_home_feed(self) -> None:
+        await self._home_cache.set(_HOME_FEED_KEY, await self.build_home_feed())
 
     # -- Pydantic Mappers --
     def to_detail(self, manga: Manga) -> MangaDetail:
@@ -190,7 +363,7 @@ class MangaService:
             demografia=manga.demografia_id,
             demografia_display=manga.demografia.descripcion if manga.demografia else None,
             dem_color=manga.demografia.color if manga.demografia else None,
-            cover_url=get_main_cover_url(manga),
+            cover_url=manga.main_cover_url,
             autor=manga.autor_id,
             autor_display=manga.autor.nombre if manga.autor else None,
             fecha_lanzamiento=manga.fecha_lanzamiento,
@@ -213,13 +386,17 @@ class MangaService:
             ] if manga.manga_tags else [],
         )
 
+    def row_to_card(self, row: Row) -> MangaCard:
+        """Fila de las queries de cards del repositorio (columnas con los nombres de MangaCard)."""
+        return MangaCard(**row._mapping)
+
     def to_card(self, manga: Manga) -> MangaCard:
         return MangaCard(
             id=manga.id,
             slug=manga.slug,
             titulo=manga.titulo,
             tipo_serie=manga.tipo_serie,
-            cover_url=get_main_cover_url(manga),
+            cover_url=manga.main_cover_url,
             demografia=manga.demografia_id,
             demografia_display=manga.demografia.descripcion if manga.demografia else None,
             dem_color=manga.demografia.color if manga.demografia else None,
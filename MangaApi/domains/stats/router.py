@@ -11,6 +11,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 
+from core.cache import cache_stats
 from core.config import settings
 from core.security import get_current_user, require_staff
 
@@ -125,6 +126,7 @@ async def get_stats():
         "avg_response_time": avg_response_time,
         "response_count": response_count,
         "endpoints_ranked": endpoints_ranked,
+        "cache": cache_stats(),
     }
     stats["recommendations"] = _get_recommendations(stats)
     return stats
@@ -6,31 +6,76 @@ Reemplaza b2_service.py (boto3 síncrono).
 
 MEJORA CRÍTICA: El upload a B2 ya no bloquea el event loop de FastAPI.
 aiobotocore es el wrapper async oficial de botocore.
+
+Cliente compartido: `init_s3_client()` / `close_s3_client()` se llaman desde el
+lifespan de main.py. Todas las operaciones reutilizan ese cliente (y su pool
+TLS keep-alive). Fuera de la app (scripts, alembic) se crea uno efímero.
 """
 
 import logging
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any
 
-import aiobotocore.session
+from aiobotocore.config import AioConfig
 from aiobotocore.session import get_session
 
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Cliente S3 del proceso (uno por worker de uvicorn)
+_client: Any = None
+_client_stack: AsyncExitStack | None = None
 
-@asynccontextmanager
-async def _get_s3_client():
-    """Context manager que provee un cliente S3 async para una operación."""
+
+def _create_client_cm():
     session = get_session()
-    async with session.create_client(
+    return session.create_client(
         "s3",
         endpoint_url=settings.B2_ENDPOINT_URL,
         aws_access_key_id=settings.B2_KEY_ID,
         aws_secret_access_key=settings.B2_APPLICATION_KEY,
         region_name="us-east-005",
-    ) as client:
+        config=AioConfig(
+            max_pool_connections=settings.B2_MAX_POOL_CONNECTIONS,
+            connector_args={"keepalive_timeout": settings.B2_KEEPALIVE_TIMEOUT},
+        ),
+    )
+
+
+async def init_s3_client() -> None:
+    """Crea el cliente S3 compartido. Llamar una vez en el startup."""
+    global _client, _client_stack
+    if _client is not None:
+        return
+    stack = AsyncExitStack()
+    _client = await stack.enter_async_context(_create_client_cm())
+    _client_stack = stack
+    logger.info(
+        "Cliente S3 (B2) inicializado (pool=%d, keepalive=%ss).",
+        settings.B2_MAX_POOL_CONNECTIONS, settings.B2_KEEPALIVE_TIMEOUT,
+    )
+
+
+async def close_s3_client() -> None:
+    """Cierra el cliente compartido y su pool de conexiones. Llamar en el shutdown."""
+    global _client, _client_stack
+    if _client_stack is not None:
+        await _client_stack.aclose()
+    _client = None
+    _client_stack = None
+
+
+@asynccontextmanager
+async def _get_s3_client():
+    """
+    Provee el cliente S3 compartido.
+    Si no fue inicializado (uso fuera del lifespan), crea uno para esta operación.
+    """
+    if _client is not None:
+        yield _client
+        return
+    async with _create_client_cm() as client:
         yield client
 
 
@@ -56,6 +101,33 @@ async def get_presigned_url(file_path: str, content_type: str = "image/webp") ->
         return None
 
 
+async def get_presigned_urls(
+    keys: list[str], content_type: str = "image/webp"
+) -> dict[str, str] | None:
+    """
+    Genera URLs pre-firmadas PUT para varias keys con un único cliente.
+    La firma es local (HMAC), no hay round trip a B2 por key.
+    Retorna {key: url} o None si falla.
+    """
+    try:
+        async with _get_s3_client() as s3:
+            urls: dict[str, str] = {}
+            for key in keys:
+                urls[key] = await s3.generate_presigned_url(
+                    "put_object",
+                    Params={
+                        "Bucket": settings.B2_BUCKET_NAME,
+                        "Key": key,
+                        "ContentType": content_type,
+                    },
+                    ExpiresIn=3600,
+                )
+        return urls
+    except Exception as exc:
+        logger.error("Error generando presigned URLs en lote (%d keys): %s", len(keys), exc)
+        return None
+
+
 async def initialize_manga_folders(serie_code: str) -> bool:
     """
     Crea carpetas virtuales en B2 subiendo un archivo .keep vacío.
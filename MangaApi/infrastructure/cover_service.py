@@ -52,11 +52,13 @@ class CoverUploadService:
           2. Subir a B2 async
           3. Desactivar covers 'main' previas
           4. Crear nuevo registro manga_cover
+          5. Actualizar apicore_manga.MNG_MAIN_COVER_URL (desnormalizada, ya en el CDN)
 
         Raises:
             CoverUploadError: si B2 falla o el archivo es inválido.
         """
-        from domains.mangas.models import MangaCover
+        from domains.mangas.models import Manga, MangaCover
+        from domains.mangas.services import normalize_cover_url
         from sqlalchemy import update
 
         # ── Validaciones de seguridad (recomendado en migration plan) ─────────
@@ -104,5 +106,12 @@ class CoverUploadService:
             vigente=True,
         )
         self.db.add(new_cover)
+        await self.db.execute(
+            update(Manga)
+            .where(Manga.id == manga_id)
+            # Sin tocar MNG_ACTUALIZACION (como set_main_cover_urls): subir un cover no
+            # reordena "últimos actualizados" ni invalida cursores por actualizado_en
+            .values(main_cover_url=normalize_cover_url(url), actualizado_en=Manga.actualizado_en)
+        )
         await self.db.flush()
         logger.info("Cover subida exitosamente para manga_id=%s: %s", manga_id, url)
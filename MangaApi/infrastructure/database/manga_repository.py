@@ -1,11 +1,57 @@
-from typing import Sequence
-from sqlalchemy import func, select, update
+from typing import Any, Sequence
+from sqlalchemy import Row, and_, case, false, func, literal_column, or_, select, text, union_all, update
+from sqlalchemy.dialects.mysql import match
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import aliased, selectinload, joinedload
 
+from core.config import settings
 from domains.mangas.interfaces import IMangaRepository
 from domains.mangas.models import Manga, MangaAltTitulo, MangaCover, MangaAutor, MangaTag
 from domains.catalog.models import Estado, Demografia
+from infrastructure.search_index import (
+    WEIGHT_ALT_TITULO, WEIGHT_SINOPSIS, WEIGHT_TITULO,
+    boolean_query, get_memory_index, invalidate_memory_index, search_terms,
+)
+
+
+# Columnas por las que se puede ordenar el listado. Todas NOT NULL, y MNG_ID desempata
+# para que el orden sea total (requisito de la paginación keyset).
+ORDER_FIELDS = {
+    "creado_en": Manga.creado_en,
+    "actualizado_en": Manga.actualizado_en,
+    "vistas": Manga.vistas,
+    "titulo": Manga.titulo,
+}
+DEFAULT_ORDERING = "-creado_en"
+# Con `search`, ordering vacío o "relevancia" ordena por score (solo modo página)
+RELEVANCE_ORDERING = "relevancia"
+_SEARCH_HITS = "manga_search_hits"
+
+
+def resolve_ordering(ordering: str | None) -> tuple[str, bool]:
+    """'-vistas' → ('vistas', True). Valores desconocidos caen al orden por defecto."""
+    ordering = ordering or DEFAULT_ORDERING
+    field, desc = ordering.lstrip("-"), ordering.startswith("-")
+    if field not in ORDER_FIELDS:
+        return resolve_ordering(DEFAULT_ORDERING)
+    return field, desc
+
+
+# Joins propios de las cards: los filtros por estado/demografía hacen su propio join
+_CardEstado = aliased(Estado)
+_CardDemografia = aliased(Demografia)
+
+
+def _main_cover_url():
+    """Cover principal según apicore_manga_cover: el primer 'main' vigente, si no el primer vigente."""
+    return (
+        select(MangaCover.url_imagen)
+        .where(MangaCover.manga_id == Manga.id, MangaCover.vigente == True)  # noqa: E712
+        .order_by(case((MangaCover.tipo_cover == "main", 0), else_=1), MangaCover.id)
+        .limit(1)
+        .correlate(Manga)
+        .scalar_subquery()
+    )
 
 
 class MangaRepository(IMangaRepository):
@@ -21,7 +67,6 @@ class MangaRepository(IMangaRepository):
                 joinedload(Manga.estado),
                 joinedload(Manga.demografia),
                 joinedload(Manga.autor),
-                selectinload(Manga.covers),
                 selectinload(Manga.manga_tags).joinedload(MangaTag.tag),
             )
         )
@@ -29,10 +74,38 @@ class MangaRepository(IMangaRepository):
             q = q.where(Manga.erotico == False)  # noqa: E712
         return q
 
-    async def get_mangas(
+    def _card_query(self, can_see_nsfw: bool = False):
+        """
+        Solo las columnas de MangaCard (con sus nombres), sin entidades ORM ni relaciones.
+        El cover sale de MNG_MAIN_COVER_URL. creado_en/actualizado_en van para el cursor keyset.
+        """
+        q = (
+            select(
+                Manga.id.label("id"),
+                Manga.slug.label("slug"),
+                Manga.titulo.label("titulo"),
+                Manga.tipo_serie.label("tipo_serie"),
+                Manga.demografia_id.label("demografia"),
+                _CardDemografia.descripcion.label("demografia_display"),
+                _CardDemografia.color.label("dem_color"),
+                _CardEstado.descripcion.label("estado_display"),
+                Manga.vistas.label("vistas"),
+                Manga.erotico.label("erotico"),
+                Manga.creado_en.label("creado_en"),
+                Manga.actualizado_en.label("actualizado_en"),
+                Manga.main_cover_url.label("cover_url"),
+            )
+            .select_from(Manga)
+            .outerjoin(_CardEstado, Manga.estado_id == _CardEstado.id)
+            .outerjoin(_CardDemografia, Manga.demografia_id == _CardDemografia.id)
+        )
+        if not can_see_nsfw:
+            q = q.where(Manga.erotico == False)  # noqa: E712
+        return q
+
+    def _apply_list_filters(
         self,
-        page: int = 1,
-        page_size: int = 24,
+        q,
         can_see_nsfw: bool = False,
         titulo: str | None = None,
         estado_desc: str | None = None,
@@ -43,11 +116,7 @@ class MangaRepository(IMangaRepository):
         fecha_to: str | None = None,
         vigente: bool | None = None,
         erotico: bool | None = None,
-        ordering: str = "-creado_en",
-        search: str | None = None,
-    ) -> tuple[Sequence[Manga], int]:
-        q = self._manga_base_query(can_see_nsfw)
-
+    ):
         if titulo:
             q = q.where(Manga.titulo.ilike(f"%{titulo}%"))
         if estado_desc:
@@ -70,30 +139,174 @@ class MangaRepository(IMangaRepository):
             q = q.where(Manga.vigente == vigente)
         if erotico is not None and can_see_nsfw:
             q = q.where(Manga.erotico == erotico)
+        return q
 
-        if search:
-            q = q.where(
-                Manga.titulo.ilike(f"%{search}%") | Manga.sinopsis.ilike(f"%{search}%")
-            )
+    async def _filtered(self, q, can_see_nsfw: bool = False, search: str | None = None, **filters):
+        """
+        Filtros del listado + búsqueda. Returns: (query, score | None); `score` es la
+        expresión de relevancia cuando la búsqueda pasó por el índice full-text.
+        """
+        q = self._apply_list_filters(q, can_see_nsfw, **filters)
+        if not search:
+            return q, None
 
-        _ORDER_MAP = {
-            "vistas": Manga.vistas,
-            "-vistas": Manga.vistas.desc(),
-            "titulo": Manga.titulo,
-            "-titulo": Manga.titulo.desc(),
-            "creado_en": Manga.creado_en,
-            "-creado_en": Manga.creado_en.desc(),
-            "actualizado_en": Manga.actualizado_en,
-            "-actualizado_en": Manga.actualizado_en.desc(),
-        }
-        order_col = _ORDER_MAP.get(ordering, Manga.creado_en.desc())
-        q = q.order_by(order_col)
+        terms = search_terms(search)
+        if not terms:
+            # Solo términos más cortos que el mínimo del índice: substring como antes
+            return q.where(Manga.titulo.ilike(f"%{search}%") | Manga.sinopsis.ilike(f"%{search}%")), None
+
+        if self.db.bind.dialect.name == "mysql":
+            hits = self._fulltext_hits(terms)
+            return q.join(hits, hits.c.manga_id == Manga.id), literal_column(f"{_SEARCH_HITS}.score")
+
+        scores = dict(await self._memory_hits(terms))
+        if not scores:
+            return q.where(false()), None
+        return q.where(Manga.id.in_(scores)), case(scores, value=Manga.id)
+
+    @staticmethod
+    def _fulltext_hits(terms: list[str]):
+        """
+        (manga_id, score) con MATCH ... AGAINST; cada rama usa su propio índice FULLTEXT.
+        Cada rama trae los mangas con algún término y una marca por término; el HAVING
+        se queda con los que tienen todos entre los tres campos (como _memory_hits).
+        """
+        against = boolean_query(terms)
 
+        def ft(col, query=against):
+            return match(col, against=query).in_boolean_mode()
+
+        def branch(manga_id, col, weight, *where):
+            flags = [case((ft(col, boolean_query([t])) > 0, 1), else_=0).label(f"t{i}")
+                     for i, t in enumerate(terms)]
+            return select(manga_id.label("manga_id"), (ft(col) * weight).label("score"), *flags) \
+                .where(ft(col), *where)
+
+        branches = union_all(
+            branch(Manga.id, Manga.titulo, WEIGHT_TITULO),
+            branch(MangaAltTitulo.manga_id, MangaAltTitulo.titulo_alternativo, WEIGHT_ALT_TITULO,
+                   MangaAltTitulo.vigente == True),  # noqa: E712
+            branch(Manga.id, Manga.sinopsis, WEIGHT_SINOPSIS),
+        ).subquery()
+        return (
+            select(branches.c.manga_id, func.sum(branches.c.score).label("score"))
+            .group_by(branches.c.manga_id)
+            .having(and_(*(func.max(branches.c[f"t{i}"]) == 1 for i in range(len(terms)))))
+            .subquery(_SEARCH_HITS)
+        )
+
+    async def _memory_hits(self, terms: list[str]) -> list[tuple[int, float]]:
+        """Equivalente a _fulltext_hits con el índice en memoria (motores sin FULLTEXT)."""
+        index = get_memory_index()
+        if index.is_stale(settings.SEARCH_INDEX_TTL):
+            mangas = (await self.db.execute(select(Manga.id, Manga.titulo, Manga.sinopsis))).all()
+            alts = (await self.db.execute(
+                select(MangaAltTitulo.manga_id, MangaAltTitulo.titulo_alternativo)
+                .where(MangaAltTitulo.vigente == True)  # noqa: E712
+            )).all()
+            index.build([
+                *((mid, WEIGHT_TITULO, titulo) for mid, titulo, _ in mangas),
+                *((mid, WEIGHT_SINOPSIS, sinopsis) for mid, _, sinopsis in mangas),
+                *((mid, WEIGHT_ALT_TITULO, alt) for mid, alt in alts),
+            ])
+        return index.search(terms)
+
+    @staticmethod
+    def _order_by(q, field: str, desc: bool):
+        col = ORDER_FIELDS[field]
+        if desc:
+            return q.order_by(col.desc(), Manga.id.desc())
+        return q.order_by(col.asc(), Manga.id.asc())
+
+    async def _count(self, q) -> int:
         count_q = q.with_only_columns(func.count(Manga.id)).order_by(None)
-        total = await self.db.scalar(count_q)
+        return await self.db.scalar(count_q) or 0
+
+    async def get_manga_cards(
+        self,
+        page: int = 1,
+        page_size: int = 24,
+        can_see_nsfw: bool = False,
+        titulo: str | None = None,
+        estado_desc: str | None = None,
+        demografia_desc: str | None = None,
+        tipo_serie: str | None = None,
+        autor_id: int | None = None,
+        fecha_from: str | None = None,
+        fecha_to: str | None = None,
+        vigente: bool | None = None,
+        erotico: bool | None = None,
+        ordering: str | None = DEFAULT_ORDERING,
+        search: str | None = None,
+        with_count: bool = True,
+    ) -> tuple[Sequence[Row], int | None]:
+        """
+        Filas de card (ver _card_query) de una página del listado.
+        with_count=False omite el COUNT (el service lo tiene cacheado) y devuelve total None.
+        Con `search` y sin ordering explícito (o "relevancia") ordena por relevancia.
+        """
+        q, score = await self._filtered(
+            self._card_query(can_see_nsfw), can_see_nsfw,
+            titulo=titulo, estado_desc=estado_desc, demografia_desc=demografia_desc,
+            tipo_serie=tipo_serie, autor_id=autor_id, fecha_from=fecha_from, fecha_to=fecha_to,
+            vigente=vigente, erotico=erotico, search=search,
+        )
+        if score is not None and ordering in (None, "", RELEVANCE_ORDERING):
+            q = q.order_by(score.desc(), Manga.id.desc())
+        else:
+            q = self._order_by(q, *resolve_ordering(ordering))
+
+        total = await self._count(q) if with_count else None
         skip = (page - 1) * page_size
         result = await self.db.execute(q.offset(skip).limit(page_size))
-        return result.unique().scalars().all(), total or 0
+        return result.all(), total
+
+    async def get_manga_cards_keyset(
+        self,
+        limit: int = 24,
+        after: tuple[Any, int] | None = None,
+        with_count: bool = False,
+        can_see_nsfw: bool = False,
+        ordering: str = DEFAULT_ORDERING,
+        **filters,
+    ) -> tuple[Sequence[Row], bool, int | None]:
+        """
+        Paginación keyset: filas de card estrictamente posteriores a `after` = (valor, id)
+        en el orden activo. Sin OFFSET ni COUNT (salvo with_count).
+        Returns: (items, has_more, total | None)
+        """
+        field, desc = resolve_ordering(ordering)
+        q, _ = await self._filtered(self._card_query(can_see_nsfw), can_see_nsfw, **filters)
+        total = await self._count(q) if with_count else None
+
+        if after is not None:
+            col, (value, last_id) = ORDER_FIELDS[field], after
+            if desc:
+                q = q.where(or_(col < value, and_(col == value, Manga.id < last_id)))
+            else:
+                q = q.where(or_(col > value, and_(col == value, Manga.id > last_id)))
+
+        q = self._order_by(q, field, desc).limit(limit + 1)
+        items = (await self.db.execute(q)).all()
+        return items[:limit], len(items) > limit, total
+
+    async def count_mangas(self, can_see_nsfw: bool = False, **filters) -> int:
+        q, _ = await self._filtered(select(Manga.id), can_see_nsfw, **filters)
+        if not can_see_nsfw:
+            q = q.where(Manga.erotico == False)  # noqa: E712
+        return await self._count(q)
+
+    async def estimate_total_count(self) -> int | None:
+        """
+        Filas de apicore_manga según las estadísticas de InnoDB (sin escanear la tabla).
+        Solo MySQL; None si el motor no lo soporta.
+        """
+        if self.db.bind.dialect.name != "mysql":
+            return None
+        return await self.db.scalar(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {"table": Manga.__tablename__})
 
     async def get_manga_by_id(self, manga_id: int, can_see_nsfw: bool = False) -> Manga | None:
         q = self._manga_base_query(can_see_nsfw).where(Manga.id == manga_id)
@@ -109,6 +322,7 @@ class MangaRepository(IMangaRepository):
         obj = Manga(**data)
         self.db.add(obj)
         await self.db.flush()
+        invalidate_memory_index()
         return await self.get_manga_by_id(obj.id, can_see_nsfw=True)  # type: ignore
 
     async def update_manga(self, manga_id: int, data: dict) -> Manga | None:
@@ -119,6 +333,7 @@ class MangaRepository(IMangaRepository):
             if v is not None:
                 setattr(obj, k, v)
         await self.db.flush()
+        invalidate_memory_index()
         return await self.get_manga_by_id(manga_id, can_see_nsfw=True)
 
     async def increment_view_count(self, manga_id: int) -> int | None:
@@ -127,91 +342,92 @@ class MangaRepository(IMangaRepository):
             .where(Manga.id == manga_id)
             .values(vistas=Manga.vistas + 1)
         )
+        return await self.get_view_count(manga_id)
+
+    async def get_view_count(self, manga_id: int) -> int | None:
         result = await self.db.execute(select(Manga.vistas).where(Manga.id == manga_id))
         return result.scalar_one_or_none()
 
-    # -- Primitivas para lógica aleatoria --
-    async def get_total_count(self, can_see_nsfw: bool = False) -> int:
-        q = select(Manga.id)
-        if not can_see_nsfw:
-            q = q.where(Manga.erotico == False)
-        return await self.db.scalar(select(func.count()).select_from(q.subquery())) or 0
-
-    async def get_max_id(self, can_see_nsfw: bool = False) -> int | None:
-        q = select(func.max(Manga.id))
-        if not can_see_nsfw:
-            q = q.where(Manga.erotico == False)
-        return await self.db.scalar(q)
-
-    async def get_all_ids(self, can_see_nsfw: bool = False) -> Sequence[int]:
-        q = select(Manga.id)
-        if not can_see_nsfw:
-            q = q.where(Manga.erotico == False)
-        result = await self.db.execute(q)
-        return result.scalars().all()
-
-    async def get_mangas_by_ids(self, ids: list[int], can_see_nsfw: bool = False) -> Sequence[Manga]:
-        q = (
-            select(Manga)
-            .options(
-                joinedload(Manga.estado),
-                joinedload(Manga.demografia),
-                joinedload(Manga.covers),
-            )
+    async def add_view_counts(self, deltas: dict[int, int]) -> dict[int, int]:
+        """Un UPDATE para todo el lote: MNG_VISTA + CASE MNG_ID WHEN ... Returns: {id: vistas}."""
+        ids = sorted(deltas)
+        await self.db.execute(
+            update(Manga)
             .where(Manga.id.in_(ids))
+            .values(vistas=Manga.vistas + case(deltas, value=Manga.id, else_=0))
         )
-        if not can_see_nsfw:
-            q = q.where(Manga.erotico == False)
-        result = await self.db.execute(q)
-        return result.unique().scalars().all()
-
-    async def get_manga_id_gte(self, pk: int, can_see_nsfw: bool = False) -> int | None:
-        q = select(Manga.id)
-        if not can_see_nsfw:
-            q = q.where(Manga.erotico == False)
-        q = q.where(Manga.id >= pk).order_by(Manga.id).limit(1)
-        return await self.db.scalar(q)
+        result = await self.db.execute(select(Manga.id, Manga.vistas).where(Manga.id.in_(ids)))
+        return dict(result.all())
 
-    async def get_manga_gte_id(self, pk: int, can_see_nsfw: bool = False) -> Manga | None:
-        q = self._manga_base_query(can_see_nsfw).where(Manga.id >= pk).order_by(Manga.id).limit(1)
-        result = await self.db.execute(q)
-        return result.scalar_one_or_none()
+    # -- Random --
+    async def get_id_snapshot(self) -> Sequence[Row]:
+        """(id, erotico) de todos los mangas, por id: lo que necesita el índice de /random."""
+        result = await self.db.execute(select(Manga.id, Manga.erotico).order_by(Manga.id))
+        return result.all()
 
-    async def get_mangas_excluding_ids(self, exclude_ids: set[int], limit: int, can_see_nsfw: bool = False) -> Sequence[Manga]:
-        q = self._manga_base_query(can_see_nsfw).where(Manga.id.notin_(exclude_ids)).limit(limit)
-        result = await self.db.execute(q)
-        return result.scalars().all()
+    async def get_manga_cards_by_ids(self, ids: list[int], can_see_nsfw: bool = False) -> Sequence[Row]:
+        result = await self.db.execute(self._card_query(can_see_nsfw).where(Manga.id.in_(ids)))
+        return result.all()
 
     # -- Home --
-    async def get_home_data(self) -> dict[str, Sequence[Manga]]:
-        base_q = (
-            select(Manga)
-            .options(
-                joinedload(Manga.estado),
-                joinedload(Manga.demografia),
-                joinedload(Manga.covers),
-            )
-            .where(Manga.vigente == True, Manga.erotico == False)  # noqa: E712
-        )
+    async def get_home_data(self) -> dict[str, Sequence[Row]]:
+        """
+        Filas de card de cada sección. Populars y most_viewed son el mismo orden
+        (vistas desc): salen de una sola query.
+        """
+        base_q = self._card_query().where(Manga.vigente == True)  # noqa: E712
 
-        populars = (await self.db.execute(base_q.order_by(Manga.vistas.desc()).limit(12))).unique().scalars().all()
-        trending = (await self.db.execute(base_q.order_by(Manga.creado_en.desc()).limit(8))).unique().scalars().all()
-        latest = (await self.db.execute(base_q.order_by(Manga.actualizado_en.desc()).limit(8))).unique().scalars().all()
-        most_viewed = (await self.db.execute(base_q.order_by(Manga.vistas.desc()).limit(30))).unique().scalars().all()
+        most_viewed = (await self.db.execute(base_q.order_by(Manga.vistas.desc(), Manga.id.desc()).limit(30))).all()
+        trending = (await self.db.execute(base_q.order_by(Manga.creado_en.desc(), Manga.id.desc()).limit(8))).all()
+        latest = (await self.db.execute(base_q.order_by(Manga.actualizado_en.desc(), Manga.id.desc()).limit(8))).all()
 
         return {
-            "populars": populars,
+            "populars": most_viewed[:12],
             "trending": trending,
             "latest": latest,
             "most_viewed": most_viewed,
         }
 
+    async def get_main_cover_sources(self, after_id: int = 0, limit: int = 500,
+                                     only_missing: bool = False) -> Sequence[Row]:
+        """(id, url cruda del cover principal) por lotes de id, para recalcular MNG_MAIN_COVER_URL."""
+        q = select(Manga.id, _main_cover_url()).where(Manga.id > after_id)
+        if only_missing:
+            q = q.where(Manga.main_cover_url.is_(None))
+        result = await self.db.execute(q.order_by(Manga.id).limit(limit))
+        return result.all()
+
+    async def set_main_cover_urls(self, urls: dict[int, str | None]) -> None:
+        """Un UPDATE por lote; no toca MNG_ACTUALIZACION (no es una edición del manga)."""
+        await self.db.execute(
+            update(Manga)
+            .where(Manga.id.in_(urls))
+            .values(main_cover_url=case(urls, value=Manga.id), actualizado_en=Manga.actualizado_en)
+        )
+
     async def get_manga_covers(self, manga_id: int) -> Sequence[MangaCover]:
         result = await self.db.execute(
             select(MangaCover).where(MangaCover.manga_id == manga_id)
         )
         return result.scalars().all()
 
+    async def get_suggest_data(self) -> tuple[Sequence[Manga], dict[int, list[str]]]:
+        """Todos los mangas (con lo necesario para la card) y sus títulos alternativos vigentes."""
+        mangas = (await self.db.execute(
+            select(Manga).options(
+                joinedload(Manga.estado),
+                joinedload(Manga.demografia),
+            )
+        )).unique().scalars().all()
+        alt_titulos: dict[int, list[str]] = {}
+        rows = await self.db.execute(
+            select(MangaAltTitulo.manga_id, MangaAltTitulo.titulo_alternativo)
+            .where(MangaAltTitulo.vigente == True)  # noqa: E712
+        )
+        for manga_id, titulo in rows:
+            alt_titulos.setdefault(manga_id, []).append(titulo)
+        return mangas, alt_titulos
+
     async def get_manga_alt_titulos(self, manga_id: int) -> Sequence[MangaAltTitulo]:
         result = await self.db.execute(
             select(MangaAltTitulo).where(MangaAltTitulo.manga_id == manga_id)
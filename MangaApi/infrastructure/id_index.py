@@ -0,0 +1,70 @@
+"""
+infrastructure/id_index.py
+==========================
+Índice compacto de IDs de mangas para GET /api/mangas/random.
+
+Dos array('q') ordenados (8 bytes por manga): todos los IDs y los no eróticos.
+Un muestreo uniforme es random.sample sobre posiciones, sin tocar la BD; después
+basta un solo get_manga_cards_by_ids. Se reconstruye desde la BD cuando tiene más
+de RANDOM_ID_INDEX_TTL segundos (como InMemorySearchIndex) y MangaService lo
+actualiza después del commit de create/update (refresh_after_write), así que cada
+worker ve sus propias altas al instante.
+"""
+
+import random
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+
+def _insert(ids: array, manga_id: int) -> None:
+    i = bisect_left(ids, manga_id)
+    if i == len(ids) or ids[i] != manga_id:
+        ids.insert(i, manga_id)
+
+
+def _remove(ids: array, manga_id: int) -> None:
+    i = bisect_left(ids, manga_id)
+    if i < len(ids) and ids[i] == manga_id:
+        del ids[i]
+
+
+class MangaIdIndex:
+    """No es thread-safe: se usa desde el event loop del worker."""
+
+    def __init__(self):
+        self._all = array("q")
+        self._sfw = array("q")
+        self.built_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def is_stale(self, ttl: float) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+    def build(self, rows: Iterable[tuple[int, bool]]) -> None:
+        """rows: (manga_id, erotico) ordenados por id."""
+        all_ids, sfw_ids = array("q"), array("q")
+        for manga_id, erotico in rows:
+            all_ids.append(manga_id)
+            if not erotico:
+                sfw_ids.append(manga_id)
+        self._all, self._sfw = all_ids, sfw_ids
+        self.built_at = time.monotonic()
+
+    def upsert(self, manga_id: int, erotico: bool) -> None:
+        _insert(self._all, manga_id)
+        if erotico:
+            _remove(self._sfw, manga_id)
+        else:
+            _insert(self._sfw, manga_id)
+
+    def sample(self, k: int, can_see_nsfw: bool = False) -> list[int]:
+        """Hasta `k` IDs distintos, uniformes entre los visibles."""
+        ids = self._all if can_see_nsfw else self._sfw
+        return [ids[i] for i in random.sample(range(len(ids)), min(k, len(ids)))]
+
+
+manga_id_index = MangaIdIndex()
@@ -0,0 +1,120 @@
+"""
+infrastructure/search_index.py
+==============================
+Búsqueda full-text de mangas (parámetro `search` de GET /api/mangas).
+
+  - MySQL: índices FULLTEXT sobre MNG_TITULO, MNG_SINOPSIS y MAT_TITULO_ALTERNATIVO
+    (migración 0003). El repositorio arma la query BOOLEAN MODE con boolean_query().
+    Un manga matchea si contiene todos los términos, aunque estén repartidos entre
+    campos (uno en el título y otro en la sinopsis): igual que InMemorySearchIndex.
+    La insensibilidad a acentos la da la collation *_ai_ci de las columnas.
+  - Otros motores (SQLite en desarrollo): InMemorySearchIndex, un índice invertido
+    en proceso que se reconstruye desde la BD cada SEARCH_INDEX_TTL segundos o
+    cuando se crea/edita un manga (invalidate_memory_index()).
+
+Ambos caminos comparten la normalización (minúsculas, sin acentos) y los pesos
+por campo, así el orden por relevancia es equivalente.
+"""
+
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Iterable
+
+# Largo mínimo de un término (innodb_ft_min_token_size = 3 por defecto).
+# Búsquedas solo con términos más cortos caen al ILIKE original.
+MIN_TERM_LENGTH = 3
+
+# Peso de cada campo en la relevancia: un match en el título pesa más que en la sinopsis
+WEIGHT_TITULO = 3.0
+WEIGHT_ALT_TITULO = 2.0
+WEIGHT_SINOPSIS = 1.0
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text: str | None) -> str:
+    """'Shingeki no Kyojin: Temporada Final — Ñandú' → 'shingeki no kyojin: temporada final — nandu'"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def search_terms(search: str | None) -> list[str]:
+    """Términos útiles de la búsqueda, normalizados y sin repetir (vacío → usar ILIKE)."""
+    return list(dict.fromkeys(t for t in tokenize(search) if len(t) >= MIN_TERM_LENGTH))
+
+
+def boolean_query(terms: list[str]) -> str:
+    """
+    ['naruto', 'shipp'] → 'naruto* shipp*' (cualquiera, por prefijo). Sin `+`: en MySQL
+    el `+` exige el término dentro del mismo campo; que estén todos se exige por manga.
+    """
+    return " ".join(f"{t}*" for t in terms)
+
+
+class InMemorySearchIndex:
+    """
+    Índice invertido término → {manga_id: peso}. Cada término de la búsqueda matchea
+    por prefijo (como el `*` de MySQL) y un manga tiene que matchear todos.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, float]] = {}
+        self._terms: list[str] = []
+        self.built_at: float | None = None
+
+    def is_stale(self, ttl: float) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+    def build(self, docs: Iterable[tuple[int, float, str | None]]) -> None:
+        """docs: (manga_id, peso del campo, texto); un manga puede aparecer varias veces."""
+        postings: dict[str, dict[int, float]] = {}
+        for manga_id, weight, text in docs:
+            for token in set(tokenize(text)):
+                scores = postings.setdefault(token, {})
+                scores[manga_id] = scores.get(manga_id, 0.0) + weight
+        self._postings = postings
+        self._terms = sorted(postings)
+        self.built_at = time.monotonic()
+
+    def _prefix_scores(self, term: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for i in range(bisect_left(self._terms, term), len(self._terms)):
+            candidate = self._terms[i]
+            if not candidate.startswith(term):
+                break
+            for manga_id, weight in self._postings[candidate].items():
+                scores[manga_id] = max(scores.get(manga_id, 0.0), weight)
+        return scores
+
+    def search(self, terms: list[str]) -> list[tuple[int, float]]:
+        """Returns: [(manga_id, score)] de los mangas que contienen todos los términos."""
+        total: dict[int, float] | None = None
+        for term in terms:
+            scores = self._prefix_scores(term)
+            if total is None:
+                total = scores
+            else:
+                total = {mid: total[mid] + s for mid, s in scores.items() if mid in total}
+            if not total:
+                return []
+        return sorted((total or {}).items(), key=lambda kv: (-kv[1], -kv[0]))
+
+
+_memory_index = InMemorySearchIndex()
+
+
+def get_memory_index() -> InMemorySearchIndex:
+    return _memory_index
+
+
+def invalidate_memory_index() -> None:
+    """Fuerza la reconstrucción en la próxima búsqueda (alta/edición de mangas)."""
+    _memory_index.built_at = None
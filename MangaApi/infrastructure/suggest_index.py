@@ -0,0 +1,202 @@
+"""
+infrastructure/suggest_index.py
+===============================
+Índice en memoria para el autocompletado (GET /api/mangas/suggest).
+
+Indexa título, slug y títulos alternativos (normalizados con search_index.fold):
+  - Prefijos: listas ordenadas de (token, manga_id) y (nombre, manga_id) → cada
+    término de la consulta matchea por prefijo ("naru shi" → "Naruto Shippuden").
+  - Trigramas (estilo pg_trgm): tolera errores de tipeo ("narto" → "Naruto").
+    Solo se consultan si los prefijos no alcanzan para llenar el top-k.
+
+Guarda la MangaCard ya armada de cada manga, así una sugerencia no toca la BD.
+Se construye en el startup (main.py), se actualiza por manga en create/update de
+MangaService y se reconstruye cada SUGGEST_INDEX_REFRESH segundos (cada worker
+de uvicorn tiene su propia copia).
+"""
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable
+
+from cachetools import LRUCache
+
+from infrastructure.search_index import tokenize
+
+# Fracción de los trigramas de la consulta que tiene que tener un manga
+MIN_TRIGRAM_SIMILARITY = 0.5
+# Tope de candidatos a verificar por trigramas (acota la latencia con trigramas comunes)
+MAX_TRIGRAM_CANDIDATES = 1000
+# Respuestas recientes: las consultas de 1-3 letras se repiten mucho y son las más caras
+RESULT_CACHE_SIZE = 4096
+
+
+def _trigrams(tokens: Iterable[str]) -> set[str]:
+    grams: set[str] = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass
+class SuggestEntry:
+    manga_id: int
+    card: Any                     # MangaCard lista para serializar
+    erotico: bool
+    vistas: int
+    names: list[str]              # títulos normalizados (para match del string completo)
+    tokens: set[str] = field(default_factory=set)
+    grams: set[str] = field(default_factory=set)
+
+
+class SuggestIndex:
+    """No es thread-safe: se usa desde el event loop del worker."""
+
+    def __init__(self):
+        self._entries: dict[int, SuggestEntry] = {}
+        self._tokens: list[tuple[str, int]] = []     # (token, id) ordenado → prefijos por bisect
+        self._names: list[tuple[str, int]] = []      # (nombre completo, id) ordenado
+        self._postings: dict[str, set[int]] = {}     # trigrama → ids
+        self._popular: list[int] = []                # ids por vistas desc (al último build)
+        self._results: LRUCache = LRUCache(maxsize=RESULT_CACHE_SIZE)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_entry(manga_id: int, card: Any, erotico: bool, vistas: int, texts: Iterable[str | None]) -> SuggestEntry:
+        names = list(dict.fromkeys(" ".join(tokenize(t)) for t in texts if t))
+        tokens = {tok for name in names for tok in name.split()}
+        return SuggestEntry(manga_id, card, erotico, vistas or 0, names, tokens, _trigrams(tokens))
+
+    def build(self, entries: Iterable[SuggestEntry]) -> None:
+        """Reemplaza el índice completo (startup / refresco periódico)."""
+        self._entries = {e.manga_id: e for e in entries}
+        self._tokens = sorted((tok, e.manga_id) for e in self._entries.values() for tok in e.tokens)
+        self._names = sorted((name, e.manga_id) for e in self._entries.values() for name in e.names)
+        postings: dict[str, set[int]] = {}
+        for e in self._entries.values():
+            for gram in e.grams:
+                postings.setdefault(gram, set()).add(e.manga_id)
+        self._postings = postings
+        self._popular = sorted(self._entries, key=lambda mid: (-self._entries[mid].vistas, -mid))
+        self._results.clear()
+
+    def upsert(self, entry: SuggestEntry) -> None:
+        is_new = entry.manga_id not in self._entries
+        self.remove(entry.manga_id, keep_rank=True)
+        self._entries[entry.manga_id] = entry
+        for tok in entry.tokens:
+            insort(self._tokens, (tok, entry.manga_id))
+        for name in entry.names:
+            insort(self._names, (name, entry.manga_id))
+        for gram in entry.grams:
+            self._postings.setdefault(gram, set()).add(entry.manga_id)
+        if is_new:
+            self._popular.append(entry.manga_id)  # sin vistas todavía: al final
+        self._results.clear()
+
+    def remove(self, manga_id: int, keep_rank: bool = False) -> None:
+        old = self._entries.pop(manga_id, None)
+        if old is None:
+            return
+        for sorted_list, keys in ((self._tokens, old.tokens), (self._names, old.names)):
+            for key in keys:
+                i = bisect_left(sorted_list, (key, manga_id))
+                if i < len(sorted_list) and sorted_list[i] == (key, manga_id):
+                    del sorted_list[i]
+        for gram in old.grams:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(manga_id)
+                if not ids:
+                    del self._postings[gram]
+        if not keep_rank:
+            self._popular.remove(manga_id)
+        self._results.clear()
+
+    @staticmethod
+    def _prefix_range(sorted_list: list[tuple[str, int]], prefix: str) -> set[int]:
+        lo = bisect_left(sorted_list, (prefix,))
+        hi = bisect_left(sorted_list, (prefix + "\uffff",))
+        return {mid for _, mid in sorted_list[lo:hi]}
+
+    def _trigram_matches(self, query_grams: set[str]) -> dict[int, float]:
+        """
+        {manga_id: similitud} con similitud >= MIN_TRIGRAM_SIMILARITY. Para llegar al
+        mínimo, un manga tiene que estar en alguno de los trigramas más raros de la
+        consulta: solo esos generan candidatos, el resto se verifica con la entry.
+        """
+        needed = max(1, math.ceil(len(query_grams) * MIN_TRIGRAM_SIMILARITY))
+        by_rarity = sorted(query_grams, key=lambda g: len(self._postings.get(g, ())))
+        candidates: set[int] = set()
+        for gram in by_rarity[:len(query_grams) - needed + 1]:
+            candidates.update(self._postings.get(gram, ()))
+            if len(candidates) >= MAX_TRIGRAM_CANDIDATES:
+                break
+        matches = {}
+        for manga_id in islice(candidates, MAX_TRIGRAM_CANDIDATES):
+            shared = len(query_grams & self._entries[manga_id].grams)
+            if shared >= needed:
+                matches[manga_id] = shared / len(query_grams)
+        return matches
+
+    def _top_popular(self, ids: set[int], n: int, can_see_nsfw: bool) -> list[int]:
+        """Los `n` ids más vistos de `ids`. Si el set es grande, recorre _popular y corta antes."""
+        if len(ids) * 8 < len(self._popular):
+            pool = heapq.nlargest(len(ids), ids, key=lambda mid: (self._entries[mid].vistas, mid))
+        else:
+            pool = (mid for mid in self._popular if mid in ids)
+        top = []
+        for mid in pool:
+            if len(top) >= n:
+                break
+            if can_see_nsfw or not self._entries[mid].erotico:
+                top.append(mid)
+        return top
+
+    def suggest(self, query: str, limit: int = 10, can_see_nsfw: bool = False) -> list[Any]:
+        """
+        Returns: cards del top-`limit`, en tres niveles: algún nombre empieza con la
+        consulta, todos los términos son prefijo de algún token, parecido por trigramas.
+        Dentro de cada nivel, por vistas (la similitud primero en el de trigramas).
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        phrase = " ".join(terms)
+        key = (phrase, limit, can_see_nsfw)
+        cached = self._results.get(key)
+        if cached is None:
+            cached = self._results[key] = [self._entries[mid].card for mid in self._search(terms, phrase, limit, can_see_nsfw)]
+        return cached
+
+    def _search(self, terms: list[str], phrase: str, limit: int, can_see_nsfw: bool) -> list[int]:
+        matched: set[int] = set()
+        for i, term in enumerate(terms):
+            ids = self._prefix_range(self._tokens, term)
+            matched = ids if i == 0 else matched & ids
+            if not matched:
+                break
+
+        result = self._top_popular(self._prefix_range(self._names, phrase), limit, can_see_nsfw)
+        if len(result) < limit:
+            result += self._top_popular(matched - set(result), limit - len(result), can_see_nsfw)
+
+        if len(result) < limit and len(phrase) >= 3:
+            similar = self._trigram_matches(_trigrams(terms))
+            for mid in result:
+                similar.pop(mid, None)
+            if not can_see_nsfw:
+                similar = {mid: sim for mid, sim in similar.items() if not self._entries[mid].erotico}
+            result += heapq.nlargest(limit - len(result), similar,
+                                     key=lambda mid: (similar[mid], self._entries[mid].vistas, mid))
+
+        return result
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,64 @@
+"""
+infrastructure/view_counter.py
+==============================
+Buffer write-behind para POST /api/mangas/{id}/increment-view.
+
+Cada vista suma en memoria (por worker) y una tarea periódica (main.py, cada
+VIEW_COUNT_FLUSH_INTERVAL segundos) vuelca todo el lote en un solo UPDATE con
+CASE por manga. Así un título popular recibe unas pocas escrituras por intervalo
+en vez de una transacción (y un lock de fila) por vista.
+
+El endpoint responde un valor aproximado: el último MNG_VISTA leído de la BD
+(que incluye lo que volcaron los otros workers) más lo pendiente en este worker.
+Si el proceso muere sin el flush del shutdown se pierden, como mucho, las vistas
+de un intervalo.
+"""
+
+from collections import Counter
+from typing import Awaitable, Callable
+
+
+class ViewCounter:
+    """No es thread-safe: se usa desde el event loop del worker."""
+
+    def __init__(self):
+        self._pending: Counter[int] = Counter()
+        self._flushing: Counter[int] = Counter()   # lote que se está escribiendo
+        self._base: dict[int, int] = {}            # último MNG_VISTA conocido por manga
+
+    def known(self, manga_id: int) -> bool:
+        return manga_id in self._base
+
+    def remember(self, manga_id: int, vistas: int) -> None:
+        self._base[manga_id] = vistas
+
+    def add(self, manga_id: int, n: int = 1) -> int:
+        """Suma `n` vistas. Returns: total aproximado (requiere remember() previo)."""
+        self._pending[manga_id] += n
+        return self._base.get(manga_id, 0) + self._flushing[manga_id] + self._pending[manga_id]
+
+    def pending(self) -> int:
+        return sum(self._pending.values())
+
+    async def flush(self, apply: Callable[[dict[int, int]], Awaitable[dict[int, int]]]) -> int:
+        """
+        Escribe lo pendiente con `apply({manga_id: delta}) → {manga_id: vistas}` (UPDATE
+        + commit). Si falla, el lote vuelve al buffer para el próximo intento.
+        Returns: cantidad de mangas actualizados.
+        """
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, Counter()
+        self._flushing = batch
+        try:
+            totals = await apply(dict(batch))
+        except BaseException:
+            self._pending.update(batch)
+            raise
+        finally:
+            self._flushing = Counter()
+        self._base.update(totals)
+        return len(batch)
+
+
+view_counter = ViewCounter()
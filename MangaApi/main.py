@@ -13,12 +13,15 @@ Flujo:
   → FastAPI Router → Depends(get_db) → Repository → Response
 
 Lifespan:
-  - Startup: verificar conexión a BD
-  - Shutdown: cerrar engine async
+  - Startup: verificar conexión a BD, crear cliente S3 (B2) compartido,
+    construir el índice de autocompletado (/api/mangas/suggest) y el feed de /api/home;
+    tareas periódicas (índice, feed, volcado del contador de vistas)
+  - Shutdown: volcar vistas pendientes, cerrar cliente S3, backend de caché (Redis) y engine async
 """
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import sentry_sdk
 from fastapi import FastAPI
@@ -51,6 +54,16 @@ if settings.SENTRY_DSN:
 
 
 # ── Lifespan (reemplaza AppConfig.ready() y señales de Django) ───────────────
+async def _every(seconds: int, job, name: str) -> None:
+    """Corre `job` cada `seconds` segundos hasta el shutdown (errores solo se loguean)."""
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            await job()
+        except Exception as exc:
+            logger.warning("⚠️ Falló el refresco de %s: %s", name, exc)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -70,10 +83,49 @@ async def lifespan(app: FastAPI):
         logger.error("❌ No se pudo conectar a la BD: %s", exc)
         raise  # Fallo rápido: no arrancar sin BD
 
+    # Cliente S3 (B2) compartido por todo el proceso
+    from infrastructure.b2_client import init_s3_client, close_s3_client
+    await init_s3_client()
+
+    # Índice en memoria de /mangas/suggest (uno por worker, se refresca periódicamente)
+    # y feed precalculado de /home (en el caché compartido)
+    from domains.mangas.dependencies import flush_view_counts, rebuild_suggest_index, refresh_home_feed
+    try:
+        logger.info("✅ Índice de sugerencias: %d mangas.", await rebuild_suggest_index())
+    except Exception as exc:
+        logger.warning("⚠️ No se pudo construir el índice de sugerencias: %s", exc)
+    try:
+        await refresh_home_feed()
+        logger.info("✅ Feed de home precalculado.")
+    except Exception as exc:
+        logger.warning("⚠️ No se pudo precalcular el feed de home: %s", exc)
+    refreshers = [
+        asyncio.create_task(_every(seconds, job, name))
+        for seconds, job, name in (
+            (settings.SUGGEST_INDEX_REFRESH, rebuild_suggest_index, "índice de sugerencias"),
+            (settings.HOME_FEED_REFRESH, refresh_home_feed, "feed de home"),
+            (settings.VIEW_COUNT_FLUSH_INTERVAL, flush_view_counts, "contador de vistas"),
+        )
+        if seconds > 0
+    ]
+
     yield  # ← servidor activo aquí
 
     # Shutdown
     logger.info("🛑 Cerrando MangaApiV2...")
+    for task in refreshers:
+        task.cancel()
+    with suppress(asyncio.CancelledError):
+        await asyncio.gather(*refreshers)
+    try:
+        await flush_view_counts()
+        logger.info("✅ Vistas pendientes volcadas.")
+    except Exception as exc:
+        logger.error("❌ No se pudieron volcar las vistas pendientes: %s", exc)
+    await close_s3_client()
+    logger.info("✅ Cliente S3 cerrado.")
+    from core.cache import close_cache
+    await close_cache()
     await engine.dispose()
     logger.info("✅ Engine de BD cerrado.")
 
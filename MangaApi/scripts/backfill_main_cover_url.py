@@ -0,0 +1,55 @@
+"""
+scripts/backfill_main_cover_url.py
+==================================
+Recalcula apicore_manga.MNG_MAIN_COVER_URL desde apicore_manga_cover, normalizada
+al CDN (normalize_cover_url). Un UPDATE y un commit por lote.
+
+Uso (desde MangaApi/):
+  python -m scripts.backfill_main_cover_url                 # todos los mangas
+  python -m scripts.backfill_main_cover_url --only-missing  # solo los que no tienen
+
+La migración 0004 ya deja la columna normalizada; correrlo cada vez que cambien
+CDN_COVER_BASE / CDN_CHAPTER_BASE. Después, los cachés de listados vencen solos (TTL).
+"""
+
+import argparse
+import asyncio
+import logging
+
+from core.database import AsyncSessionLocal, engine
+from domains.mangas.services import normalize_cover_url
+from infrastructure.database.manga_repository import MangaRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_size: int, only_missing: bool) -> int:
+    updated = 0
+    after_id = 0
+    async with AsyncSessionLocal() as db:
+        repo = MangaRepository(db)
+        while True:
+            rows = await repo.get_main_cover_sources(after_id, batch_size, only_missing)
+            if not rows:
+                break
+            await repo.set_main_cover_urls({manga_id: normalize_cover_url(url) for manga_id, url in rows})
+            await db.commit()
+            updated += len(rows)
+            after_id = rows[-1][0]
+            logger.info("✅ %d mangas actualizados (hasta id %d)", updated, after_id)
+    await engine.dispose()
+    return updated
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--only-missing", action="store_true", help="solo mangas sin MNG_MAIN_COVER_URL")
+    args = parser.parse_args()
+    total = asyncio.run(backfill(args.batch_size, args.only_missing))
+    logger.info("🏁 Backfill terminado: %d mangas.", total)
+
+
+if __name__ == "__main__":
+    main()
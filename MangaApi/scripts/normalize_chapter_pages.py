@@ -0,0 +1,65 @@
+"""
+scripts/normalize_chapter_pages.py
+==================================
+Migración única de apicore_chapter.CHR_PAGES al formato que se guarda hoy
+(domains/chapters/pages.py::store_pages): URLs de Backblaze raw pasadas al CDN,
+que antes se hacía en cada lectura, y la lista de URLs compactada a manifest.
+Solo escribe las filas que cambian; es idempotente y se puede cortar y volver a correr.
+
+Uso (desde MangaApi/):
+  python -m scripts.normalize_chapter_pages              # aplica los cambios
+  python -m scripts.normalize_chapter_pages --dry-run    # solo cuenta
+"""
+
+import argparse
+import asyncio
+import logging
+
+from core.database import AsyncSessionLocal, engine
+from domains.chapters import repository as repo
+from domains.chapters.pages import store_pages
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(batch_size: int, dry_run: bool) -> tuple[int, int]:
+    scanned = changed = 0
+    after_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = await repo.get_chapter_pages_batch(db, after_id, batch_size)
+            if not rows:
+                break
+            updates = {}
+            for chapter_id, pages in rows:
+                try:
+                    stored = store_pages(pages)
+                except ValueError as exc:
+                    logger.warning("⚠️ Capítulo %d sin migrar: %s", chapter_id, exc)
+                    continue
+                if stored != pages:
+                    updates[chapter_id] = stored
+            if updates and not dry_run:
+                await repo.set_chapter_pages(db, updates)
+                await db.commit()
+            scanned += len(rows)
+            changed += len(updates)
+            after_id = rows[-1][0]
+            logger.info("✅ %d capítulos revisados, %d normalizados (hasta id %d)", scanned, changed, after_id)
+    await engine.dispose()
+    return scanned, changed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="no escribe, solo cuenta lo que cambiaría")
+    args = parser.parse_args()
+    scanned, changed = asyncio.run(migrate(args.batch_size, args.dry_run))
+    logger.info("🏁 Listo: %d capítulos, %d %s.", scanned, changed,
+                "a normalizar" if args.dry_run else "normalizados")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,38 @@ export async function getChapter(id) {
   return null
 }
 
+// Solo `pages` de un capítulo (manifest o {images}); ver GET /chapters/{id}/pages
+export async function getChapterPages(id) {
+  const key = cache.keyFrom('chapters/:id/pages', { id })
+  const cached = cache.get(key)
+  if (cached) return cached
+
+  try {
+    const res = await api.get(`chapters/${id}/pages`)
+    if (res?.data?.pages) {
+      cache.set(key, res.data.pages, 60 * 1000)
+      return res.data.pages
+    }
+  } catch { }
+  return null
+}
+
+// { id, manga, capitulo_numero, prev, next } para la navegación del lector
+export async function getChapterNeighbors(id) {
+  const key = cache.keyFrom('chapters/:id/neighbors', { id })
+  const cached = cache.get(key)
+  if (cached) return cached
+
+  try {
+    const res = await api.get(`chapters/${id}/neighbors`)
+    if (res?.data?.id) {
+      cache.set(key, res.data, 60 * 1000)
+      return res.data
+    }
+  } catch { }
+  return null
+}
+
 export async function listChapters(params = {}) {
   const key = cache.keyFrom('chapters', params)
   const cached = cache.get(key)
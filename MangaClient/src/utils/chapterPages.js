@@ -0,0 +1,23 @@
+/**
+ * Páginas de un capítulo a partir de `chapter.pages`.
+ * La API devuelve un manifest compacto ({ base, count, ext, pad, start?, overrides? })
+ * o el formato legacy ({ images: [...] } / array). Ver MangaApi/domains/chapters/pages.py.
+ *
+ * @param {object|array|null} pages - El campo `pages` del capítulo
+ * @returns {string[]} - URLs de las páginas en orden
+ */
+export function expandPages(pages) {
+  if (Array.isArray(pages)) return pages;
+  if (!pages) return [];
+  if (Array.isArray(pages.images)) return pages.images;
+  if (typeof pages.count !== 'number' || !pages.base) return [];
+
+  const start = pages.start ?? 1;
+  const overrides = pages.overrides || {};
+  const urls = [];
+  for (let i = 0; i < pages.count; i++) {
+    const num = String(start + i).padStart(pages.pad || 1, '0');
+    urls.push(overrides[String(i + 1)] || `${pages.base}/${num}.${pages.ext}`);
+  }
+  return urls;
+}
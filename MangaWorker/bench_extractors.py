@@ -0,0 +1,97 @@
+"""
+Benchmark de los backends de image_extractors.py contra HTML guardado.
+
+Uso:
+  python bench_extractors.py --save URL [URL ...]   # guarda fixtures en fixtures/html/
+  python bench_extractors.py [carpeta] [-n 50]      # mide cada backend sobre los .html
+
+Cada fixture se guarda como <dominio>_<hash>.html con la URL original en la primera
+línea (comentario HTML), así las reglas por sitio se aplican igual que en producción.
+Los resultados de cada backend se comparan contra 'bs4' (el comportamiento original).
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import os
+import time
+from urllib.parse import urlparse
+
+from image_extractors import EXTRACTORS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+_URL_MARK = "<!-- url: "
+
+
+async def save_fixtures(urls, directory):
+    from html_fetcher import close_fetcher, get_fetcher
+
+    os.makedirs(directory, exist_ok=True)
+    fetcher = get_fetcher()
+    try:
+        for url in urls:
+            result = await fetcher.fetch(url)
+            if not result['ok']:
+                print(f"❌ {url}: {result['error']}")
+                continue
+            name = f"{urlparse(url).netloc}_{hashlib.sha1(url.encode()).hexdigest()[:8]}.html"
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"{_URL_MARK}{result['url']} -->\n{result['text']}")
+            print(f"✅ Guardado {path} ({len(result['text']) // 1024} KB)")
+    finally:
+        await close_fetcher()
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            first, _, html = f.read().partition("\n")
+        url = first[len(_URL_MARK):-len(" -->")] if first.startswith(_URL_MARK) else "https://example.com/"
+        fixtures.append((os.path.basename(path), url, html))
+    return fixtures
+
+
+def bench(fixtures, rounds):
+    extractors = {name: cls() for name, cls in EXTRACTORS.items()}
+    reference = {name: extractors["bs4"].extract(html, url) for name, url, html in fixtures}
+    total_kb = sum(len(html) for _, _, html in fixtures) / 1024
+
+    print(f"📄 {len(fixtures)} fixtures ({total_kb:.0f} KB), {rounds} rondas\n")
+    print(f"{'backend':<8} {'ms/página':>10} {'MB/s':>8} {'vs bs4':>8}  resultado")
+    baseline = None
+    for name, extractor in sorted(extractors.items(), key=lambda kv: kv[0] != "bs4"):
+        mismatches = [f for f, url, html in fixtures if extractor.extract(html, url) != reference[f]]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, url, html in fixtures:
+                extractor.extract(html, url)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        per_page = elapsed / (rounds * len(fixtures)) * 1000
+        mb_s = total_kb * rounds / 1024 / elapsed
+        status = "✅ igual a bs4" if not mismatches else f"⚠️ difiere en {', '.join(mismatches)}"
+        print(f"{name:<8} {per_page:>10.2f} {mb_s:>8.1f} {baseline / elapsed:>7.1f}x  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=FIXTURES_DIR)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    parser.add_argument("--save", nargs="+", metavar="URL", help="descargar y guardar HTML como fixtures")
+    args = parser.parse_args()
+
+    if args.save:
+        asyncio.run(save_fixtures(args.save, args.directory))
+        return
+
+    fixtures = load_fixtures(args.directory)
+    if not fixtures:
+        print(f"⚠️ No hay fixtures en {args.directory}. Guardá algunas con --save URL.")
+        return
+    bench(fixtures, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
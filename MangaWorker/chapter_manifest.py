@@ -0,0 +1,141 @@
+"""
+Manifest local por capítulo (chapters/{code}/{num}/.manifest.json) para no repetir trabajo.
+
+Por cada página guarda:
+  - source_url, etag, last_modified → GET condicional (If-None-Match / If-Modified-Since)
+  - sha256 del WebP optimizado       → no re-optimizar lo que ya se optimizó
+  - uploaded_sha256                  → no re-subir si B2 ya tiene ese mismo contenido
+  - encoding                         → parámetros del WebP (modo pipeline)
+
+Así un re-run sobre una serie existente solo descarga/sube las páginas que cambiaron.
+El modo pipeline también lo guarda (aunque no escriba las páginas): es lo que le
+permite el GET condicional en el próximo run.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encoding_key(optimize, quality, method):
+    """Identifica cómo se generó el WebP: si cambian los parámetros, el hash ya no sirve."""
+    return f"webp:q{quality}:m{method}" if optimize else "raw"
+
+
+class ChapterManifest:
+    """
+    Diccionario {filename: entry} persistido como JSON en la carpeta del capítulo.
+    No es thread-safe: se usa desde un solo event loop / hilo a la vez.
+    """
+
+    def __init__(self, directory, pages=None):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.pages = pages or {}
+
+    @classmethod
+    def load(cls, directory):
+        path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                return cls(directory, data.get("pages") or {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Manifest ilegible en {path}, se regenera: {e}")
+        return cls(directory)
+
+    def save(self):
+        """Escritura atómica (tmp + replace) para no dejar un JSON a medias si se corta."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "pages": self.pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def get(self, filename):
+        return self.pages.get(filename)
+
+    # ── Descarga ──
+
+    def conditional_headers(self, filename, url, encoding=None):
+        """
+        Headers para GET condicional si ya tenemos esta página de esta misma URL.
+        `encoding` (modo pipeline, sin copia local): solo si lo subido se generó igual.
+        """
+        entry = self.pages.get(filename)
+        if not entry or entry.get("source_url") != url:
+            return {}
+        if encoding is None:
+            if not os.path.exists(os.path.join(self.directory, filename)):
+                return {}
+        elif entry.get("encoding") != encoding or not entry.get("uploaded_sha256"):
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_download(self, filename, url, response_headers):
+        """
+        Guarda los validadores de la respuesta. Los hashes se conservan: se comparan por
+        contenido, así que si el origen re-sirve la misma imagen igual no se re-sube.
+        """
+        entry = self.pages.setdefault(filename, {})
+        entry["source_url"] = url
+        entry["etag"] = response_headers.get("ETag")
+        entry["last_modified"] = response_headers.get("Last-Modified")
+
+    def discard_download(self, filename):
+        """Olvida los validadores de la página (p. ej. no se pudo codificar): el próximo run la re-descarga."""
+        entry = self.pages.get(filename)
+        if entry:
+            entry.pop("etag", None)
+            entry.pop("last_modified", None)
+
+    # ── Optimización ──
+
+    def is_optimized(self, filename, sha256):
+        entry = self.pages.get(filename)
+        return bool(entry) and entry.get("sha256") == sha256
+
+    def record_optimized(self, filename, sha256, encoding=None):
+        entry = self.pages.setdefault(filename, {})
+        entry["sha256"] = sha256
+        if encoding is not None:
+            entry["encoding"] = encoding
+
+    # ── Subida ──
+
+    def is_uploaded(self, filename, sha256):
+        entry = self.pages.get(filename)
+        return bool(entry) and entry.get("uploaded_sha256") == sha256
+
+    def record_upload(self, filename, sha256, key):
+        entry = self.pages.setdefault(filename, {})
+        entry["uploaded_sha256"] = sha256
+        entry["key"] = key
+
+    def rename(self, mapping):
+        """Reaplica {viejo: nuevo} tras renumerar archivos (renumber_images)."""
+        self.pages = {mapping.get(name, name): entry for name, entry in self.pages.items()
+                      if name in mapping or name not in mapping.values()}
@@ -0,0 +1,184 @@
+"""
+Capa de descarga de HTML async para worker.py (reemplaza requests + run_in_executor).
+
+- Una aiohttp.ClientSession por dominio: keep-alive y pool de conexiones reutilizado
+  entre capítulos (en modo masivo son miles de páginas contra pocos hosts).
+- Reintentos con backoff exponencial + jitter en 5xx / 429 / errores de red.
+- Perfiles de headers de navegador real (UA + Accept + Accept-Language + Sec-Fetch-*),
+  fijos por dominio; si el sitio responde 403/5xx se rota al siguiente perfil.
+- Límite global por host (concurrencia + requests/seg) compartido por el HTML y las
+  imágenes de todos los capítulos que corren en paralelo (throttle()).
+
+Las sesiones quedan atadas al event loop que las creó: get_fetcher() crea uno nuevo
+si cambió el loop, y close_fetcher() debe llamarse antes de cerrar el loop.
+"""
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import aiohttp
+
+FETCH_LIMIT_PER_HOST = int(os.getenv("FETCH_LIMIT_PER_HOST", "8"))
+FETCH_RATE_PER_HOST = float(os.getenv("FETCH_RATE_PER_HOST", "8"))  # requests/seg por host, 0 = sin límite
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "3"))
+FETCH_RETRY_BACKOFF = float(os.getenv("FETCH_RETRY_BACKOFF", "1.0"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+FETCH_KEEPALIVE_TIMEOUT = float(os.getenv("FETCH_KEEPALIVE_TIMEOUT", "60"))
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+_ROTATE_STATUS = {403} | _RETRYABLE_STATUS
+
+_ACCEPT_HTML = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+
+HEADER_PROFILES = [
+    {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": _ACCEPT_HTML,
+        "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
+        "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+        "Sec-Ch-Ua-Mobile": "?0",
+        "Sec-Ch-Ua-Platform": '"Windows"',
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "same-origin",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+        "Accept": _ACCEPT_HTML,
+        "Accept-Language": "es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "same-origin",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "es-ES,es;q=0.9",
+    },
+]
+
+
+class HtmlFetcher:
+    """Pool de sesiones por dominio. Usar siempre desde el mismo event loop."""
+
+    def __init__(self, limit_per_host=FETCH_LIMIT_PER_HOST, rate_per_host=FETCH_RATE_PER_HOST,
+                 max_retries=FETCH_MAX_RETRIES, backoff=FETCH_RETRY_BACKOFF, timeout=FETCH_TIMEOUT):
+        self.loop = asyncio.get_running_loop()
+        self.limit_per_host = limit_per_host
+        self.min_interval = 1.0 / rate_per_host if rate_per_host > 0 else 0.0
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._sessions = {}   # dominio -> ClientSession
+        self._profiles = {}   # dominio -> índice en HEADER_PROFILES
+        self._slots = {}      # dominio -> Semaphore(limit_per_host)
+        self._next_at = {}    # dominio -> loop.time() del próximo request permitido
+
+    def headers_for(self, url, referer=None):
+        """Headers del perfil asignado al dominio + Referer (por defecto la raíz del sitio)."""
+        parsed = urlparse(url)
+        profile = HEADER_PROFILES[self._profiles.setdefault(parsed.netloc, 0)]
+        return {**profile, "Referer": referer or f"{parsed.scheme or 'https'}://{parsed.netloc}/"}
+
+    def _rotate_profile(self, domain):
+        self._profiles[domain] = (self._profiles.get(domain, 0) + 1) % len(HEADER_PROFILES)
+
+    @asynccontextmanager
+    async def throttle(self, url):
+        """
+        Reserva un turno para `url` respetando el límite global del host:
+        máx. `limit_per_host` requests en vuelo y uno cada `min_interval` segundos.
+        """
+        domain = urlparse(url).netloc
+        slot = self._slots.get(domain)
+        if slot is None:
+            slot = self._slots[domain] = asyncio.Semaphore(self.limit_per_host)
+        async with slot:
+            if self.min_interval:
+                now = self.loop.time()
+                start = max(now, self._next_at.get(domain, 0.0))
+                self._next_at[domain] = start + self.min_interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            yield
+
+    def session_for(self, url):
+        """Sesión keep-alive del dominio de `url` (también para bajar imágenes)."""
+        return self._session(urlparse(url).netloc)
+
+    def _session(self, domain):
+        session = self._sessions.get(domain)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host, keepalive_timeout=FETCH_KEEPALIVE_TIMEOUT,
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[domain] = session
+        return session
+
+    async def fetch(self, url, referer=None):
+        """
+        GET de una página HTML con reintentos.
+        Returns: dict {'ok', 'status', 'text', 'url' (final, tras redirects), 'error', 'attempts'}
+        """
+        domain = urlparse(url).netloc
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await self._fetch_once(domain, url, referer)
+            result['attempts'] = attempt
+            retryable = result.pop('retryable')
+            retry_after = result.pop('retry_after', None)
+            if result['ok'] or not retryable or attempt > self.max_retries:
+                return result
+            if result['status'] in _ROTATE_STATUS:
+                self._rotate_profile(domain)
+            delay = retry_after or self.backoff * (2 ** (attempt - 1)) + random.uniform(0, self.backoff)
+            print(f"  🔁 Reintento {attempt}/{self.max_retries} para {url} en {delay:.1f}s ({result['error']})")
+            await asyncio.sleep(delay)
+
+    async def _fetch_once(self, domain, url, referer):
+        try:
+            async with self.throttle(url), \
+                    self._session(domain).get(url, headers=self.headers_for(url, referer)) as resp:
+                if resp.status == 200:
+                    text = await resp.text(errors="replace")
+                    return {'ok': True, 'status': 200, 'text': text, 'url': str(resp.url),
+                            'error': None, 'retryable': False}
+                retry_after = resp.headers.get("Retry-After", "")
+                return {
+                    'ok': False, 'status': resp.status, 'text': None, 'url': str(resp.url),
+                    'error': f"HTTP {resp.status}",
+                    # 403 suele ser anti-bot: se reintenta rotando el perfil de headers
+                    'retryable': resp.status in _RETRYABLE_STATUS or resp.status == 403,
+                    'retry_after': float(retry_after) if retry_after.isdigit() else None,
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {'ok': False, 'status': None, 'text': None, 'url': url,
+                    'error': f"{type(e).__name__}: {e}", 'retryable': True}
+
+    async def close(self):
+        sessions, self._sessions = list(self._sessions.values()), {}
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+
+
+_fetcher = None
+
+
+def get_fetcher():
+    """HtmlFetcher compartido del event loop actual."""
+    global _fetcher
+    if _fetcher is None or _fetcher.loop is not asyncio.get_running_loop():
+        _fetcher = HtmlFetcher()
+    return _fetcher
+
+
+async def close_fetcher():
+    global _fetcher
+    if _fetcher is not None and _fetcher.loop is asyncio.get_running_loop():
+        await _fetcher.close()
+    _fetcher = None
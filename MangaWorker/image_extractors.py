@@ -0,0 +1,151 @@
+"""
+Extracción de URLs de imágenes del HTML de un capítulo (usado por fetch_chapter_image_urls).
+
+Backends (misma interfaz, ver ImageExtractor):
+  - 'lxml' : parser en C, el más rápido. Opcional (pip install lxml).
+  - 'fast' : escaneo de tags <img> con regex, solo stdlib. Default si no hay lxml.
+  - 'bs4'  : BeautifulSoup + html.parser, el comportamiento original (referencia).
+
+Las reglas por sitio (SiteRule) definen qué atributo leer (lazy-load con data-src),
+qué URLs son páginas del capítulo y el fallback por regex para sitios con JSON/JS.
+IMAGE_EXTRACTOR (env) fuerza un backend. Benchmark: bench_extractors.py
+"""
+import html as html_lib
+import os
+import re
+from urllib.parse import urljoin, urlparse
+
+try:
+    import lxml.html
+except ImportError:  # opcional
+    lxml = None
+
+
+class SiteRule:
+    """Qué <img> del HTML son páginas del capítulo para un grupo de sitios."""
+
+    def __init__(self, name, hosts=(), attrs=("src",), keywords=("uploads", "storage", "ikigai"),
+                 exclude=("logo",), fallback_keywords=("uploads",)):
+        self.name = name
+        self.hosts = hosts                          # substrings del dominio
+        self.attrs = attrs                          # en orden de preferencia
+        self.keywords = keywords                    # la URL debe contener alguno
+        self.exclude = exclude                      # ... y ninguno de estos
+        self.fallback_keywords = fallback_keywords  # filtro del fallback por regex
+
+    def matches(self, url):
+        domain = urlparse(url).netloc.lower()
+        return any(h in domain for h in self.hosts)
+
+    def pick(self, attrs):
+        for name in self.attrs:
+            value = attrs.get(name)
+            if value:
+                return value.strip()
+        return None
+
+    def accepts(self, src):
+        return any(k in src for k in self.keywords) and not any(x in src for x in self.exclude)
+
+
+SITE_RULES = [
+    # TMO / ZonaTMO en modo cascade: lazy-load, la URL real suele venir en data-src
+    SiteRule("tmo", hosts=("tmo",), attrs=("data-src", "src")),
+    SiteRule("ikigai", hosts=("ikigai",), attrs=("src", "data-src"),
+             keywords=("ikigai", "storage", "uploads")),
+]
+DEFAULT_RULE = SiteRule("default")
+
+
+def rule_for(url):
+    for rule in SITE_RULES:
+        if rule.matches(url):
+            return rule
+    return DEFAULT_RULE
+
+
+_URL_IN_TEXT = re.compile(r'(https?://[^"\s]+\.(?:jpg|jpeg|png|webp))')
+
+
+class ImageExtractor:
+    """
+    Interfaz: cada backend solo implementa iter_img_attrs(html) → dicts de atributos
+    de cada <img> en orden de aparición; el filtrado por SiteRule es común.
+    """
+    name = "base"
+
+    def iter_img_attrs(self, html):
+        raise NotImplementedError
+
+    def extract(self, html, base_url, rule=None):
+        """Returns: URLs absolutas, en orden y sin duplicados"""
+        rule = rule or rule_for(base_url)
+        urls = []
+        for attrs in self.iter_img_attrs(html):
+            src = rule.pick(attrs)
+            if src and rule.accepts(src):
+                urls.append(urljoin(base_url, src))
+
+        # Si no hay <img> útiles, puede que estén en un script JSON (NextJS/React)
+        if not urls:
+            urls = [u for u in _URL_IN_TEXT.findall(html)
+                    if any(k in u for k in rule.fallback_keywords) and not any(x in u for x in rule.exclude)]
+
+        return list(dict.fromkeys(urls))
+
+
+class FastExtractor(ImageExtractor):
+    """Regex sobre los tags <img>: no arma árbol ni recorre el resto del documento."""
+    name = "fast"
+
+    _IMG_TAG = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+    _ATTR = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+
+    def iter_img_attrs(self, html):
+        for tag in self._IMG_TAG.finditer(html):
+            attrs = {}
+            for m in self._ATTR.finditer(tag.group(0), 4):
+                name = m.group(1).lower()
+                if name not in attrs:
+                    value = m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4)
+                    attrs[name] = html_lib.unescape(value)
+            yield attrs
+
+
+class LxmlExtractor(ImageExtractor):
+    name = "lxml"
+
+    def iter_img_attrs(self, html):
+        if not html.strip():
+            return
+        try:
+            doc = lxml.html.fromstring(html)
+        except ValueError:  # str con declaración de encoding <?xml ...?>
+            doc = lxml.html.fromstring(html.encode("utf-8"))
+        for img in doc.iter("img"):
+            yield img.attrib
+
+
+class Bs4Extractor(ImageExtractor):
+    name = "bs4"
+
+    def iter_img_attrs(self, html):
+        from bs4 import BeautifulSoup
+        for img in BeautifulSoup(html, "html.parser").find_all("img"):
+            yield {k: " ".join(v) if isinstance(v, list) else v for k, v in img.attrs.items()}
+
+
+EXTRACTORS = {"fast": FastExtractor, "bs4": Bs4Extractor}
+if lxml is not None:
+    EXTRACTORS["lxml"] = LxmlExtractor
+
+
+def get_extractor(name=None):
+    name = name or os.getenv("IMAGE_EXTRACTOR") or ("lxml" if "lxml" in EXTRACTORS else "fast")
+    if name not in EXTRACTORS:
+        raise ValueError(f"Extractor desconocido o no instalado: {name} (disponibles: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name]()
+
+
+def extract_image_urls(html, base_url, extractor=None):
+    return (extractor or get_extractor()).extract(html, base_url)
@@ -0,0 +1,145 @@
+"""
+Cola de trabajos persistente (SQLite) para server.py.
+
+Cada POST /download se guarda como un job; N consumidores los van tomando.
+Si el proceso se reinicia, los jobs que estaban a medias vuelven a 'queued'
+y se reprocesan, así no se pierde nada en un redeploy.
+
+Estados: queued → downloading → optimizing → uploading → done | failed
+"""
+import json
+import sqlite3
+import threading
+import time
+
+QUEUED = "queued"
+DOWNLOADING = "downloading"
+OPTIMIZING = "optimizing"
+UPLOADING = "uploading"
+DONE = "done"
+FAILED = "failed"
+
+ACTIVE_STATES = (DOWNLOADING, OPTIMIZING, UPLOADING)
+ALL_STATES = (QUEUED,) + ACTIVE_STATES + (DONE, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload     TEXT    NOT NULL,
+    state       TEXT    NOT NULL,
+    progress    TEXT,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL    NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_id_idx ON jobs (state, id);
+"""
+
+
+class JobQueue:
+    """
+    Wrapper síncrono sobre sqlite3. Una sola conexión protegida con un lock;
+    desde asyncio se llama con asyncio.to_thread para no bloquear el loop.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recover(self):
+        """Devuelve a 'queued' los jobs que quedaron a medias (restart/crash). Returns: cantidad"""
+        with self._lock:
+            placeholders = ",".join("?" * len(ACTIVE_STATES))
+            cur = self._conn.execute(
+                f"UPDATE jobs SET state = ?, updated_at = ? WHERE state IN ({placeholders})",
+                (QUEUED, time.time(), *ACTIVE_STATES),
+            )
+            return cur.rowcount
+
+    def enqueue(self, payload):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (payload, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (json.dumps(payload), QUEUED, now, now),
+            )
+            return cur.lastrowid
+
+    def claim(self):
+        """Toma el job 'queued' más antiguo y lo pasa a 'downloading'. Returns: dict o None"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (DOWNLOADING, time.time(), row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._row_to_dict(row)
+        job["state"] = DOWNLOADING
+        job["attempts"] += 1
+        return job
+
+    def update(self, job_id, state=None, progress=None, error=None):
+        sets, params = ["updated_at = ?"], [time.time()]
+        if state is not None:
+            sets.append("state = ?")
+            params.append(state)
+        if progress is not None:
+            sets.append("progress = ?")
+            params.append(json.dumps(progress))
+        if error is not None:
+            sets.append("error = ?")
+            params.append(error)
+        params.append(job_id)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", params)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def counts(self):
+        """Returns: {estado: cantidad} con todos los estados (0 si no hay)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        counts = dict.fromkeys(ALL_STATES, 0)
+        counts.update({r["state"]: r["n"] for r in rows})
+        return counts
+
+    def list_jobs(self, states=None, limit=50):
+        query, params = "SELECT * FROM jobs", []
+        if states:
+            query += f" WHERE state IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        return job
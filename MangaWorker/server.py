@@ -1,12 +1,50 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Security, Depends
+from fastapi import FastAPI, HTTPException, Security, Depends
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
 import os
 import shutil
 import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
 import worker  # Import the refactored worker module
+import job_queue
+
+# Cola persistente + consumidores concurrentes
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_QUEUE_DB = os.getenv("WORKER_QUEUE_DB", os.path.join(os.getcwd(), "worker_queue.sqlite3"))
+
+# Pool de procesos compartido para optimizar imágenes (CPU-bound) fuera del event loop
+optimize_pool = None
+queue = None
+_queue_event = None  # despierta a los consumidores al encolar
+
+@asynccontextmanager
+async def lifespan(app):
+    global optimize_pool, queue, _queue_event
+    optimize_pool = ProcessPoolExecutor(max_workers=worker.OPTIMIZE_WORKERS)
+    print(f"⚙️  Pool de optimización iniciado ({worker.OPTIMIZE_WORKERS} procesos)")
+
+    queue = job_queue.JobQueue(WORKER_QUEUE_DB)
+    recovered = queue.recover()
+    if recovered:
+        print(f"♻️  {recovered} jobs interrumpidos devueltos a la cola")
+    _queue_event = asyncio.Event()
+    _queue_event.set()  # procesar lo que haya quedado encolado
+    consumers = [asyncio.create_task(_consumer(n)) for n in range(WORKER_CONCURRENCY)]
+    print(f"📥 Cola de jobs en {WORKER_QUEUE_DB} ({WORKER_CONCURRENCY} consumidores)")
+
+    yield
+
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    await worker.close_fetcher()
+    queue.close()
+    optimize_pool.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configuración de Seguridad
 API_KEY_NAME = "X-API-Key"
@@ -26,26 +64,90 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         raise HTTPException(status_code=403, detail="Acceso Denegado: API Key inválida")
     return api_key_header
 
-# State Tracking
-worker_state = {
-    "status": "idle", # or "processing"
-    "current_task": None,
-    "completed_tasks": 0,
-    "failed_tasks": 0,
-    "queue_size": 0 # Approximate
-}
+# Progreso en memoria de los jobs activos: {job_id: {"label", "state", "stages": {stage: {done, total}}}}
+# El estado durable vive en la cola SQLite; esto solo agrega el detalle por página.
+active_jobs = {}
+
+_STAGE_ORDER = {job_queue.DOWNLOADING: 0, job_queue.OPTIMIZING: 1, job_queue.UPLOADING: 2}
 
 class ChapterRequest(BaseModel):
     url: str
     series_title: str
     chapter_number: int
     series_code: str = None # Optional
+    optimize: bool = True
+    quality: int = 80
+    method: int = 4
+    pipeline: bool = False      # descarga → WebP → PUT en memoria (páginas sin disco; sí .manifest.json)
+    save_to_disk: bool = False  # solo en modo pipeline: guardar copia para auditoría
 
-async def process_chapter_task(req: ChapterRequest):
-    global worker_state
-    worker_state["status"] = "processing"
-    worker_state["current_task"] = f"{req.series_title} #{req.chapter_number}"
-    
+async def _write_state(previous, job_id, state, progress):
+    """Persiste un cambio de estado en un thread, después del anterior del mismo job (en orden)."""
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+    await asyncio.to_thread(queue.update, job_id, state=state, progress=progress)
+
+
+def _progress_tracker(job_id):
+    """Callback progress(stage, done, total) para worker.*: guarda contadores y avanza el estado del job."""
+    job = active_jobs[job_id]
+
+    def on_progress(stage, done, total):
+        job["stages"][stage] = {"done": done, "total": total}
+        # El estado solo avanza (optimizar y subir se solapan en modo stream/pipeline).
+        # La escritura en SQLite va a un thread: el callback corre en el event loop.
+        if _STAGE_ORDER[stage] > _STAGE_ORDER[job["state"]]:
+            job["state"] = stage
+            job["state_write"] = asyncio.ensure_future(
+                _write_state(job.get("state_write"), job_id, stage, dict(job["stages"]))
+            )
+
+    return on_progress
+
+
+async def _consumer(n):
+    """Toma jobs de la cola persistente uno a la vez, hasta que se cancela en el shutdown."""
+    while True:
+        # clear() antes de claim(): un enqueue que llegue durante el claim deja el evento
+        # seteado y el próximo wait() no se lo pierde
+        _queue_event.clear()
+        job = await asyncio.to_thread(queue.claim)
+        if job is None:
+            await _queue_event.wait()
+            continue
+
+        job_id = job["id"]
+        payload = job["payload"]
+        active_jobs[job_id] = {
+            "label": f"{payload.get('series_title')} #{payload.get('chapter_number')}",
+            "state": job_queue.DOWNLOADING,
+            "stages": {},
+        }
+        try:
+            try:
+                req = ChapterRequest(**payload)
+            except ValueError as e:
+                ok, error = False, f"invalid_payload: {e}"
+            else:
+                ok, error = await process_chapter_task(req, progress=_progress_tracker(job_id))
+            pending_write = active_jobs[job_id].get("state_write")
+            if pending_write is not None:
+                # que un estado intermedio no pise el final
+                await asyncio.gather(pending_write, return_exceptions=True)
+            await asyncio.to_thread(
+                queue.update, job_id,
+                state=job_queue.DONE if ok else job_queue.FAILED,
+                progress=active_jobs[job_id]["stages"], error=error,
+            )
+        finally:
+            active_jobs.pop(job_id, None)
+
+
+async def process_chapter_task(req: ChapterRequest, progress=None):
+    """
+    Procesa un capítulo completo (scrape → descarga → optimiza → sube → notifica).
+    Returns: (ok, error)
+    """
     print(f"🚀 [Server] Iniciando tarea de fondo para: {req.url}")
     
     try:
@@ -60,41 +162,85 @@ async def process_chapter_task(req: ChapterRequest):
         base_chapters_dir = os.path.join(os.getcwd(), 'chapters', series_code)
         os.makedirs(base_chapters_dir, exist_ok=True)
         
-        # 2. Process (Scrape & Download)
-        download_dir, count = await worker.process_chapter(req.url, req.chapter_number, base_chapters_dir)
-        
-        if not download_dir or count == 0:
-            print("❌ [Server] Falló la descarga o no se encontraron imágenes.")
-            worker_state["failed_tasks"] += 1
-            return
+        if req.pipeline:
+            # 2-3. Modo pipeline: descarga → WebP → PUT en memoria, sin pasar por disco
+            manifest = await worker.process_chapter_pipeline(
+                req.url, req.chapter_number, base_chapters_dir,
+                optimize=req.optimize, quality=req.quality, method=req.method,
+                save_to_disk=req.save_to_disk, executor=optimize_pool, progress=progress,
+            )
+        else:
+            # 2. Process (Scrape & Download)
+            download_dir, count = await worker.process_chapter(
+                req.url, req.chapter_number, base_chapters_dir, progress=progress
+            )
+            
+            if not download_dir or count == 0:
+                print("❌ [Server] Falló la descarga o no se encontraron imágenes.")
+                return False, "download_failed"
 
-        print(f"✅ [Server] Descarga exitosa ({count} imágenes). Iniciando subida...")
+            # 3. Optimize (process pool) + Upload to B2 (using Env Creds)
+            # Cada página se sube en cuanto termina de codificarse
+            ready = None
+            # Un solo manifest compartido entre optimización y subida (ver chapter_manifest.py)
+            chapter_manifest = await asyncio.to_thread(worker.ChapterManifest.load, download_dir)
+            if req.optimize:
+                print(f"✅ [Server] Descarga exitosa ({count} imágenes). Optimizando y subiendo...")
+                ready = worker.optimize_images_stream(
+                    download_dir, quality=req.quality, method=req.method,
+                    executor=optimize_pool, progress=progress, manifest=chapter_manifest,
+                )
+            else:
+                print(f"✅ [Server] Descarga exitosa ({count} imágenes). Iniciando subida...")
 
-        # 3. Upload to B2 (using Env Creds)
-        success = await worker.upload_directory_to_b2(download_dir)
+            manifest = await worker.upload_directory_to_b2(
+                download_dir, ready=ready, progress=progress, manifest=chapter_manifest
+            )
         
-        if success:
-            print(f"✨ [Server] Subida completada para {req.series_title} - Cap {req.chapter_number}")
-            worker_state["completed_tasks"] += 1
-            await notify_backend_completion(req)
-        else:
-            print("❌ [Server] Falló la subida a B2.")
-            worker_state["failed_tasks"] += 1
+        if not manifest["ok"]:
+            print(f"❌ [Server] Falló la subida a B2 ({manifest['failed']}/{manifest['total']} archivos, error={manifest['error']}).")
+            return False, manifest["error"] or f"upload_failed: {manifest['failed']}/{manifest['total']}"
+
+        print(f"✨ [Server] Subida completada para {req.series_title} - Cap {req.chapter_number}")
+        await notify_backend_completion(req)
 
         # 4. Cleanup
         # shutil.rmtree(download_dir) 
+        return True, None
         
     except Exception as e:
         print(f"🔥 Error Crítico en worker: {e}")
-        worker_state["failed_tasks"] += 1
-    finally:
-        worker_state["status"] = "idle"
-        worker_state["current_task"] = None
+        return False, str(e)
 
 @app.get("/status")
-def get_status(api_key: str = Depends(get_api_key)):
-    """Returns current worker state"""
-    return worker_state
+async def get_status(api_key: str = Depends(get_api_key)):
+    """Estado del worker: profundidad real de la cola y progreso por job activo"""
+    counts = await asyncio.to_thread(queue.counts)
+    jobs = [
+        {"id": job_id, "task": job["label"], "state": job["state"], "progress": job["stages"]}
+        for job_id, job in sorted(active_jobs.items())
+    ]
+    return {
+        "status": "processing" if jobs else "idle",
+        "current_task": jobs[0]["task"] if jobs else None,
+        "completed_tasks": counts[job_queue.DONE],
+        "failed_tasks": counts[job_queue.FAILED],
+        "queue_size": counts[job_queue.QUEUED],
+        "concurrency": WORKER_CONCURRENCY,
+        "jobs": counts,
+        "active_jobs": jobs,
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, api_key: str = Depends(get_api_key)):
+    """Detalle de un job (estado persistido + progreso en vivo si está activo)"""
+    job = await asyncio.to_thread(queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    if job_id in active_jobs:
+        job["state"] = active_jobs[job_id]["state"]
+        job["progress"] = active_jobs[job_id]["stages"]
+    return job
 
 async def notify_backend_completion(req: ChapterRequest):
     url = f"{worker.API_BASE_URL}/chapters/completed/"
@@ -127,10 +273,11 @@ async def notify_backend_completion(req: ChapterRequest):
         print(f"❌ [Server] Error notificando al Backend: {e}")
 
 @app.post("/download")
-async def start_download(req: ChapterRequest, background_tasks: BackgroundTasks, api_key: str = Depends(get_api_key)):
-    """Endpoint que recibe la URL y lanza el trabajo en background"""
-    background_tasks.add_task(process_chapter_task, req)
-    return {"status": "started", "message": f"Procesando Cap {req.chapter_number} de {req.series_title}"}
+async def start_download(req: ChapterRequest, api_key: str = Depends(get_api_key)):
+    """Endpoint que recibe la URL y encola el trabajo (persistente, sobrevive a un restart)"""
+    job_id = await asyncio.to_thread(queue.enqueue, req.model_dump(exclude_none=True))
+    _queue_event.set()
+    return {"status": "queued", "job_id": job_id, "message": f"Encolado Cap {req.chapter_number} de {req.series_title}"}
 
 @app.get("/health")
 def health_check():
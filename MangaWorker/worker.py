@@ -5,15 +5,20 @@ import aiohttp
 from tqdm.asyncio import tqdm
 from io import BytesIO
 import hashlib
+import random
 import unicodedata
-from urllib.parse import urlparse, urljoin
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 # import ctypes
 
 
 from dotenv import load_dotenv
 from PIL import Image
 
+from chapter_manifest import ChapterManifest, MANIFEST_NAME, encoding_key, sha256_bytes, sha256_file
+from html_fetcher import close_fetcher, get_fetcher
+from image_extractors import extract_image_urls
+
 # Cargar variables de entorno desde .env si existe
 load_dotenv()
 
@@ -60,99 +65,305 @@ async def login_and_get_token(session, username, password):
         print(f"❌ Login error: {e}")
         return None
 
-async def upload_file_via_api(session, local_path, relative_path, token):
-    # 1. Sign
-    sign_url = f"{API_BASE_URL}/upload/sign/"
+# Subida paralela a B2: concurrencia, conexiones por host y reintentos configurables
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+UPLOAD_LIMIT_PER_HOST = int(os.getenv("UPLOAD_LIMIT_PER_HOST", "8"))
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "3"))
+UPLOAD_RETRY_BACKOFF = float(os.getenv("UPLOAD_RETRY_BACKOFF", "1.0"))
+SIGN_BATCH_SIZE = int(os.getenv("SIGN_BATCH_SIZE", "500"))  # máx. 1000 en la API
+
+# Status HTTP transitorios (B2 responde 503 cuando el pod está saturado)
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _read_file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+async def _sign_batch_once(session, prefix, filenames, token, content_type='image/webp'):
+    """
+    Un intento de POST /b2/sign-batch.
+    Returns: dict {'ok', 'status', 'error', 'retryable', 'urls': {filename: url}}
+    """
+    sign_url = f"{API_BASE_URL}/b2/sign-batch"
     headers = {'Authorization': f'Bearer {token}'}
-    payload = {'file_path': relative_path, 'content_type': 'image/webp'}
-    
-    async with session.post(sign_url, json=payload, headers=headers) as resp:
-        if resp.status != 200:
-            text = await resp.text()
-            print(f"  ❌ Sign failed for {relative_path}: {resp.status} - {text}")
-            return False
-        data = await resp.json()
-    
-    upload_url = data.get('url')
+    payload = {'prefix': prefix, 'filenames': filenames, 'content_type': content_type}
+
+    try:
+        async with session.post(sign_url, json=payload, headers=headers) as resp:
+            if resp.status != 200:
+                text = await resp.text()
+                return {
+                    'ok': False, 'status': resp.status,
+                    'error': f"Sign failed: {resp.status} - {text}",
+                    'retryable': resp.status in _RETRYABLE_STATUS, 'urls': {},
+                }
+            data = await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {'ok': False, 'status': None, 'error': f"{type(e).__name__}: {e}", 'retryable': True, 'urls': {}}
+
+    urls = {item['filename']: item['url'] for item in data.get('urls', []) if item.get('url')}
+    return {'ok': True, 'status': 200, 'error': None, 'retryable': False, 'urls': urls}
+
+
+async def sign_batch_via_api(session, prefix, filenames, token, content_type='image/webp',
+                             batch_size=SIGN_BATCH_SIZE, max_retries=UPLOAD_MAX_RETRIES,
+                             backoff=UPLOAD_RETRY_BACKOFF):
+    """
+    Obtiene las URLs pre-firmadas de todo un capítulo en lotes de `batch_size`.
+    Returns: dict {filename: url}. Los archivos sin URL se firman luego uno a uno.
+    """
+    urls = {}
+    for i in range(0, len(filenames), batch_size):
+        chunk = filenames[i:i + batch_size]
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await _sign_batch_once(session, prefix, chunk, token, content_type)
+            if result['ok'] or not result['retryable'] or attempt > max_retries:
+                break
+            delay = backoff * (2 ** (attempt - 1)) + random.uniform(0, backoff)
+            print(f"  🔁 Reintento firma {attempt}/{max_retries} para {prefix} en {delay:.1f}s ({result['error']})")
+            await asyncio.sleep(delay)
+
+        if result['ok']:
+            urls.update(result['urls'])
+        else:
+            print(f"  ⚠️ Firma en lote falló para {prefix} ({len(chunk)} archivos): {result['error']}")
+    return urls
+
+
+async def upload_file_via_api(session, local_path, relative_path, token, upload_url=None, data=None):
+    """
+    Un intento de PUT para un archivo. Si no viene `upload_url` (pre-firmada en lote),
+    se firma este archivo solo vía /b2/sign-batch.
+    Si viene `data` (bytes en memoria) no se lee `local_path` del disco.
+    Returns: dict {'ok', 'status', 'error', 'retryable'}
+    """
+    # 1. Sign (solo si el lote no trajo URL para este archivo)
     if not upload_url:
-        print("  ❌ No URL returned from sign")
-        return False
-        
-    # 2. Upload to B2 (PUT)
-    # Read file content
-    with open(local_path, 'rb') as f:
-        file_content = f.read()
-        
-    async with session.put(upload_url, data=file_content, headers={'Content-Type': 'image/webp'}) as resp:
-        if resp.status not in [200, 204]: # 204 is common for PUT
-             # Backblaze usually returns 200
-            print(f"  ❌ Upload failed: {resp.status}")
-            return False
-            
-    print(f"  ✅ Subido: {relative_path}")
-    return True
+        prefix, _, filename = relative_path.rpartition('/')
+        signed = await _sign_batch_once(session, prefix, [filename], token)
+        if not signed['ok']:
+            return {k: signed[k] for k in ('ok', 'status', 'error', 'retryable')}
+        upload_url = signed['urls'].get(filename)
+        if not upload_url:
+            return {'ok': False, 'status': None, 'error': "No URL returned from sign", 'retryable': False}
 
-async def upload_directory_to_b2(local_dir, username=None, password=None, token=None):
-    async with aiohttp.ClientSession() as session:
+    try:
+        # 2. Upload to B2 (PUT) — leer fuera del event loop para no frenar las otras subidas
+        file_content = data if data is not None else await asyncio.to_thread(_read_file_bytes, local_path)
+
+        async with session.put(upload_url, data=file_content, headers={'Content-Type': 'image/webp'}) as resp:
+            if resp.status not in [200, 204]:  # 204 is common for PUT
+                return {
+                    'ok': False, 'status': resp.status,
+                    'error': f"Upload failed: {resp.status}",
+                    'retryable': resp.status in _RETRYABLE_STATUS,
+                }
+            return {'ok': True, 'status': resp.status, 'error': None, 'retryable': False}
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Errores de red / conexión reseteada: siempre reintentables
+        return {'ok': False, 'status': None, 'error': f"{type(e).__name__}: {e}", 'retryable': True}
+
+
+async def upload_file_with_retry(session, local_path, relative_path, token, upload_url=None, data=None,
+                                 max_retries=UPLOAD_MAX_RETRIES, backoff=UPLOAD_RETRY_BACKOFF):
+    """
+    Sube un archivo reintentando fallos transitorios con backoff exponencial + jitter.
+    Returns: entrada del manifest {'path', 'ok', 'attempts', 'status', 'error'}
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        result = await upload_file_via_api(session, local_path, relative_path, token, upload_url, data)
+        if result['ok'] or not result['retryable'] or attempt > max_retries:
+            break
+        delay = backoff * (2 ** (attempt - 1)) + random.uniform(0, backoff)
+        print(f"  🔁 Reintento {attempt}/{max_retries} para {relative_path} en {delay:.1f}s ({result['error']})")
+        await asyncio.sleep(delay)
+
+    if result['ok']:
+        print(f"  ✅ Subido: {relative_path}")
+    else:
+        print(f"  ❌ {relative_path}: {result['error']}")
+
+    return {
+        'path': relative_path,
+        'ok': result['ok'],
+        'attempts': attempt,
+        'status': result['status'],
+        'error': result['error'],
+    }
+
+
+def _skipped_entry(relative_path, status=None):
+    """Entrada del manifest para un archivo que B2 ya tiene con el mismo hash (no se sube)."""
+    return {'path': relative_path, 'ok': True, 'attempts': 0, 'status': status, 'error': None, 'skipped': True}
+
+
+def _upload_manifest(files, error=None):
+    uploaded = sum(1 for f in files if f['ok'])
+    return {
+        'ok': error is None and uploaded == len(files),
+        'total': len(files),
+        'uploaded': uploaded,
+        'failed': len(files) - uploaded,
+        'skipped': sum(1 for f in files if f.get('skipped')),
+        'error': error,
+        'files': files,
+    }
+
+
+async def _resolve_token(session, username=None, password=None, token=None):
+    """Login con credenciales (args o API_USER/API_PASS) si no viene token. Returns: (token, error)"""
+    if token:
+        return token, None
+
+    username = username or os.getenv("API_USER")
+    password = password or os.getenv("API_PASS")
+    if not username or not password:
+        print("❌ Error: Credenciales API no proporcionadas (API_USER/API_PASS en .env o argumentos)")
+        return None, "missing_credentials"
+
+    print(f"🔑 Autenticando en API Backend ({API_BASE_URL})...")
+    token = await login_and_get_token(session, username, password)
+    if not token:
+        print("❌ No se pudo loguear en el API. No se puede subir.")
+        return None, "login_failed"
+    return token, None
+
+
+async def upload_directory_to_b2(local_dir, username=None, password=None, token=None,
+                                 concurrency=UPLOAD_CONCURRENCY, limit_per_host=UPLOAD_LIMIT_PER_HOST,
+                                 ready=None, progress=None, manifest=None):
+    """
+    Sube todos los archivos de `local_dir` en paralelo (máx. `concurrency` a la vez).
+    Si se pasa `ready` (async iterable de rutas, ej. optimize_images_stream), cada archivo
+    se sube apenas aparece ahí; el resto se sube al agotarse el stream.
+    `progress(stage, done, total)` se llama tras cada archivo con stage='uploading'.
+    Los archivos cuyo SHA-256 coincide con el último subido (ChapterManifest) se saltean.
+    Returns: manifest {'ok', 'total', 'uploaded', 'failed', 'skipped', 'error', 'files': [...]}
+    """
+    if manifest is None:
+        manifest = await asyncio.to_thread(ChapterManifest.load, local_dir)
+
+    # Un solo pool de conexiones compartido; limit_per_host evita saturar la API / B2
+    connector = aiohttp.TCPConnector(limit=max(concurrency, limit_per_host) * 2, limit_per_host=limit_per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
         # 1. Login (if token not provided)
+        token, error = await _resolve_token(session, username, password, token)
         if not token:
-            username = username or os.getenv("API_USER")
-            password = password or os.getenv("API_PASS")
-            
-            if not username or not password:
-                print("❌ Error: Credenciales API no proporcionadas (API_USER/API_PASS en .env o argumentos)")
-                return False
-        
-            print(f"🔑 Autenticando en API Backend ({API_BASE_URL})...")
-            token = await login_and_get_token(session, username, password)
-                
-        if not token:
-            print("❌ No se pudo loguear en el API. No se puede subir.")
-            return False
+            return _upload_manifest([], error=error)
 
-        print("✅ Autenticado. Iniciando subida...")
-        
-        # Calculate paths
-        abs_local_dir = os.path.abspath(local_dir)
-        worker_root = os.getcwd() 
-        
         # Determine prefix based on logic: chapters/CODE/NUM
-        # worker.py is in MangaWorker.
         # files are in MangaWorker/chapters/CODE/NUM/img.webp
-        
-        tasks = []
+        # If we take relpath from 'MangaWorker' (cwd), it is 'chapters/CODE/NUM/001.webp'.
+        worker_root = os.getcwd()
+
+        pending = []
         for root, dirs, files in os.walk(local_dir):
-            for file in files:
+            for file in sorted(files):
+                if file.startswith('.'):  # .manifest.json y temporales
+                    continue
                 local_path = os.path.join(root, file)
-                
-                # Relative path logic:
-                # We want B2 key: chapters/CODE/NUM/001.webp
-                # local_path is c:/.../chapters/CODE/NUM/001.webp
-                # If we take relpath from 'MangaWorker', it is 'chapters/CODE/NUM/001.webp'.
-                # This matches EXACTLY what we want.
-                
                 rel_path = os.path.relpath(local_path, worker_root).replace("\\", "/")
-                
-                # Serial execution or parallel? Parallel is faster.
-                success = await upload_file_via_api(session, local_path, rel_path, token)
-                # For cleaner output, maybe await sequentially or limit concurrency?
-                # let's await sequentially to debug first.
-                
-        print("✨ Todos los archivos procesados.")
+                pending.append((local_path, rel_path))
+
+        print(f"✅ Autenticado. Firmando y subiendo {len(pending)} archivos (concurrencia={concurrency})...")
+
+        # 2. Firmar en lote por carpeta (chapters/CODE/NUM): 1 request en vez de N
+        by_prefix = {}
+        for _, rel_path in pending:
+            prefix, _, filename = rel_path.rpartition('/')
+            by_prefix.setdefault(prefix, []).append(filename)
+
+        signed_urls = {}
+        for prefix, filenames in by_prefix.items():
+            urls = await sign_batch_via_api(session, prefix, filenames, token)
+            signed_urls.update({f"{prefix}/{name}": url for name, url in urls.items()})
+
+        # 3. PUT en paralelo
+        semaphore = asyncio.Semaphore(concurrency)
+        done = 0
+
+        local_root = os.path.abspath(local_dir)
 
-async def download_image(session, url, current_index, total, save_dir):
-    """Descarga una sola imagen de forma asíncrona y la guarda en disco"""
+        async def upload_with_semaphore(local_path, rel_path):
+            nonlocal done
+            # Dedup solo para los archivos directos del capítulo (los que cubre el manifest)
+            in_manifest = os.path.dirname(os.path.abspath(local_path)) == local_root
+            filename = os.path.basename(local_path)
+            async with semaphore:
+                data = await asyncio.to_thread(_read_file_bytes, local_path)
+                digest = sha256_bytes(data)
+                if in_manifest and manifest.is_uploaded(filename, digest):
+                    result = _skipped_entry(rel_path)
+                else:
+                    result = await upload_file_with_retry(
+                        session, local_path, rel_path, token, signed_urls.get(rel_path), data=data
+                    )
+                    if in_manifest and result['ok']:
+                        manifest.record_upload(filename, digest, rel_path)
+            done += 1
+            if progress:
+                progress('uploading', done, len(pending))
+            return result
+
+        tasks = {}
+        if ready is not None:
+            # Pipeline: subir cada archivo en cuanto la etapa anterior lo entrega
+            by_abs_path = {os.path.abspath(lp): (lp, rp) for lp, rp in pending}
+            async for path in ready:
+                entry = by_abs_path.get(os.path.abspath(path))
+                if entry and entry[1] not in tasks:
+                    tasks[entry[1]] = asyncio.create_task(upload_with_semaphore(*entry))
+
+        for lp, rp in pending:
+            if rp not in tasks:
+                tasks[rp] = asyncio.create_task(upload_with_semaphore(lp, rp))
+
+        # gather en el orden de `pending` para un manifest estable
+        results = await asyncio.gather(*(tasks[rp] for _, rp in pending))
+
+    await asyncio.to_thread(manifest.save)
+    result = _upload_manifest(list(results))
+    print(f"✨ Todos los archivos procesados: {result['uploaded']}/{result['total']} subidos "
+          f"({result['skipped']} sin cambios), {result['failed']} fallidos.")
+    return result
+
+# Define cuántas imágenes se descargan en paralelo (Pre-carga "Cascada")
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "5"))
+
+async def download_image(session, url, current_index, total, save_dir, manifest=None, headers=None):
+    """
+    Descarga una sola imagen de forma asíncrona y la guarda en disco.
+    Con `manifest`, si ya la tenemos se hace GET condicional y un 304 reutiliza el archivo local.
+    """
     try:
         filename = f"{current_index:03d}.webp"
         filepath = os.path.join(save_dir, filename)
+        headers = {**(headers or {}), **(manifest.conditional_headers(filename, url) if manifest else {})}
         
-        async with session.get(url) as response:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                print(f"♻️  Sin cambios {filename} ({current_index}/{total})")
+                return filepath
             if response.status == 200:
                 data = await response.read()
                 
                 # Guardar en disco localmente (Simulación de "Tmp" antes de subir)
                 with open(filepath, "wb") as f:
                     f.write(data)
+                if manifest:
+                    manifest.record_download(filename, url, response.headers)
                 
                 print(f"✅ Guardada {filename} ({current_index}/{total})")
                 return filepath
@@ -201,6 +412,7 @@ def renumber_images(directory):
         return
 
     # 1. Renombrar a temporal para evitar conflictos
+    renames = {}
     temp_files = []
     for i, filename in enumerate(files):
         old_path = os.path.join(directory, filename)
@@ -208,6 +420,7 @@ def renumber_images(directory):
         temp_path = os.path.join(directory, temp_name)
         os.rename(old_path, temp_path)
         temp_files.append(temp_path)
+        renames[filename] = f"{i+1:03d}.webp"
         
     # 2. Renombrar a final secuencial
     for i, temp_path in enumerate(temp_files):
@@ -224,42 +437,154 @@ def renumber_images(directory):
         # The original code did this blindly. 
         # Use Python's implicit rename.
         os.rename(temp_path, new_path)
+
+    # Mantener el manifest alineado con los nombres nuevos
+    if os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+        manifest = ChapterManifest.load(directory)
+        manifest.rename(renames)
+        manifest.save()
         
     print(f"✅ Renombrado completado: 001.webp - {len(files):03d}.webp")
 
-def optimize_images(directory, quality=80, method=4):
-    """Optimiza las imágenes en el directorio (convertir a WebP con calidad variable)"""
-    print(f"🔄 Optimizando imágenes en {directory} (WebP q={quality}, m={method})...")
-    
-    files = [f for f in os.listdir(directory) if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))]
-    if not files:
+# Optimización multi-proceso: Pillow libera poco el GIL, así que se reparte por cores
+OPTIMIZE_WORKERS = int(os.getenv("OPTIMIZE_WORKERS", str(os.cpu_count() or 1)))
+
+_IMAGE_EXTS = ('.webp', '.jpg', '.jpeg', '.png')
+
+
+def _list_images(directory):
+    files = [f for f in os.listdir(directory) if f.lower().endswith(_IMAGE_EXTS)]
+    files.sort()
+    return [os.path.join(directory, f) for f in files]
+
+
+def _optimize_one(filepath, quality, method):
+    """
+    Re-codifica una imagen a WebP sobrescribiendo el archivo.
+    Corre en un proceso hijo: debe ser función de módulo (picklable).
+    Returns: (filepath, ok, error, sha256 del WebP resultante)
+    """
+    try:
+        # 1. Open and load data into memory
+        with Image.open(filepath) as img:
+            img.load()
+
+            # Convert or Copy to ensure we have a standalone object
+            if img.mode not in ("RGB", "L"):
+                image_to_save = img.convert("RGB")
+            else:
+                image_to_save = img.copy()
+
+        # 2. Save overwriting the file (now that handle is closed)
+        image_to_save.save(filepath, "WEBP", quality=quality, method=method, lossless=False)
+        return filepath, True, None, sha256_file(filepath)
+    except Exception as e:
+        return filepath, False, str(e), None
+
+
+def _encode_webp_bytes(data, quality, method):
+    """
+    Igual que _optimize_one pero en memoria (modo pipeline).
+    Returns: (bytes, ok, error) — bytes es None si falla el decode o el encode.
+    """
+    try:
+        with Image.open(BytesIO(data)) as img:
+            img.load()
+            image_to_save = img.convert("RGB") if img.mode not in ("RGB", "L") else img.copy()
+        out = BytesIO()
+        image_to_save.save(out, "WEBP", quality=quality, method=method, lossless=False)
+        return out.getvalue(), True, None
+    except Exception as e:
+        return None, False, str(e)
+
+
+def _split_optimized(paths, manifest):
+    """Separa las rutas que ya son el WebP optimizado que registró el manifest. Returns: (pending, done)"""
+    pending, done = [], []
+    for path in paths:
+        if manifest.is_optimized(os.path.basename(path), sha256_file(path)):
+            done.append(path)
+        else:
+            pending.append(path)
+    return pending, done
+
+
+def optimize_images(directory, quality=80, method=4, workers=OPTIMIZE_WORKERS):
+    """Optimiza las imágenes en el directorio (convertir a WebP con calidad variable) en paralelo"""
+    print(f"🔄 Optimizando imágenes en {directory} (WebP q={quality}, m={method}, procesos={workers})...")
+
+    manifest = ChapterManifest.load(directory)
+    paths, already = _split_optimized(_list_images(directory), manifest)
+    if already:
+        print(f"♻️  {len(already)} imágenes ya optimizadas (sin cambios), se saltean.")
+    if not paths:
         print("⚠️ No hay imágenes para optimizar.")
         return
 
     count = 0
-    for filename in files:
-        filepath = os.path.join(directory, filename)
-        try:
-            image_to_save = None
-            
-            # 1. Open and load data into memory
-            with Image.open(filepath) as img:
-                img.load()
-                
-                # Convert or Copy to ensure we have a standalone object
-                if img.mode not in ("RGB", "L"):
-                    image_to_save = img.convert("RGB")
-                else:
-                    image_to_save = img.copy()
-            
-            # 2. Save overwriting the file (now that handle is closed)
-            if image_to_save:
-                image_to_save.save(filepath, "WEBP", quality=quality, method=method, lossless=False)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_optimize_one, path, quality, method) for path in paths]
+        for future in as_completed(futures):
+            filepath, ok, error, digest = future.result()
+            if ok:
                 count += 1
-                
-        except Exception as e:
-            print(f"  ❌ Error optimizando {filename}: {e}")
-            
+                manifest.record_optimized(os.path.basename(filepath), digest)
+            else:
+                print(f"  ❌ Error optimizando {os.path.basename(filepath)}: {error}")
+
+    manifest.save()
+    print(f"✅ Optimización completa: {count} imágenes procesadas.")
+
+
+async def optimize_images_stream(directory, quality=80, method=4, workers=OPTIMIZE_WORKERS, executor=None,
+                                 progress=None, manifest=None):
+    """
+    Versión async de optimize_images: reparte las páginas en un ProcessPoolExecutor
+    y va entregando cada ruta apenas termina, sin bloquear el event loop.
+    Las páginas que fallan también se entregan (queda el archivo original), igual que
+    las que el manifest ya registra como optimizadas (no se re-codifican).
+    `executor` permite reutilizar un pool compartido (ej. el del server).
+    `manifest` permite compartir el ChapterManifest con upload_directory_to_b2; si no
+    viene se carga y guarda uno propio.
+    `progress(stage, done, total)` se llama por página con stage='optimizing'.
+    """
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = await asyncio.to_thread(ChapterManifest.load, directory)
+    paths, already = await asyncio.to_thread(_split_optimized, _list_images(directory), manifest)
+    total = len(paths) + len(already)
+    if not total:
+        print("⚠️ No hay imágenes para optimizar.")
+        return
+
+    for done, path in enumerate(already, start=1):
+        if progress:
+            progress('optimizing', done, total)
+        yield path
+    if already:
+        print(f"♻️  {len(already)} imágenes ya optimizadas (sin cambios), se saltean.")
+
+    print(f"🔄 Optimizando {len(paths)} imágenes en {directory} (WebP q={quality}, m={method})...")
+    loop = asyncio.get_running_loop()
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    count = 0
+    try:
+        futures = [loop.run_in_executor(pool, _optimize_one, path, quality, method) for path in paths]
+        for done, next_done in enumerate(asyncio.as_completed(futures), start=len(already) + 1):
+            filepath, ok, error, digest = await next_done
+            if ok:
+                count += 1
+                manifest.record_optimized(os.path.basename(filepath), digest)
+            else:
+                print(f"  ❌ Error optimizando {os.path.basename(filepath)}: {error}")
+            if progress:
+                progress('optimizing', done, total)
+            yield filepath
+    finally:
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if own_manifest:
+            await asyncio.to_thread(manifest.save)
     print(f"✅ Optimización completa: {count} imágenes procesadas.")
 
 def append_to_update_list(url):
@@ -328,100 +653,64 @@ def append_to_update_list(url):
         print(f"❌ Error guardando en lista de actualización: {e}")
 
 
-async def process_chapter(chapter_url, chapter_num, series_base_dir):
+async def fetch_chapter_image_urls(chapter_url):
     """
-    Lógica principal:
     1. Obtener HTML del capítulo
     2. Extraer URLs de imágenes (Aquí pondrás tu lógica de scraping liviana)
-    3. Descargar en paralelo
-    Returns: (download_dir, valid_images_count) or (None, 0)
+    Returns: (image_urls, headers) — headers (UA + Referer) para descargar las imágenes
     """
-    print(f"🚀 Iniciando proceso para: {chapter_url}")
-    
-    # 1. Obtener HTML del capítulo
+    # 1. Obtener HTML del capítulo (sesión keep-alive compartida por dominio, ver html_fetcher.py)
     print(f"🌍 Descargando HTML: {chapter_url}")
+    fetcher = get_fetcher()
+    response = await fetcher.fetch(chapter_url)
+
+    # Mismo perfil de navegador que aceptó el sitio (UA + Referer) para bajar las imágenes
+    profile = fetcher.headers_for(chapter_url)
+    headers = {"User-Agent": profile["User-Agent"], "Referer": profile["Referer"]}
+
+    if not response['ok']:
+        print(f"❌ Error al acceder al capítulo: {response['error']}")
+        return [], headers
+        
+    html = response['text']
+    print(f"📍 URL Final: {response['url']}")
     
-    # Extraer dominio para el Referer
-    domain = urlparse(chapter_url).netloc
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Referer": f"https://{domain}/"
-    }
-    
-    import requests
-    try:
-        # Use requests (sync) instead of aiohttp because aiohttp is getting 500 errors on this site
-        # Run in executor to avoid blocking the event loop
-        loop = asyncio.get_running_loop()
-        def fetch_sync():
-            return requests.get(chapter_url, headers=headers)
-            
-        response = await loop.run_in_executor(None, fetch_sync)
+    # TMO/ZonaTMO Specific: Switch to Cascade if stuck on Paginated
+    final_url = response['url']
+    if "/paginated" in final_url:
+        print("🔄 Detectado modo 'Paginated'. Cambiando a 'Cascade' para ver todas las imágenes...")
+        cascade_url = final_url.replace("/paginated", "/cascade")
         
-        if response.status_code != 200:
-            print(f"❌ Error al acceder al capítulo: {response.status_code}")
-            return None, 0
-            
-        html = response.text
-        print(f"📍 URL Final: {response.url}")
+        cascade_resp = await fetcher.fetch(cascade_url)
         
-        # TMO/ZonaTMO Specific: Switch to Cascade if stuck on Paginated
-        final_url = str(response.url)
-        if "/paginated" in final_url:
-            print("🔄 Detectado modo 'Paginated'. Cambiando a 'Cascade' para ver todas las imágenes...")
-            cascade_url = final_url.replace("/paginated", "/cascade")
-            headers["Referer"] = f"https://{domain}/"
-            
-            def fetch_cascade():
-                 return requests.get(cascade_url, headers=headers)
-            
-            cascade_resp = await loop.run_in_executor(None, fetch_cascade)
-            
-            if cascade_resp.status_code == 200:
-                html = cascade_resp.text
-                print(f"✅ Éxito cambianda a Cascade: {cascade_url}")
-            else:
-                print(f"⚠️ Falló el cambio a Cascade ({cascade_resp.status_code}). Usando HTML original.")
-                
-    except Exception as e:
-        print(f"❌ Excepción al descargar HTML: {e}")
-        return None, 0
+        if cascade_resp['ok']:
+            html = cascade_resp['text']
+            print(f"✅ Éxito cambianda a Cascade: {cascade_url}")
+        else:
+            print(f"⚠️ Falló el cambio a Cascade ({cascade_resp['error']}). Usando HTML original.")
 
-    from bs4 import BeautifulSoup
-    import re
+    # 2. Extraer URLs (backend lxml/fast + reglas por sitio, ver image_extractors.py)
+    image_urls = extract_image_urls(html, chapter_url)
     
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Olympus suele tener las imágenes en tags <img> dentro de un contenedor específico
-    # Buscamos patrones comunes. NOTA: Esto puede variar si el sitio cambia.
-    # Estrategia: Buscar todas las imágenes que parezcan del capítulo
-    images = soup.find_all('img')
-    image_urls = []
-    
-    for img in images:
-        src = img.get('src')
-        # Updated condition to include ikigai images
-        if src and ('uploads' in src or 'storage' in src or 'ikigai' in src) and not 'logo' in src:
-            # Convert to absolute URL
-            src = urljoin(chapter_url, src)
-            image_urls.append(src)
-            
-    # Si no encontramos nada, puede ser que estén en un script JSON (NextJS/React)
+    print(f"🔍 Encontradas {len(image_urls)} imágenes.")
     if not image_urls:
-         print("⚠️ No se encontraron imágenes en el HTML estático. Intentando búsqueda por Regex...")
-         # Intento de regex para buscar URLs de imágenes comunes
-         urls = re.findall(r'(https?://[^"\s]+\.(?:jpg|jpeg|png|webp))', html)
-         image_urls = [u for u in urls if 'uploads' in u and 'logo' not in u]
+        print("❌ No se pudieron extraer imágenes. Puede que el sitio requiera JS (Selenium/Chromium).")
+    return image_urls, headers
 
-    # Eliminar duplicados manteniendo orden
-    image_urls = list(dict.fromkeys(image_urls))
-    
-    print(f"🔍 Encontradas {len(image_urls)} imágenes.")
-    
+
+async def process_chapter(chapter_url, chapter_num, series_base_dir, progress=None):
+    """
+    Lógica principal:
+    1-2. Obtener HTML y extraer URLs de imágenes (fetch_chapter_image_urls)
+    3. Descargar en paralelo (`progress(stage, done, total)` con stage='downloading'),
+       con GET condicional para las páginas que el ChapterManifest ya conoce
+    Returns: (download_dir, valid_images_count) or (None, 0)
+    """
+    print(f"🚀 Iniciando proceso para: {chapter_url}")
+
+    image_urls, headers = await fetch_chapter_image_urls(chapter_url)
     total_images = len(image_urls)
     if total_images == 0:
-        print("❌ No se pudieron extraer imágenes. Puede que el sitio requiera JS (Selenium/Chromium).")
         return None, 0
 
     # Crear carpeta de descargas para el capítulo
@@ -429,32 +718,215 @@ async def process_chapter(chapter_url, chapter_num, series_base_dir):
     download_dir = os.path.join(series_base_dir, chapter_dir_name)
     os.makedirs(download_dir, exist_ok=True)
     print(f"📂 Guardando imágenes en: {os.path.abspath(download_dir)}")
+    manifest = await asyncio.to_thread(ChapterManifest.load, download_dir)
 
-    # 3. Descarga Paralela con Semáforo (Ventana deslizante)
-    # Define cuántas imágenes se descargan en paralelo (Pre-carga "Cascada")
-    MAX_CONCURRENT_DOWNLOADS = 5 
+    # 3. Descarga Paralela con Semáforo (Ventana deslizante) sobre las sesiones keep-alive
+    # del fetcher; throttle() aplica el límite por host global a todos los capítulos en curso
+    fetcher = get_fetcher()
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    done = 0
 
     async def download_with_semaphore(url, idx):
-        async with semaphore:
-            return await download_image(session, url, idx, total_images, download_dir)
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        tasks = []
-        for i, url in enumerate(image_urls):
-            # Envolver la llamada original con el semáforo
-            task = download_with_semaphore(url, i+1)
-            tasks.append(task)
-        
-        # asyncio.gather procesa en orden de lista, y el semáforo restringe la ejecución real
-        await asyncio.gather(*tasks)
-        print(f"✨ ¡Descarga completa! Revisa la carpeta '{download_dir}'")
-        
-        return download_dir, total_images
+        nonlocal done
+        async with semaphore, fetcher.throttle(url):
+            result = await download_image(
+                fetcher.session_for(url), url, idx, total_images, download_dir, manifest, headers
+            )
+        done += 1
+        if progress:
+            progress('downloading', done, total_images)
+        return result
+
+    tasks = []
+    for i, url in enumerate(image_urls):
+        # Envolver la llamada original con el semáforo
+        task = download_with_semaphore(url, i+1)
+        tasks.append(task)
+    
+    # asyncio.gather procesa en orden de lista, y el semáforo restringe la ejecución real
+    await asyncio.gather(*tasks)
+    await asyncio.to_thread(manifest.save)
+    print(f"✨ ¡Descarga completa! Revisa la carpeta '{download_dir}'")
+    
+    return download_dir, total_images
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+
+async def process_chapter_pipeline(chapter_url, chapter_num, series_base_dir, optimize=True,
+                                   quality=80, method=4, save_to_disk=False, executor=None,
+                                   token=None, workers=OPTIMIZE_WORKERS, progress=None):
+    """
+    Modo pipeline en memoria: descarga → decode/WebP → PUT presignado, página por página.
+    Las etapas se conectan con colas acotadas (PIPELINE_QUEUE_SIZE): si B2 va lento,
+    el encode y la descarga esperan (backpressure) en lugar de acumular bytes en RAM.
+    `save_to_disk` guarda además cada WebP final en chapters/CODE/NNN (solo auditoría).
+    `progress(stage, done, total)` se llama por página en cada etapa
+    ('downloading', 'optimizing', 'uploading').
+    El ChapterManifest de chapters/CODE/NNN permite GET condicional: un 304 de una página
+    ya subida con los mismos parámetros de WebP la saltea entera; y si el WebP resultante
+    tiene el mismo SHA-256 que lo ya subido, no se repite el PUT.
+    Por eso, aun con save_to_disk=False, se crea chapters/CODE/NNN/ y se escribe
+    .manifest.json al terminar (a propósito: unos KB con ETags y hashes). Las páginas
+    nunca tocan el disco en ese caso.
+    Returns: manifest de subida (ver upload_directory_to_b2) + 'downloaded'
+    """
+    print(f"🚀 [Pipeline] Iniciando proceso para: {chapter_url}")
+
+    image_urls, headers = await fetch_chapter_image_urls(chapter_url)
+    total = len(image_urls)
+    if total == 0:
+        manifest = _upload_manifest([], error="no_images")
+        manifest['downloaded'] = 0
+        return manifest
+
+    download_dir = os.path.join(series_base_dir, f"{chapter_num:03d}")
+    if save_to_disk:
+        os.makedirs(download_dir, exist_ok=True)
+    prefix = os.path.relpath(download_dir, os.getcwd()).replace("\\", "/")
+    filenames = [f"{i:03d}.webp" for i in range(1, total + 1)]
+    # Estado para el próximo run: se guarda siempre, también sin save_to_disk (ver docstring)
+    chapter_manifest = await asyncio.to_thread(ChapterManifest.load, download_dir)
+    encoding = encoding_key(optimize, quality, method)
+    fetcher = get_fetcher()
+
+    download_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    upload_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    pool = executor
+    if optimize and pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    encoders = max(1, workers if optimize else 1)
+    stats = {'downloading': 0, 'optimizing': 0, 'uploading': 0}
+
+    def advance(stage):
+        stats[stage] += 1
+        if progress:
+            progress(stage, stats[stage], total)
 
-async def process_post_download(download_dir, options):
+    connector = aiohttp.TCPConnector(limit_per_host=UPLOAD_LIMIT_PER_HOST)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            token, error = await _resolve_token(session, token=token)
+            if not token:
+                manifest = _upload_manifest([], error=error)
+                manifest['downloaded'] = 0
+                return manifest
+
+            # Firmar todo el capítulo de una vez: los nombres se conocen de antemano
+            signed_urls = await sign_batch_via_api(session, prefix, filenames, token)
+            results = []
+
+            async def downloader(items):
+                for idx, url in items:
+                    filename = filenames[idx - 1]
+                    conditional = chapter_manifest.conditional_headers(filename, url, encoding=encoding)
+                    try:
+                        async with fetcher.throttle(url), \
+                                session.get(url, headers={**headers, **conditional}) as resp:
+                            if resp.status == 304:
+                                # Misma imagen de origen, ya subida con este encoding: nada que hacer
+                                for stage in ('downloading', 'optimizing', 'uploading'):
+                                    if stage != 'optimizing' or optimize:
+                                        advance(stage)
+                                results.append(_skipped_entry(f"{prefix}/{filename}", status=304))
+                                continue
+                            if resp.status != 200:
+                                print(f"❌ Error descargando {url}: Status {resp.status}")
+                                continue
+                            data = await resp.read()
+                            chapter_manifest.record_download(filename, url, resp.headers)
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        print(f"❌ Exception en {url}: {e}")
+                        continue
+                    advance('downloading')
+                    await download_q.put((idx, data))
+
+            async def encoder():
+                while True:
+                    item = await download_q.get()
+                    if item is None:
+                        break
+                    idx, data = item
+                    if optimize:
+                        data, ok, err = await loop.run_in_executor(pool, _encode_webp_bytes, data, quality, method)
+                        advance('optimizing')
+                        if not ok:
+                            # No se sube con nombre .webp algo que no es WebP: la página queda
+                            # como fallida en el manifest de subida (job parcialmente fallido)
+                            print(f"  ❌ Error optimizando {idx:03d}: {err}")
+                            filename = filenames[idx - 1]
+                            chapter_manifest.discard_download(filename)
+                            results.append({'path': f"{prefix}/{filename}", 'ok': False, 'attempts': 0,
+                                            'status': None, 'error': f"encode_failed: {err}"})
+                            advance('uploading')
+                            continue
+                    await upload_q.put((idx, data))
+
+            async def uploader():
+                while True:
+                    item = await upload_q.get()
+                    if item is None:
+                        break
+                    idx, data = item
+                    filename = filenames[idx - 1]
+                    if save_to_disk:
+                        path = os.path.join(download_dir, filename)
+                        await asyncio.to_thread(_write_file_bytes, path, data)
+                    digest = sha256_bytes(data)
+                    chapter_manifest.record_optimized(filename, digest, encoding)
+                    if chapter_manifest.is_uploaded(filename, digest):
+                        result = _skipped_entry(f"{prefix}/{filename}")
+                    else:
+                        result = await upload_file_with_retry(
+                            session, None, f"{prefix}/{filename}", token,
+                            signed_urls.get(filename), data=data,
+                        )
+                        if result['ok']:
+                            chapter_manifest.record_upload(filename, digest, result['path'])
+                    results.append(result)
+                    advance('uploading')
+
+            # Reparto round-robin de las URLs entre los descargadores
+            items = list(enumerate(image_urls, start=1))
+            downloaders = [asyncio.create_task(downloader(items[i::MAX_CONCURRENT_DOWNLOADS]))
+                           for i in range(MAX_CONCURRENT_DOWNLOADS)]
+            encoder_tasks = [asyncio.create_task(encoder()) for _ in range(encoders)]
+            uploader_tasks = [asyncio.create_task(uploader()) for _ in range(UPLOAD_CONCURRENCY)]
+
+            try:
+                await asyncio.gather(*downloaders)
+                for _ in encoder_tasks:
+                    await download_q.put(None)
+                await asyncio.gather(*encoder_tasks)
+                for _ in uploader_tasks:
+                    await upload_q.put(None)
+                await asyncio.gather(*uploader_tasks)
+            finally:
+                for task in downloaders + encoder_tasks + uploader_tasks:
+                    task.cancel()
+    finally:
+        if optimize and executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        await asyncio.to_thread(chapter_manifest.save)
+
+    results.sort(key=lambda r: r['path'])
+    manifest = _upload_manifest(results)
+    if stats['downloading'] < total:
+        manifest['ok'] = False
+        manifest['error'] = f"download_failed: {total - stats['downloading']}/{total}"
+    manifest['downloaded'] = stats['downloading']
+    print(f"✨ [Pipeline] {manifest['uploaded']}/{total} páginas subidas "
+          f"({manifest['skipped']} sin cambios, {manifest['failed']} fallidas).")
+    return manifest
+
+
+async def process_post_download(download_dir, options, executor=None, token=None):
     """
     Ejecuta el pipeline de post-procesamiento basado en las opciones dadas.
+    `executor`: pool de procesos compartido (modo lote) para optimizar sin crear uno por capítulo.
+    `token`: token del API ya obtenido (modo lote) para no loguear por capítulo.
+    Returns: True si se subió todo a B2
     options = {
         'renumber': bool,
         'optimize': bool,
@@ -513,13 +985,16 @@ async def process_post_download(download_dir, options):
                     except:
                         pass
 
-                print(f"🔄 Optimizando imágenes en {download_dir} (WebP q={quality}, m={method})...")
-                optimize_images(download_dir, quality=quality, method=method)
+                await asyncio.to_thread(optimize_images, download_dir, quality=quality, method=method)
             else:
                  print("⏩ Saltando optimización.")
+        elif executor is not None:
+             print(f"\n⚙️ Ejecutando optimización de imágenes (WebP q={quality}, m={method})...")
+             async for _ in optimize_images_stream(download_dir, quality=quality, method=method, executor=executor):
+                 pass
         else:
              print(f"\n⚙️ Ejecutando optimización de imágenes (WebP q={quality}, m={method})...")
-             optimize_images(download_dir, quality=quality, method=method)
+             await asyncio.to_thread(optimize_images, download_dir, quality=quality, method=method)
 
     # 4.2 SUBIDA
     uploaded = False
@@ -530,13 +1005,13 @@ async def process_post_download(download_dir, options):
                 print("⏩ Saltando subida.")
             else:
                 print("\n🚀 Iniciando subida a Backblaze (Vía API)...")
-                await upload_directory_to_b2(download_dir)
-                uploaded = True
+                manifest = await upload_directory_to_b2(download_dir)
+                uploaded = manifest['ok']
         else:
             # Automático
             print("\n🚀 Iniciando subida automática a Backblaze...")
-            await upload_directory_to_b2(download_dir)
-            uploaded = True
+            manifest = await upload_directory_to_b2(download_dir, token=token)
+            uploaded = manifest['ok']
 
     # 4.3 Actualizar Estado en Lista
     if options.get('update_list') and options.get('series_url'):
@@ -552,6 +1027,97 @@ async def process_post_download(download_dir, options):
             if url_to_save:
                 append_to_update_list(url_to_save)
 
+    return uploaded
+
+
+# Capítulos procesados a la vez en modo masivo (el límite por host lo pone html_fetcher)
+CHAPTER_CONCURRENCY = int(os.getenv("CHAPTER_CONCURRENCY", "4"))
+
+
+async def _run_batch_chapter(url, chapter_num, series_base_dir, options, executor, token):
+    """Un capítulo del lote: descarga (o reusa la carpeta) + post-proceso. Returns: dict resumen"""
+    started = time.monotonic()
+    summary = {'chapter': chapter_num, 'url': url, 'status': 'ok', 'images': 0, 'uploaded': False, 'error': None}
+    try:
+        if options.get('skip_download'):
+            download_dir = os.path.join(series_base_dir, str(chapter_num).zfill(3))
+            if not os.path.exists(download_dir):
+                print(f"⚠️ Carpeta no existe, no se puede procesar: {download_dir}")
+                summary['status'] = 'missing'
+                return summary
+            print(f"⏩ Saltando descarga (Existe): {download_dir}")
+            summary['images'] = len(_list_images(download_dir))
+        else:
+            download_dir, summary['images'] = await process_chapter(url, chapter_num, series_base_dir)
+            if not download_dir or summary['images'] == 0:
+                summary['status'] = 'no_images'
+                return summary
+
+        summary['uploaded'] = await process_post_download(download_dir, options, executor=executor, token=token)
+        if options.get('upload') and not summary['uploaded'] and not options.get('interactive'):
+            summary['status'] = 'upload_failed'
+    except Exception as e:
+        print(f"❌ Error procesando {url}: {e}")
+        summary['status'] = 'failed'
+        summary['error'] = str(e)
+    finally:
+        summary['seconds'] = round(time.monotonic() - started, 1)
+    return summary
+
+
+async def run_batch(links, start_num, series_base_dir, options, concurrency=CHAPTER_CONCURRENCY):
+    """
+    Procesa todos los capítulos en un solo event loop, `concurrency` a la vez.
+    Comparte entre capítulos las sesiones HTTP (html_fetcher, con límite global por host),
+    el pool de procesos de optimización y el token del API.
+    Returns: lista de resúmenes por capítulo (ver _run_batch_chapter)
+    """
+    total = len(links)
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = []
+
+    token = None
+    if options.get('upload') and not options.get('interactive'):
+        async with aiohttp.ClientSession() as session:
+            token, _ = await _resolve_token(session)
+
+    executor = ProcessPoolExecutor(max_workers=OPTIMIZE_WORKERS) if options.get('optimize') else None
+
+    async def run_one(i, url):
+        chapter_num = start_num + i
+        async with semaphore:
+            print(f"\n⬇️  Procesando capítulo {i+1}/{total} (Cap #{chapter_num})")
+            summary = await _run_batch_chapter(url, chapter_num, series_base_dir, options, executor, token)
+        results.append(summary)
+        icon = "✅" if summary['status'] == 'ok' else "❌"
+        print(f"📊 [{len(results)}/{total}] {icon} Cap #{chapter_num}: {summary['status']} "
+              f"({summary['images']} imágenes, {summary['seconds']}s)")
+        return summary
+
+    try:
+        await asyncio.gather(*(run_one(i, url) for i, url in enumerate(links)))
+    finally:
+        await close_fetcher()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    results.sort(key=lambda r: r['chapter'])
+    by_status = {}
+    for r in results:
+        by_status.setdefault(r['status'], []).append(r['chapter'])
+
+    elapsed = time.monotonic() - started
+    print("\n" + "=" * 50)
+    print(f"📊 Resumen: {total} capítulos en {elapsed:.1f}s (concurrencia={concurrency})")
+    print(f"   ✅ OK: {len(by_status.get('ok', []))}  |  🖼️  Imágenes: {sum(r['images'] for r in results)}"
+          f"  |  ☁️  Subidos: {sum(1 for r in results if r['uploaded'])}")
+    for status, chapters in sorted(by_status.items()):
+        if status != 'ok':
+            print(f"   ❌ {status}: {', '.join(f'#{n}' for n in chapters)}")
+    print("=" * 50)
+    return results
+
 
 def get_mass_options():
     print("\n--- Configuración de Descarga Masiva ---")
@@ -566,9 +1132,15 @@ def get_mass_options():
         'upload': False,
         'update_list': False,
         'series_url': None,
-        'interactive': False
+        'interactive': False,
+        'concurrency': CHAPTER_CONCURRENCY,
     }
     
+    # Capítulos en paralelo
+    c = input(f"¿Cuántos capítulos procesar en paralelo? [{CHAPTER_CONCURRENCY}]: ").strip()
+    if c.isdigit() and int(c) > 0:
+        opts['concurrency'] = int(c)
+
     # Skip Download
     sd = input("¿Saltar descarga (Solo procesar existentes)? [y/N]: ").strip().lower()
     if sd == 'y':
@@ -715,35 +1287,11 @@ if __name__ == "__main__":
                  print("⚠️ Número inválido, usando 1 por defecto")
                  start_num = 1
         
-        # Procesar descargas
-        total_caps = len(links_to_download)
-        for i, url in enumerate(links_to_download):
-            current_chap_num = start_num + i
-            print(f"\n⬇️  Procesando capítulo {i+1}/{total_caps} (Cap #{current_chap_num})")
-            
-            # Check Skip Download
-            if mass_options.get('skip_download'):
-                # Construct directory path manually
-                chapter_dir_name = str(current_chap_num).zfill(3)
-                download_dir = os.path.join(base_chapters_dir, chapter_dir_name)
-                
-                if os.path.exists(download_dir):
-                    print(f"⏩ Saltando descarga (Existe): {download_dir}")
-                    asyncio.run(process_post_download(download_dir, mass_options))
-                else:
-                    print(f"⚠️ Carpeta no existe, no se puede procesar: {download_dir}")
-                continue # Skip remaining loop actions
+        # Procesar descargas: un solo event loop para todo el lote
+        # (el modo individual es interactivo → de a un capítulo)
+        concurrency = 1 if mass_options.get('interactive') else mass_options.get('concurrency', CHAPTER_CONCURRENCY)
+        asyncio.run(run_batch(links_to_download, start_num, base_chapters_dir, mass_options, concurrency))
 
-            try:
-                download_dir, count = asyncio.run(process_chapter(url, current_chap_num, base_chapters_dir))
-                
-                if download_dir and count > 0:
-                     # Ejecutar pipeline post-descarga
-                     asyncio.run(process_post_download(download_dir, mass_options))
-                         
-            except Exception as e:
-                print(f"❌ Error procesando {url}: {e}")
-                
         print("\n✨✨ Proceso Finalizado ✨✨")
         
     except ModuleNotFoundError as e: